@@ -65,6 +65,8 @@ class Config:
     API_ENABLE_TIMING_HEADERS = os.getenv("API_ENABLE_TIMING_HEADERS", "true").lower() in ("true", "1", "t", "yes", "y")
     API_SLOW_REQUEST_MS = int(os.getenv("API_SLOW_REQUEST_MS", "120") or 120)
     API_DEFAULT_CACHE_CONTROL = os.getenv("API_DEFAULT_CACHE_CONTROL", "no-store")
+    # Endpoints that emit ETags must stay revalidatable (no-store would stop clients sending If-None-Match).
+    API_ETAG_CACHE_CONTROL = os.getenv("API_ETAG_CACHE_CONTROL", "private, no-cache")
     TRUST_PROXY = os.getenv("TRUST_PROXY", "true").lower() in ("true", "1", "t", "yes", "y")
 
     # Google Drive Configuration
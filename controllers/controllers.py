@@ -1,8 +1,9 @@
 # app/controllers.py
 
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, send_from_directory
 import os
 import re
+import time
 import random
 import string
 from services.services import VendorService
@@ -22,9 +23,22 @@ from models.uploadedImage import Image
 from models.bookingQueue import BookingQueue
 from models.booking import Booking
 from models.accessBookingCode import AccessBookingCode
-from db.extensions import db, mail, redis_client
+from db.extensions import db
 from services.otp_service import OTPService
 from services.email_template import build_hfg_email_html
+from services.catalogue_cache import CatalogueCache
+from services.geo_index_service import GeoIndexService
+from services.slot_inventory import SlotInventoryStore, SLOT, CONSOLE_AVAILABILITY, DASHBOARD
+from services.slot_capacity_service import SlotCapacityService
+from services.onboarding_jobs import OnboardingJobService, ONBOARD_ASYNC_ENABLED
+from services.document_upload_stage import DocumentUploadStage, DocumentUploadError
+from services.drive_client import DriveClient
+from services.image_pipeline import ImagePipeline, IMAGE_PIPELINE_LOCAL_DIR
+from services.mail_queue import MailQueue
+from services.newsletter_campaign import NewsletterCampaign
+from services import otp_store
+from services.otp_store import OTPStore
+from services.http_cache import build_etag, is_not_modified, not_modified_response, resource_version, with_etag
 from models.transaction import Transaction
 from models.availableGame import AvailableGame
 from models.slots import Slot
@@ -77,6 +91,11 @@ FULL_DAY_TO_SHORT = {
 
 # Adjust this window as needed (e.g., 365 for a year)
 FUTURE_WINDOW_DAYS = int(os.getenv("SLOT_ROLLING_WINDOW_DAYS", "60"))
+SLOT_CRON_CHUNK_SIZE = int(os.getenv("SLOT_CRON_CHUNK_SIZE", "25"))
+# "replace" rewrites every row of the edited dates; "diff" touches only added/removed slots.
+SLOT_APPLY_MODE = str(os.getenv("SLOT_APPLY_MODE", "replace") or "replace").strip().lower()
+SLOT_APPLY_MODES = {"replace", "diff"}
+SLOT_DRY_RUN_SAMPLE_LIMIT = 50
 SELF_ONBOARD_OTP_EXPIRY_SECONDS = int(os.getenv("SELF_ONBOARD_OTP_EXPIRY_SECONDS", "300"))
 SELF_ONBOARD_VERIFY_EXPIRY_SECONDS = int(os.getenv("SELF_ONBOARD_VERIFY_EXPIRY_SECONDS", "1800"))
 SELF_ONBOARD_OTP_COOLDOWN_SECONDS = int(os.getenv("SELF_ONBOARD_OTP_COOLDOWN_SECONDS", "45"))
@@ -445,16 +464,24 @@ def _self_onboard_verify_token_key(token):
     return f"self_onboard:verify_token:{token}"
 
 
+SELF_ONBOARD_OTP_STORE = OTPStore(
+    otp_key=_self_onboard_otp_key("{subject}"),
+    verified_key=_self_onboard_verify_key("{subject}"),
+    cooldown_key=_self_onboard_otp_cooldown_key("{subject}"),
+    otp_ttl=SELF_ONBOARD_OTP_EXPIRY_SECONDS,
+    verified_ttl=SELF_ONBOARD_VERIFY_EXPIRY_SECONDS,
+    cooldown_seconds=SELF_ONBOARD_OTP_COOLDOWN_SECONDS,
+    clear_verified_on_issue=True,
+)
+
+
 def _consume_self_onboard_verification_token(token, email):
-    token_key = _self_onboard_verify_token_key(token)
-    stored_email = _normalize_email(redis_client.get(token_key))
     normalized_email = _normalize_email(email)
-    if not stored_email:
+    outcome = SELF_ONBOARD_OTP_STORE.consume_token(_self_onboard_verify_token_key(token), normalized_email, normalized_email)
+    if outcome == otp_store.EXPIRED:
         return False, "Email verification token expired. Please verify email again."
-    if stored_email != normalized_email:
+    if outcome == otp_store.MISMATCH:
         return False, "Email verification token does not match the owner email."
-    redis_client.delete(token_key)
-    redis_client.setex(_self_onboard_verify_key(normalized_email), SELF_ONBOARD_VERIFY_EXPIRY_SECONDS, "1")
     return True, None
 
 
@@ -505,38 +532,209 @@ def _generate_blocks(anchor_day, start_time, end_time, slot_duration):
     return blocks
 
 
-def _apply_slot_rows_for_day(vendor_id, games, target_dates, blocks, is_enabled):
-    updated_days = 0
-    inserted_rows = 0
+def _weekday_dates(start_anchor, end_window, target_weekday):
+    """Every date in [start_anchor, end_window] falling on target_weekday (0=Mon)."""
+    first = start_anchor + timedelta(days=(target_weekday - start_anchor.weekday()) % 7)
+    if first > end_window:
+        return []
+    return [first + timedelta(days=7 * i) for i in range((end_window - first).days // 7 + 1)]
+
+
+def _bulk_insert_slot_rows(slot_table, vendor_id, target_dates, slot_totals):
+    """
+    Insert the dates x slots cross product for one vendor in a single
+    INSERT ... SELECT. Only the two short axes are sent to PostgreSQL, so the
+    row set is produced server-side instead of as a Python list of dicts.
+    `slot_totals` maps slot_id -> initial available_slot.
+    """
+    if not target_dates or not slot_totals:
+        return 0
+    slot_ids = list(slot_totals.keys())
+    result = db.session.execute(
+        text(f"""
+            INSERT INTO {slot_table} (vendor_id, slot_id, date, available_slot, is_available)
+            SELECT :vendor_id, sv.slot_id, d.date, sv.total, TRUE
+            FROM unnest(CAST(:dates AS date[])) AS d(date)
+            CROSS JOIN unnest(CAST(:slot_ids AS integer[]), CAST(:totals AS integer[])) AS sv(slot_id, total)
+        """),
+        {
+            "vendor_id": vendor_id,
+            "dates": list(target_dates),
+            "slot_ids": slot_ids,
+            "totals": [slot_totals[slot_id] for slot_id in slot_ids],
+        },
+    )
+    return int(result.rowcount or 0)
+
+
+def _diff_slot_rows(slot_table, vendor_id, target_dates, slot_totals, dry_run=False, replace=False):
+    """
+    Set difference between the stored (date, slot_id) rows of `target_dates` and
+    the desired rows (target_dates x slot_totals). Removed rows are deleted, new
+    rows inserted, and rows present in both are left untouched so their
+    available_slot keeps any in-flight bookings. With dry_run, nothing is written
+    and a sample of the planned changes is returned.
+
+    `replace` models replace mode instead: every stored row of those dates is
+    removed and every desired row inserted, so nothing is unchanged.
+    """
+    slot_ids = list(slot_totals.keys())
+    params = {
+        "vendor_id": vendor_id,
+        "dates": list(target_dates),
+        "slot_ids": slot_ids,
+        "totals": [slot_totals[slot_id] for slot_id in slot_ids],
+        "sample_limit": SLOT_DRY_RUN_SAMPLE_LIMIT,
+    }
+    # In diff mode rows present on both sides are neither removed nor inserted.
+    removed_filter = "" if replace else "AND NOT (cur.slot_id = ANY(CAST(:slot_ids AS integer[])))"
+    missing_filter = "TRUE" if replace else f"""NOT EXISTS (
+            SELECT 1
+            FROM {slot_table} cur
+            WHERE cur.vendor_id = :vendor_id
+              AND cur.date = d.date
+              AND cur.slot_id = sv.slot_id
+        )"""
+    removed_from = f"""
+        FROM {slot_table} cur
+        LEFT JOIN slots s ON s.id = cur.slot_id
+        WHERE cur.vendor_id = :vendor_id
+          AND cur.date = ANY(CAST(:dates AS date[]))
+          {removed_filter}
+    """
+    missing_from = f"""
+        FROM unnest(CAST(:dates AS date[])) AS d(date)
+        CROSS JOIN unnest(CAST(:slot_ids AS integer[]), CAST(:totals AS integer[])) AS sv(slot_id, total)
+        LEFT JOIN slots s ON s.id = sv.slot_id
+        WHERE {missing_filter}
+    """
+    unchanged_rows = 0 if replace else int(db.session.execute(
+        text(f"""
+            SELECT COUNT(*)
+            FROM {slot_table} cur
+            WHERE cur.vendor_id = :vendor_id
+              AND cur.date = ANY(CAST(:dates AS date[]))
+              AND cur.slot_id = ANY(CAST(:slot_ids AS integer[]))
+        """),
+        params,
+    ).scalar() or 0)
+
+    if dry_run:
+        removed = db.session.execute(
+            text(f"""
+                SELECT cur.date, cur.slot_id, s.start_time, s.end_time, COUNT(*) OVER () AS total_rows
+                {removed_from}
+                ORDER BY cur.date, s.start_time
+                LIMIT :sample_limit
+            """),
+            params,
+        ).mappings().all()
+        missing = db.session.execute(
+            text(f"""
+                SELECT d.date, sv.slot_id, s.start_time, s.end_time, COUNT(*) OVER () AS total_rows
+                {missing_from}
+                ORDER BY d.date, s.start_time
+                LIMIT :sample_limit
+            """),
+            params,
+        ).mappings().all()
 
+        def _sample(rows):
+            return [
+                {
+                    "date": r["date"].isoformat(),
+                    "slot_id": int(r["slot_id"]),
+                    "start_time": r["start_time"].strftime("%H:%M") if r["start_time"] else None,
+                    "end_time": r["end_time"].strftime("%H:%M") if r["end_time"] else None,
+                }
+                for r in rows
+            ]
+
+        return {
+            "removed_rows": int(removed[0]["total_rows"]) if removed else 0,
+            "inserted_rows": int(missing[0]["total_rows"]) if missing else 0,
+            "unchanged_rows": unchanged_rows,
+            "plan": {"remove": _sample(removed), "insert": _sample(missing)},
+        }
+
+    removed_rows = db.session.execute(
+        text(f"""
+            DELETE FROM {slot_table} cur
+            WHERE cur.vendor_id = :vendor_id
+              AND cur.date = ANY(CAST(:dates AS date[]))
+              {removed_filter}
+        """),
+        params,
+    ).rowcount
+    inserted_rows = db.session.execute(
+        text(f"""
+            INSERT INTO {slot_table} (vendor_id, slot_id, date, available_slot, is_available)
+            SELECT :vendor_id, sv.slot_id, d.date, sv.total, TRUE
+            {missing_from}
+        """),
+        params,
+    ).rowcount
+    return {
+        "removed_rows": int(removed_rows or 0),
+        "inserted_rows": int(inserted_rows or 0),
+        "unchanged_rows": unchanged_rows,
+    }
+
+
+def _apply_slot_rows_for_day(vendor_id, games, target_dates, blocks, is_enabled, mode="replace", dry_run=False):
+    """
+    Write slot inventory rows for `target_dates`. "replace" deletes and reinserts
+    every row of those dates; "diff" goes through _diff_slot_rows so unchanged rows
+    keep their available_slot. A dry run plans the requested mode through
+    _diff_slot_rows without writing.
+    """
+    started = time.perf_counter()
+    use_diff = mode == "diff" or dry_run
+    replace = mode != "diff"
+    metrics = {}
+
+    def _mark(phase, since):
+        metrics[f"{phase}_ms"] = round((time.perf_counter() - since) * 1000, 2)
+        return time.perf_counter()
+
+    def _result(updated_days, inserted_rows, diff=None):
+        metrics["total_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        result = {"updated_days": updated_days, "inserted_rows": inserted_rows, "metrics": metrics}
+        if diff is not None:
+            result.update(diff)
+        return result
+
+    empty_plan = {"removed_rows": 0, "inserted_rows": 0, "unchanged_rows": 0, "plan": {"remove": [], "insert": []}}
     if not target_dates:
-        return {"updated_days": 0, "inserted_rows": 0}
+        return _result(0, 0, empty_plan if dry_run else None)
 
+    slot_table = SlotInventoryStore.table_name(SLOT, vendor_id)
     delete_dates_sql = text(f"""
-        DELETE FROM VENDOR_{vendor_id}_SLOT
+        DELETE FROM {slot_table}
         WHERE vendor_id = :vendor_id
           AND date IN :target_dates
     """).bindparams(bindparam("target_dates", expanding=True))
 
-    # Clear day rows first if this day is disabled.
-    if not is_enabled:
+    # Clear day rows when the day is disabled or has no bookable blocks.
+    if not is_enabled or not blocks:
+        phase = time.perf_counter()
+        if use_diff:
+            diff = _diff_slot_rows(slot_table, vendor_id, target_dates, {}, dry_run=dry_run, replace=replace)
+            _mark("diff", phase)
+            return _result(len(target_dates), diff["inserted_rows"], diff)
         db.session.execute(
             delete_dates_sql,
             {"vendor_id": vendor_id, "target_dates": target_dates},
         )
-        return {"updated_days": len(target_dates), "inserted_rows": 0}
-
-    if not blocks:
-        db.session.execute(
-            delete_dates_sql,
-            {"vendor_id": vendor_id, "target_dates": target_dates},
-        )
-        return {"updated_days": len(target_dates), "inserted_rows": 0}
+        _mark("delete", phase)
+        return _result(len(target_dates), 0)
 
     game_totals = {int(g.id): int(g.total_slot or 0) for g in games if int(g.total_slot or 0) > 0}
     if not game_totals:
-        return {"updated_days": 0, "inserted_rows": 0}
+        # No bookable games: existing rows are left as they are, in every mode.
+        return _result(0, 0, empty_plan if dry_run else None)
 
+    phase = time.perf_counter()
     game_ids = list(game_totals.keys())
     existing_slots = (
         Slot.query
@@ -547,6 +745,7 @@ def _apply_slot_rows_for_day(vendor_id, games, target_dates, blocks, is_enabled)
         .all()
     )
     slot_id_map = {(int(s.gaming_type_id), s.start_time, s.end_time): int(s.id) for s in existing_slots}
+    phase = _mark("slot_lookup", phase)
 
     to_create = []
     for game_id in game_ids:
@@ -569,39 +768,32 @@ def _apply_slot_rows_for_day(vendor_id, games, target_dates, blocks, is_enabled)
         db.session.flush()
         for s in to_create:
             slot_id_map[(int(s.gaming_type_id), s.start_time, s.end_time)] = int(s.id)
+    phase = _mark("slot_create", phase)
 
-    insert_sql = text(f"""
-        INSERT INTO VENDOR_{vendor_id}_SLOT (vendor_id, slot_id, date, available_slot, is_available)
-        VALUES (:vendor_id, :slot_id, :date, :available_slot, :is_available)
-    """)
+    slot_totals = {}
+    for game_id, total in game_totals.items():
+        for st, et in blocks:
+            slot_id = slot_id_map.get((game_id, st, et))
+            if slot_id:
+                slot_totals[slot_id] = total
+
+    if use_diff:
+        diff = _diff_slot_rows(slot_table, vendor_id, target_dates, slot_totals, dry_run=dry_run, replace=replace)
+        _mark("diff", phase)
+        metrics["slots_created"] = len(to_create)
+        return _result(len(target_dates), diff["inserted_rows"], diff)
 
     db.session.execute(
         delete_dates_sql,
         {"vendor_id": vendor_id, "target_dates": target_dates},
     )
+    phase = _mark("delete", phase)
 
-    batch = []
-    for d in target_dates:
-        for game_id, total in game_totals.items():
-            for st, et in blocks:
-                slot_id = slot_id_map.get((game_id, st, et))
-                if not slot_id:
-                    continue
-                batch.append(
-                    {
-                        "vendor_id": vendor_id,
-                        "slot_id": slot_id,
-                        "date": d,
-                        "available_slot": total,
-                        "is_available": True,
-                    }
-                )
+    inserted_rows = _bulk_insert_slot_rows(slot_table, vendor_id, target_dates, slot_totals)
+    _mark("insert", phase)
+    metrics["slots_created"] = len(to_create)
 
-    if batch:
-        db.session.execute(insert_sql, batch)
-        inserted_rows = len(batch)
-
-    return {"updated_days": len(target_dates), "inserted_rows": inserted_rows}
+    return _result(len(target_dates), inserted_rows)
 
 
 def allowed_file(filename):
@@ -616,36 +808,10 @@ def validate_json(data, required_fields):
 
 def upload_documents_to_cloudinary(files, vendor_id, cafe_name):
     """
-    Upload vendor documents to Cloudinary and return URLs
+    Upload vendor documents to Cloudinary concurrently and return URLs.
+    All-or-nothing: on any failure the uploaded assets are removed and the error re-raised.
     """
-    document_urls = {}
-    
-    for doc_type, file in files.items():
-        try:
-            current_app.logger.info(f"Uploading {doc_type} to Cloudinary for vendor {vendor_id}")
-            
-            # Use Cloudinary service for document upload
-            upload_result = CloudinaryGameImageService.upload_vendor_document(
-                file, 
-                cafe_name,
-                doc_type, 
-                vendor_id
-            )
-            
-            if upload_result['success']:
-                document_urls[doc_type] = {
-                    'url': upload_result['url'],
-                    'public_id': upload_result['public_id']
-                }
-                current_app.logger.info(f"Successfully uploaded {doc_type}: {upload_result['url']}")
-            else:
-                current_app.logger.error(f"Failed to upload {doc_type}: {upload_result['error']}")
-                raise Exception(f"Failed to upload {doc_type} to Cloudinary")
-        except Exception as e:
-            current_app.logger.error(f"Error uploading {doc_type}: {str(e)}")
-            raise Exception(f"Document upload failed for {doc_type}")
-    
-    return document_urls
+    return DocumentUploadStage.upload_all(files, vendor_id, cafe_name)
 
 def save_vendor_documents(vendor_id, document_urls, document_submitted):
     """Save uploaded document metadata once; avoid duplicate inserts and loop commits."""
@@ -675,6 +841,7 @@ def save_vendor_documents(vendor_id, document_urls, document_submitted):
             saved_count += 1
 
         db.session.commit()
+        CatalogueCache.bump("documents_saved", vendor_id)
         current_app.logger.info(f"Saved {saved_count} documents for vendor {vendor_id}")
     except Exception as e:
         db.session.rollback()
@@ -750,17 +917,20 @@ def send_self_onboard_email_otp():
                 "dashboard_url": SELF_ONBOARD_DASHBOARD_URL
             }), 409
 
-        cooldown_key = _self_onboard_otp_cooldown_key(email)
-        if redis_client.exists(cooldown_key):
+        otp = ''.join(random.choices(string.digits, k=6))
+        issued = SELF_ONBOARD_OTP_STORE.issue(email, otp)
+        if issued["status"] == otp_store.COOLDOWN:
             return jsonify({
                 "success": False,
-                "message": "Please wait before requesting another OTP."
+                "message": "Please wait before requesting another OTP.",
+                "retry_after_seconds": issued["retry_after"]
+            }), 429
+        if issued["status"] == otp_store.LOCKED:
+            return jsonify({
+                "success": False,
+                "message": "Too many invalid OTP attempts. Please try again later.",
+                "retry_after_seconds": issued["retry_after"]
             }), 429
-
-        otp = ''.join(random.choices(string.digits, k=6))
-        redis_client.setex(_self_onboard_otp_key(email), SELF_ONBOARD_OTP_EXPIRY_SECONDS, otp)
-        redis_client.setex(cooldown_key, SELF_ONBOARD_OTP_COOLDOWN_SECONDS, "1")
-        redis_client.delete(_self_onboard_verify_key(email))
 
         msg = Message(
             subject="Hash Self Onboarding - Email Verification OTP",
@@ -801,7 +971,7 @@ def send_self_onboard_email_otp():
             preview_text=f"Your Hash onboarding OTP is {otp}",
         )
 
-        mail.send(msg)
+        MailQueue.enqueue(msg, category="self_onboard_otp")
 
         return jsonify({
             "success": True,
@@ -823,20 +993,27 @@ def verify_self_onboard_email_otp():
         if not _is_valid_email(email) or not otp:
             return jsonify({"success": False, "message": "Email and OTP are required"}), 400
 
-        stored_otp = str(redis_client.get(_self_onboard_otp_key(email)) or "").strip()
-        if not stored_otp:
-            return jsonify({"success": False, "message": "OTP expired. Please request again."}), 400
-        if stored_otp != otp:
-            return jsonify({"success": False, "message": "Invalid OTP"}), 400
-
-        redis_client.delete(_self_onboard_otp_key(email))
-        redis_client.setex(_self_onboard_verify_key(email), SELF_ONBOARD_VERIFY_EXPIRY_SECONDS, "1")
         verification_token = ''.join(random.choices(string.ascii_letters + string.digits, k=40))
-        redis_client.setex(
-            _self_onboard_verify_token_key(verification_token),
-            SELF_ONBOARD_VERIFY_EXPIRY_SECONDS,
+        result = SELF_ONBOARD_OTP_STORE.verify(
             email,
+            otp,
+            token_key=_self_onboard_verify_token_key(verification_token),
+            token_value=email,
         )
+        if result["status"] == otp_store.EXPIRED:
+            return jsonify({"success": False, "message": "OTP expired. Please request again."}), 400
+        if result["status"] == otp_store.LOCKED:
+            return jsonify({
+                "success": False,
+                "message": "Too many invalid OTP attempts. Please try again later.",
+                "retry_after_seconds": result["retry_after"]
+            }), 429
+        if result["status"] == otp_store.INVALID:
+            return jsonify({
+                "success": False,
+                "message": "Invalid OTP",
+                "attempts_left": result["attempts_left"]
+            }), 400
 
         return jsonify({
             "success": True,
@@ -1020,6 +1197,9 @@ def onboard_vendor():
         current_app.logger.error(f"File processing error: {error_message}")
         return jsonify({'message': error_message}), 400
     
+    if ONBOARD_ASYNC_ENABLED:
+        return _onboard_vendor_async(data, files)
+
     try:
         # Onboard the vendor
         current_app.logger.debug("Onboarding vendor...")
@@ -1051,6 +1231,91 @@ def onboard_vendor():
         return jsonify({'message': 'An error occurred during onboarding', 'error': str(e)}), 500
 
 
+def _job_vendor_tables(job):
+    VendorService.create_vendor_tables(job["vendor_id"])
+
+
+def _job_documents_saved(job):
+    inputs = job["inputs"]
+    document_urls = inputs.get("document_urls") or {}
+    save_vendor_documents(job["vendor_id"], document_urls, inputs.get("document_submitted") or {})
+    return {"documents_uploaded": len(document_urls), "document_error": inputs.get("document_error")}
+
+
+def _job_credentials_notified(job):
+    job_vendor = Vendor.query.get(job["vendor_id"])
+    job_vendor._temp_password = job["inputs"].get("temp_password")
+    VendorService.generate_credentials_and_notify(job_vendor)
+
+
+# Onboarding job steps, in run order. Each one is safe to re-run after a worker died mid-step.
+ONBOARDING_JOB_STEPS = [
+    ("vendor_tables", _job_vendor_tables),
+    ("documents_saved", _job_documents_saved),
+    ("credentials_notified", _job_credentials_notified),
+]
+for _step_name, _step in ONBOARDING_JOB_STEPS:
+    OnboardingJobService.register_step(
+        _step_name, _step, secret_inputs=("temp_password",) if _step_name == "credentials_notified" else ()
+    )
+
+
+def _onboard_vendor_async(data, files):
+    """
+    Write the core vendor rows and upload the documents in the request, then hand
+    inventory tables, document rows and the credentials email to a background
+    onboarding job. The job only stores references, so another worker can resume it.
+    """
+    try:
+        vendor = VendorService.onboard_vendor(data, files, defer_vendor_tables=True)
+        vendor_id = vendor.id
+        inputs = {
+            "temp_password": getattr(vendor, "_temp_password", None),
+            "document_submitted": data['document_submitted'],
+            "document_urls": {},
+        }
+        try:
+            inputs["document_urls"] = upload_documents_to_cloudinary(files, vendor_id, vendor.cafe_name)
+        except DocumentUploadError as upload_exc:
+            # The vendor exists already; finish onboarding and let the documents be re-uploaded.
+            current_app.logger.error(f"Document upload failed for vendor {vendor_id}: {upload_exc}")
+            inputs["document_error"] = str(upload_exc)
+
+        job_id = OnboardingJobService.create_job(vendor_id, [name for name, _ in ONBOARDING_JOB_STEPS], inputs)
+        OnboardingJobService.start(job_id)
+
+        current_app.logger.info(f"Vendor {vendor_id} core rows saved; onboarding job {job_id} started")
+        response = {
+            'message': 'Vendor onboarding accepted',
+            'vendor_id': vendor_id,
+            'job_id': job_id,
+            'documents_uploaded': len(inputs["document_urls"]),
+            'status_url': f"{request.script_root}/api/onboard/jobs/{job_id}"
+        }
+        if inputs.get("document_error"):
+            response['document_error'] = inputs["document_error"]
+            response['document_upload_url'] = f"{request.script_root}/api/vendor/{vendor_id}/documents"
+        return jsonify(response), 202
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Onboarding error: {e}", exc_info=True)
+        return jsonify({'message': 'An error occurred during onboarding', 'error': str(e)}), 500
+
+
+@vendor_bp.route('/onboard/jobs/<job_id>', methods=['GET'])
+def get_onboarding_job(job_id):
+    """Per-step progress of an asynchronous onboarding job."""
+    try:
+        job = OnboardingJobService.get_job(job_id)
+        if not job:
+            return jsonify({'message': 'Onboarding job not found'}), 404
+        return jsonify(job), 200
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"[get_onboarding_job] job_id={job_id} error={e}")
+        return jsonify({'message': 'Failed to fetch onboarding job', 'error': str(e)}), 500
+
+
 @vendor_bp.route('/vendor/branch-defaults', methods=['GET'])
 def get_branch_onboard_defaults():
     """
@@ -1080,9 +1345,13 @@ def get_branch_onboard_defaults():
 def deboard_vendor(vendor_id):
     current_app.logger.debug(f"Received deboarding request for vendor ID: {vendor_id}")
     try:
-        VendorService.deboard_vendor(vendor_id)
+        report = VendorService.deboard_vendor(vendor_id)
         current_app.logger.info(f"Vendor {vendor_id} deboarded successfully.")
-        return jsonify({'message': f'Vendor {vendor_id} deboarded successfully'}), 200
+        return jsonify({
+            'message': f'Vendor {vendor_id} deboarded successfully',
+            'rows_removed': report['rows_removed'],
+            'dropped_tables': report['dropped_tables'],
+        }), 200
     except Exception as e:
         current_app.logger.error(f"Deboarding error for vendor {vendor_id}: {e}")
         return jsonify({'message': 'An error occurred during deboarding', 'error': str(e)}), 500
@@ -1117,16 +1386,14 @@ def upload_vendor_missing_document(vendor_id):
         if not file_obj or not file_obj.filename:
             return jsonify({"success": False, "message": "document file is required"}), 400
 
-        upload_result = CloudinaryGameImageService.upload_vendor_document(
-            document_file=file_obj,
-            cafe_name=vendor.cafe_name or "vendor",
-            document_type=document_type,
-            vendor_id=vendor_id
-        )
-        if not upload_result.get("success"):
+        try:
+            upload_result = DocumentUploadStage.upload_all(
+                {document_type: file_obj}, vendor_id, vendor.cafe_name or "vendor"
+            )[document_type]
+        except DocumentUploadError as upload_exc:
             return jsonify({
                 "success": False,
-                "message": upload_result.get("error") or "Failed to upload document"
+                "message": upload_exc.results[document_type].get("error") or "Failed to upload document"
             }), 500
 
         existing = Document.query.filter_by(vendor_id=vendor_id, document_type=document_type).first()
@@ -1154,6 +1421,7 @@ def upload_vendor_missing_document(vendor_id):
             db.session.add(document)
 
         db.session.commit()
+        CatalogueCache.bump("document_uploaded", vendor_id)
 
         return jsonify({
             "success": True,
@@ -1198,16 +1466,15 @@ def replace_vendor_document(vendor_id, document_id):
         if not file_obj or not file_obj.filename:
             return jsonify({"success": False, "message": "document file is required"}), 400
 
-        upload_result = CloudinaryGameImageService.upload_vendor_document(
-            document_file=file_obj,
-            cafe_name=vendor.cafe_name or "vendor",
-            document_type=document.document_type or "document",
-            vendor_id=vendor_id
-        )
-        if not upload_result.get("success"):
+        document_type = document.document_type or "document"
+        try:
+            upload_result = DocumentUploadStage.upload_all(
+                {document_type: file_obj}, vendor_id, vendor.cafe_name or "vendor"
+            )[document_type]
+        except DocumentUploadError as upload_exc:
             return jsonify({
                 "success": False,
-                "message": upload_result.get("error") or "Failed to upload document"
+                "message": upload_exc.results[document_type].get("error") or "Failed to upload document"
             }), 500
 
         old_public_id = document.public_id
@@ -1216,6 +1483,7 @@ def replace_vendor_document(vendor_id, document_id):
         document.status = "unverified"
         document.uploaded_at = dt.utcnow()
         db.session.commit()
+        CatalogueCache.bump("document_replaced", vendor_id)
 
         # Best-effort cleanup for old file (ignore failures).
         if old_public_id and old_public_id != document.public_id:
@@ -1268,23 +1536,85 @@ def get_vendor_dashboard():
     API to retrieve all vendors with their statuses and relevant information for the salesperson dashboard.
     """
     try:
+        version = resource_version("""
+            SELECT (SELECT COUNT(*) FROM vendors),
+                   (SELECT MAX(updated_at) FROM vendors),
+                   (SELECT COUNT(*) FROM vendor_statuses),
+                   (SELECT MAX(updated_at) FROM vendor_statuses),
+                   (SELECT COUNT(*) FROM documents),
+                   (SELECT MAX(uploaded_at) FROM documents),
+                   (SELECT COUNT(*) FROM documents WHERE status = 'verified')
+        """)
+        etag = build_etag("vendor_dashboard", CatalogueCache.current_version(), *version)
+        if is_not_modified(etag):
+            return not_modified_response(etag)
+
         response_data = VendorService.get_all_vendors_with_status()
-        return jsonify(response_data), 200
+        return with_etag(jsonify(response_data), etag), 200
     except Exception as e:
         current_app.logger.error(f"Error fetching vendor dashboard: {e}")
         return jsonify({'message': 'An error occurred while fetching vendor data', 'error': str(e)}), 500
 
+def _parse_image_variant():
+    """Returns (variant, error) for the optional image_variant query param."""
+    value = str(request.args.get("image_variant", "") or "").strip().lower()
+    if not value:
+        return None, None
+    if value not in ImagePipeline.variant_names():
+        return None, f"image_variant must be one of: {', '.join(ImagePipeline.variant_names())}"
+    return value, None
+
+
 @vendor_bp.route('/vendor/getAllGamingCafe', methods=['GET'])
 def get_all_gaming_cafe():
     """
     API to retrieve all vendors with their statuses and relevant information
     for app/dashboard listing.
     By default returns only active cafes; pass include_inactive=true for admin/debug.
+    Optional query params:
+      - limit: page size (1..200); enables keyset pagination and `next_cursor`
+      - cursor: `next_cursor` from the previous page
+      - fields: comma separated keys or a preset (e.g. fields=map)
+      - image_variant: thumbnail | card | full; image urls point at that size
     """
     try:
         include_inactive = str(request.args.get("include_inactive", "")).strip().lower() in {"1", "true", "yes", "y"}
-        response_data = VendorService.get_all_gaming_cafe(include_inactive=include_inactive)
-        return jsonify(response_data), 200
+
+        limit = request.args.get("limit")
+        cursor = request.args.get("cursor")
+        try:
+            limit = int(limit) if limit not in {None, ""} else None
+            cursor = int(cursor) if cursor not in {None, ""} else None
+        except ValueError:
+            return jsonify({'message': 'limit and cursor must be integers'}), 400
+        if limit is not None and (limit < 1 or limit > VendorService.GAMING_CAFE_MAX_PAGE_SIZE):
+            return jsonify({'message': f'limit must be between 1 and {VendorService.GAMING_CAFE_MAX_PAGE_SIZE}'}), 400
+        if cursor is not None and limit is None:
+            return jsonify({'message': 'cursor requires limit'}), 400
+
+        try:
+            fields = VendorService.parse_gaming_cafe_fields(request.args.get("fields"))
+        except ValueError as field_error:
+            return jsonify({'message': str(field_error)}), 400
+
+        image_variant, variant_error = _parse_image_variant()
+        if variant_error:
+            return jsonify({'message': variant_error}), 400
+
+        etag = CatalogueCache.etag(
+            VendorService.gaming_cafe_cache_variant(include_inactive, cursor, limit, fields, image_variant)
+        )
+        if etag and is_not_modified(etag):
+            return not_modified_response(etag)
+
+        body = VendorService.get_all_gaming_cafe_json(
+            include_inactive=include_inactive,
+            cursor=cursor,
+            limit=limit,
+            fields=fields,
+            image_variant=image_variant,
+        )
+        return with_etag(current_app.response_class(body, status=200, mimetype="application/json"), etag)
     except Exception as e:
         current_app.logger.error(f"Error fetching vendor dashboard: {e}")
         return jsonify({'message': 'An error occurred while fetching vendor data', 'error': str(e)}), 500
@@ -1292,6 +1622,65 @@ def get_all_gaming_cafe():
 
 
 
+@vendor_bp.route('/vendor/nearby', methods=['GET'])
+def get_nearby_gaming_cafes():
+    """
+    Nearest active cafes around a point, in distance order.
+    Query params: lat, lng (required), radius_km (default 10, max 100),
+    limit (default 20, max 100), fields and image_variant (same as getAllGamingCafe).
+    Each vendor carries the listing payload plus `distance_km`.
+    """
+    try:
+        try:
+            lat = float(request.args.get("lat"))
+            lng = float(request.args.get("lng"))
+        except (TypeError, ValueError):
+            return jsonify({'message': 'lat and lng are required numbers'}), 400
+        if abs(lat) > 90 or abs(lng) > 180:
+            return jsonify({'message': 'lat/lng out of range'}), 400
+
+        try:
+            radius_km = float(request.args.get("radius_km", 10))
+            limit = int(request.args.get("limit", 20))
+        except (TypeError, ValueError):
+            return jsonify({'message': 'radius_km must be a number and limit an integer'}), 400
+        if radius_km <= 0 or radius_km > 100:
+            return jsonify({'message': 'radius_km must be between 0 and 100'}), 400
+        if limit < 1 or limit > 100:
+            return jsonify({'message': 'limit must be between 1 and 100'}), 400
+
+        try:
+            fields = VendorService.parse_gaming_cafe_fields(request.args.get("fields"))
+        except ValueError as field_error:
+            return jsonify({'message': str(field_error)}), 400
+
+        image_variant, variant_error = _parse_image_variant()
+        if variant_error:
+            return jsonify({'message': variant_error}), 400
+
+        # Over-fetch: the listing also drops cafes without an active subscription.
+        hits = GeoIndexService.nearby_vendor_ids(lat, lng, radius_km, limit * 2)
+        distance_map = {hit["vendor_id"]: hit["distance_km"] for hit in hits}
+        listing = VendorService.get_all_gaming_cafe(
+            fields=fields, vendor_ids=list(distance_map.keys()), image_variant=image_variant
+        )
+
+        vendors = []
+        for vendor in listing.get("vendors", []):
+            vendor["distance_km"] = distance_map.get(vendor["vendor_id"])
+            vendors.append(vendor)
+        vendors.sort(key=lambda v: (v["distance_km"], v["vendor_id"]))
+
+        return jsonify({
+            "vendors": vendors[:limit],
+            "center": {"lat": lat, "lng": lng},
+            "radius_km": radius_km,
+        }), 200
+    except Exception as e:
+        current_app.logger.error(f"Error fetching nearby cafes: {e}")
+        return jsonify({'message': 'An error occurred while fetching nearby cafes', 'error': str(e)}), 500
+
+
 @vendor_bp.route('/upload-photos/<int:vendor_id>', methods=['POST'])
 def upload_photos(vendor_id):
     """API endpoint to upload photos to Google Drive."""
@@ -1335,6 +1724,14 @@ def get_vendor_photos(vendor_id):
         JSON: A list of photos associated with the vendor, including image ID and path.
     """
     try:
+        version = resource_version(
+            "SELECT COUNT(*), MAX(id), MAX(uploaded_at) FROM images WHERE vendor_id = :vendor_id",
+            {"vendor_id": vendor_id},
+        )
+        etag = build_etag("vendor_photos", vendor_id, *version)
+        if is_not_modified(etag):
+            return not_modified_response(etag)
+
         # Query the database for images associated with the vendor ID
         images = Image.query.filter_by(vendor_id=vendor_id).all()
         
@@ -1350,7 +1747,7 @@ def get_vendor_photos(vendor_id):
             })
 
         # Return the photo data as a JSON response
-        return jsonify({"photos": photo_data}), 200
+        return with_etag(jsonify({"photos": photo_data}), etag), 200
 
     except Exception as e:
         # Handle unexpected errors
@@ -1462,17 +1859,20 @@ def poll_queue():
         booking_ids = [b.id for b in bookings]
 
         # ✅ Dynamic table names
-        console_table_name = f"VENDOR_{vendor_id}_CONSOLE_AVAILABILITY"
-        booking_table_name = f"VENDOR_{vendor_id}_DASHBOARD"
+        console_table_name = SlotInventoryStore.table_name(CONSOLE_AVAILABILITY, vendor_id)
+        booking_table_name = SlotInventoryStore.table_name(DASHBOARD, vendor_id)
+        console_scope = SlotInventoryStore.vendor_clause(CONSOLE_AVAILABILITY)
+        booking_scope = SlotInventoryStore.vendor_clause(DASHBOARD)
 
         # ✅ Check console availability
         sql_check_availability = text(f"""
             SELECT is_available FROM {console_table_name}
-            WHERE console_id = :console_id AND game_id = :game_id
+            WHERE console_id = :console_id AND game_id = :game_id {console_scope}
         """)
         result = db.session.execute(sql_check_availability, {
             "console_id": console_id,
-            "game_id": game_id
+            "game_id": game_id,
+            "vendor_id": vendor_id
         }).fetchone()
 
         if not result:
@@ -1485,23 +1885,25 @@ def poll_queue():
         sql_update_console_status = text(f"""
             UPDATE {console_table_name}
             SET is_available = FALSE
-            WHERE console_id = :console_id AND game_id = :game_id
+            WHERE console_id = :console_id AND game_id = :game_id {console_scope}
         """)
         db.session.execute(sql_update_console_status, {
             "console_id": console_id,
-            "game_id": game_id
+            "game_id": game_id,
+            "vendor_id": vendor_id
         })
 
         # ✅ Update bookings to 'current' and assign console
         sql_update_bookings = text(f"""
             UPDATE {booking_table_name}
             SET book_status = 'current', console_id = :console_id
-            WHERE book_id = ANY(:booking_ids) AND game_id = :game_id AND book_status = 'upcoming'
+            WHERE book_id = ANY(:booking_ids) AND game_id = :game_id AND book_status = 'upcoming' {booking_scope}
         """)
         db.session.execute(sql_update_bookings, {
             "console_id": console_id,
             "game_id": game_id,
-            "booking_ids": booking_ids
+            "booking_ids": booking_ids,
+            "vendor_id": vendor_id
         })
 
         db.session.commit()
@@ -1644,6 +2046,19 @@ def unlock_with_code():
 
    # add image route
 
+def _image_payload(img):
+    return {
+        'id': img.id,
+        'url': img.url,
+        'public_id': img.public_id,
+        'variants': {
+            'thumbnail': img.thumbnail_url,
+            'card': img.card_url,
+            'full': img.full_url,
+        },
+    }
+
+
 @vendor_bp.route('/vendor/<int:vendor_id>/add-image', methods=['POST'])
 def upload_vendor_image(vendor_id):
     """
@@ -1661,40 +2076,47 @@ def upload_vendor_image(vendor_id):
     if not vendor:
         return jsonify({'success': False, 'message': 'Vendor not found'}), 404
 
-    # Upload to Cloudinary
-    upload_result = CloudinaryGameImageService.upload_game_cover_image(image_file, vendor.cafe_name)
+    # Upload once and generate thumbnail/card/full variants
+    upload_result = ImagePipeline.process(image_file, vendor_id, vendor.cafe_name)
     if not upload_result['success']:
-        return jsonify({'success': False, 'message': 'Cloudinary upload failed', 'error': upload_result['error']}), 500
+        return jsonify({'success': False, 'message': 'Image upload failed', 'error': upload_result['error']}), 500
 
+    variants = upload_result['variants']
     # Save in DB
     new_image = Image(
         url=upload_result['url'],
         public_id=upload_result['public_id'],
         vendor_id=vendor_id,
-        
+        thumbnail_url=variants.get('thumbnail'),
+        card_url=variants.get('card'),
+        full_url=variants.get('full'),
     )
     db.session.add(new_image)
     db.session.commit()
+    CatalogueCache.bump("image_added", vendor_id)
     
     db.session.refresh(vendor)
     
      # Return all images to keep frontend in sync
-    all_images = [{'id': img.id, 'url': img.url, 'public_id': img.public_id} for img in vendor.images]
+    all_images = [_image_payload(img) for img in vendor.images]
 
 
     return jsonify({
         'success': True,
         'message': 'Vendor image uploaded and saved successfully',
-        'image': {
-            'id': new_image.id,
-            'url': new_image.url,
-            'public_id': new_image.public_id,
-            
-        },
+        'image': _image_payload(new_image),
         'all_images': all_images
     }), 201
     
     
+@vendor_bp.route('/media/<path:filename>', methods=['GET'])
+def serve_local_media(filename):
+    """Serves variants written by the local (Pillow) image pipeline backend."""
+    response = send_from_directory(IMAGE_PIPELINE_LOCAL_DIR, filename, max_age=86400)
+    response.headers['Cache-Control'] = 'public, max-age=86400, immutable'
+    return response
+
+
 #@vendor_bp.route('/vendor/<int:vendor_id>/dashboard', methods=['GET'])
 #def get_vendor_dashboard_data(vendor_id):
  #   """
@@ -1741,6 +2163,23 @@ def get_vendor_dashboard_data(vendor_id):
     API to retrieve vendor dashboard data with real document information
     """
     try:
+        version = resource_version("""
+            SELECT v.updated_at,
+                   (SELECT md5(string_agg(COALESCE(ci.email, '') || '/' || COALESCE(ci.phone, ''), ',' ORDER BY ci.id))
+                      FROM contact_info ci
+                     WHERE ci.parent_id = v.id AND ci.parent_type = 'vendor'),
+                   (SELECT COUNT(*) FROM images i WHERE i.vendor_id = v.id),
+                   (SELECT MAX(i.id) FROM images i WHERE i.vendor_id = v.id),
+                   (SELECT md5(string_agg(d.id || ':' || COALESCE(d.status, '') || ':' || COALESCE(d.uploaded_at::text, ''), ',' ORDER BY d.id))
+                      FROM documents d
+                     WHERE d.vendor_id = v.id)
+            FROM vendors v
+            WHERE v.id = :vendor_id
+        """, {"vendor_id": vendor_id})
+        etag = build_etag("vendor_dashboard_data", vendor_id, *version) if version else None
+        if etag and is_not_modified(etag):
+            return not_modified_response(etag)
+
         vendor = Vendor.query.get(vendor_id)
         if not vendor:
             return jsonify({'success': False, 'message': 'Vendor not found'}), 404
@@ -1784,7 +2223,7 @@ def get_vendor_dashboard_data(vendor_id):
             "verifiedDocuments": verified_documents  # Real document data
         }
         
-        return jsonify(response_data), 200
+        return with_etag(jsonify(response_data), etag), 200
         
     except Exception as e:
         current_app.logger.error(f"Dashboard API Error: {str(e)}")
@@ -1821,7 +2260,7 @@ def delete_vendor_image(vendor_id, image_id):
         
         # Try to delete from Cloudinary first
         try:
-            delete_result = CloudinaryGameImageService.delete_image(image.public_id)
+            delete_result = ImagePipeline.delete(image.public_id)
             if delete_result['success']:
                 cloudinary_deleted = True
             else:
@@ -1835,6 +2274,7 @@ def delete_vendor_image(vendor_id, image_id):
             db.session.delete(image)
             db.session.commit()
             database_deleted = True
+            CatalogueCache.bump("image_deleted", vendor_id)
         except Exception as db_error:
             db.session.rollback()
             return jsonify({
@@ -1910,7 +2350,7 @@ def delete_vendor_image_by_url(vendor_id):
         return jsonify({'success': False, 'message': 'Image not found or does not belong to this vendor'}), 404
     
     # Delete from Cloudinary
-    delete_result = CloudinaryGameImageService.delete_image(image.public_id)
+    delete_result = ImagePipeline.delete(image.public_id)
     if not delete_result['success']:
         return jsonify({
             'success': False, 
@@ -1921,6 +2361,7 @@ def delete_vendor_image_by_url(vendor_id):
     # Delete from database
     db.session.delete(image)
     db.session.commit()
+    CatalogueCache.bump("image_deleted", vendor_id)
     
     # Refresh vendor to get updated images list
     db.session.refresh(vendor)
@@ -2042,7 +2483,9 @@ def update_slot(vendor_id):
       "is_enabled": true,         // optional, default true
       "is_24_hours": false,       // optional, if true uses 00:00-00:00 full-day window
       "window_days": 60,          // optional, rolling window for generation (1..365)
-      "start_date": "2026-03-31"  // optional YYYY-MM-DD, useful for EOM extension
+      "start_date": "2026-03-31", // optional YYYY-MM-DD, useful for EOM extension
+      "apply_mode": "diff",       // optional, "replace" (default) or "diff" (keep unchanged rows)
+      "dry_run": true             // optional, report planned row changes without saving anything
     }
     """
     try:
@@ -2057,6 +2500,11 @@ def update_slot(vendor_id):
         is_24_hours    = bool(payload.get("is_24_hours", False))
         window_days    = payload.get("window_days", FUTURE_WINDOW_DAYS)
         start_date_raw = payload.get("start_date")
+        apply_mode     = str(payload.get("apply_mode") or SLOT_APPLY_MODE).strip().lower()
+        dry_run        = str(payload.get("dry_run", "")).strip().lower() in {"1", "true", "yes", "y"}
+
+        if apply_mode not in SLOT_APPLY_MODES:
+            return jsonify({"message": "apply_mode must be 'replace' or 'diff'"}), 400
 
         if not slot_duration or not day_key:
             return jsonify({"message": "slot_duration and day are required"}), 400
@@ -2164,20 +2612,38 @@ def update_slot(vendor_id):
 
         # Build target dates for this weekday.
         end_window = start_anchor + timedelta(days=window_days)
-        target_dates = []
-        cur = start_anchor
-        while cur <= end_window:
-            if cur.weekday() == target_weekday:
-                target_dates.append(cur)
-            cur += timedelta(days=1)
+        target_dates = _weekday_dates(start_anchor, end_window, target_weekday)
 
         if not target_dates:
             return jsonify({"message": "No matching dates found in the configured window"}), 400
 
         blocks = _generate_blocks(start_anchor, start_time, end_time, slot_duration)
         games = AvailableGame.query.filter_by(vendor_id=vendor_id).all()
-        result = _apply_slot_rows_for_day(vendor_id, games, target_dates, blocks, is_enabled)
+        result = _apply_slot_rows_for_day(
+            vendor_id, games, target_dates, blocks, is_enabled, mode=apply_mode, dry_run=dry_run
+        )
+        if dry_run:
+            db.session.rollback()
+            return jsonify({
+                "message": "Dry run: no changes saved",
+                "vendor_id": vendor_id,
+                "day": day_key,
+                "apply_mode": apply_mode,
+                "dry_run": True,
+                "window_start": start_anchor.isoformat(),
+                "future_window_days": window_days,
+                "target_dates": len(target_dates),
+                "removed_rows": result["removed_rows"],
+                "inserted_rows": result["inserted_rows"],
+                "unchanged_rows": result["unchanged_rows"],
+                "plan": result["plan"],
+                "metrics": result["metrics"]
+            }), 200
         db.session.commit()
+        current_app.logger.info(
+            f"[update_slot] vendor_id={vendor_id} day={day_key} rows={result['inserted_rows']} metrics={result['metrics']}"
+        )
+        CatalogueCache.bump("day_config", vendor_id)
         return jsonify({
             "message": "Day-wise slot configuration saved and applied",
             "vendor_id": vendor_id,
@@ -2187,7 +2653,11 @@ def update_slot(vendor_id):
             "window_start": start_anchor.isoformat(),
             "future_window_days": window_days,
             "updated_days": result["updated_days"],
-            "inserted_rows": result["inserted_rows"]
+            "apply_mode": apply_mode,
+            "inserted_rows": result["inserted_rows"],
+            "removed_rows": result.get("removed_rows"),
+            "unchanged_rows": result.get("unchanged_rows"),
+            "metrics": result["metrics"]
         }), 200
 
     except Exception as e:
@@ -2261,6 +2731,9 @@ def _is_valid_cron_request():
 
 
 def _ensure_vendor_slot_table_exists(vendor_id: int):
+    if SlotInventoryStore.is_shared():
+        SlotInventoryStore.ensure_shared_tables()
+        return
     table_name = f"vendor_{int(vendor_id)}_slot"
     exists = db.session.execute(
         text("SELECT to_regclass(:table_name)"),
@@ -2300,11 +2773,13 @@ def cron_extend_slots_for_vendor(vendor_id):
     """
     Cron endpoint: ensure next N days slots exist for one vendor (default 20).
     Idempotent by design (uses NOT EXISTS in insert).
+    Pass {"only_changed": true} to heal only rows whose capacity drifted.
     """
     if not _is_valid_cron_request():
         return jsonify({"success": False, "message": "Unauthorized"}), 401
 
     payload = request.get_json(silent=True) or {}
+    only_changed = str(payload.get("only_changed", "")).strip().lower() in {"1", "true", "yes", "y"}
     try:
         window_days = int(payload.get("window_days", 20))
     except (TypeError, ValueError):
@@ -2319,7 +2794,7 @@ def cron_extend_slots_for_vendor(vendor_id):
     try:
         _ensure_vendor_slot_table_exists(vendor_id)
         inserted_rows = VendorService.extend_vendor_slot_window(vendor_id, start_date, end_date)
-        healed_rows = VendorService.reconcile_vendor_slot_capacity_window(vendor_id, start_date, end_date)
+        healed_rows = VendorService.reconcile_vendor_slot_capacity_window(vendor_id, start_date, end_date, only_changed=only_changed)
         db.session.commit()
         return jsonify({
             "success": True,
@@ -2337,11 +2812,114 @@ def cron_extend_slots_for_vendor(vendor_id):
         return jsonify({"success": False, "message": "Failed to ensure slots", "error": str(e)}), 500
 
 
+def _extend_slots_for_vendors_in_chunks(vendor_ids, start_date, end_date, window_days, chunk_size, only_changed=False):
+    """
+    Bulk mode for the all-cafes cron: table existence is resolved once for the run,
+    each chunk's inserts and heals are sent as one batched statement each, and
+    every chunk commits on its own so locks are held only for that chunk.
+    A failing chunk is retried vendor-by-vendor so one bad table cannot sink the rest.
+    """
+    run_started = time.perf_counter()
+    results = []
+    chunks = []
+    inserted_rows_total = 0
+    healed_rows_total = 0
+
+    existing_tables = VendorService.existing_vendor_slot_tables()
+
+    for offset in range(0, len(vendor_ids), chunk_size):
+        chunk = vendor_ids[offset:offset + chunk_size]
+        chunk_started = time.perf_counter()
+        chunk_ok = True
+
+        for v_id in chunk:
+            if v_id not in existing_tables:
+                try:
+                    VendorService.create_vendor_slot_table(v_id)
+                    existing_tables.add(v_id)
+                except Exception as create_exc:
+                    db.session.rollback()
+                    current_app.logger.error(f"[cron bulk] vendor_id={v_id} slot table create failed: {create_exc}")
+
+        ready = [v_id for v_id in chunk if v_id in existing_tables]
+        for v_id in chunk:
+            if v_id not in existing_tables:
+                results.append({"vendor_id": int(v_id), "success": False, "error": "slot table unavailable"})
+
+        try:
+            inserted_map = VendorService.extend_slot_windows_bulk(ready, start_date, end_date)
+            healed_map = VendorService.reconcile_slot_capacity_windows_bulk(ready, start_date, end_date, only_changed=only_changed)
+            db.session.commit()
+            for v_id in ready:
+                inserted_rows_total += inserted_map.get(v_id, 0)
+                healed_rows_total += healed_map.get(v_id, 0)
+                results.append({
+                    "vendor_id": int(v_id),
+                    "success": True,
+                    "inserted_rows": inserted_map.get(v_id, 0),
+                    "healed_rows": healed_map.get(v_id, 0),
+                })
+        except Exception as chunk_exc:
+            db.session.rollback()
+            chunk_ok = False
+            current_app.logger.error(
+                f"[cron bulk] chunk starting at vendor_id={chunk[0]} failed, retrying per vendor: {chunk_exc}",
+                exc_info=True
+            )
+            for v_id in ready:
+                try:
+                    inserted_rows = VendorService.extend_vendor_slot_window(v_id, start_date, end_date)
+                    healed_rows = VendorService.reconcile_vendor_slot_capacity_window(v_id, start_date, end_date, only_changed=only_changed)
+                    db.session.commit()
+                    inserted_rows_total += int(inserted_rows)
+                    healed_rows_total += int(healed_rows)
+                    results.append({
+                        "vendor_id": int(v_id),
+                        "success": True,
+                        "inserted_rows": int(inserted_rows),
+                        "healed_rows": int(healed_rows),
+                    })
+                except Exception as vendor_exc:
+                    db.session.rollback()
+                    results.append({"vendor_id": int(v_id), "success": False, "error": str(vendor_exc)})
+
+        chunks.append({
+            "first_vendor_id": int(chunk[0]),
+            "last_vendor_id": int(chunk[-1]),
+            "vendors": len(chunk),
+            "batched": chunk_ok,
+            "elapsed_ms": round((time.perf_counter() - chunk_started) * 1000, 2),
+        })
+
+    return jsonify({
+        "success": True,
+        "message": "Slot window ensured for active cafes",
+        "mode": "bulk",
+        "window_days": window_days,
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "processed_vendors": len(vendor_ids),
+        "chunk_size": chunk_size,
+        "inserted_rows_total": int(inserted_rows_total),
+        "healed_rows_total": int(healed_rows_total),
+        "elapsed_ms": round((time.perf_counter() - run_started) * 1000, 2),
+        "chunks": chunks,
+        "results": results,
+    }), 200
+
+
 @vendor_bp.route('/cron/slots/active-cafes/next-20-days', methods=['POST'])
 def cron_extend_slots_for_all_active_cafes():
     """
     Cron endpoint: ensure next N days slots exist for all active cafes (default 20).
     Safe to call every EOD; duplicate slot rows are not created.
+    Payload (optional):
+    {
+      "window_days": 20,
+      "bulk": true,        // chunked mode: batched statements + one commit per chunk
+      "chunk_size": 25,    // vendors per chunk in bulk mode (1..500)
+      "only_changed": true // heal only rows whose capacity drifted
+    }
     """
     if not _is_valid_cron_request():
         return jsonify({"success": False, "message": "Unauthorized"}), 401
@@ -2352,6 +2930,15 @@ def cron_extend_slots_for_all_active_cafes():
     except (TypeError, ValueError):
         return jsonify({"success": False, "message": "window_days must be an integer"}), 400
 
+    bulk_mode = str(payload.get("bulk", "")).strip().lower() in {"1", "true", "yes", "y"}
+    only_changed = str(payload.get("only_changed", "")).strip().lower() in {"1", "true", "yes", "y"}
+    try:
+        chunk_size = int(payload.get("chunk_size", SLOT_CRON_CHUNK_SIZE))
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "message": "chunk_size must be an integer"}), 400
+    if chunk_size < 1 or chunk_size > 500:
+        return jsonify({"success": False, "message": "chunk_size must be between 1 and 500"}), 400
+
     if window_days < 1 or window_days > 365:
         return jsonify({"success": False, "message": "window_days must be between 1 and 365"}), 400
 
@@ -2371,6 +2958,33 @@ def cron_extend_slots_for_all_active_cafes():
             "results": [],
         }), 200
 
+    if SlotInventoryStore.is_shared():
+        # Shared inventory: one set-based statement per phase for every active cafe.
+        try:
+            SlotInventoryStore.ensure_shared_tables()
+            inserted_rows_total = SlotInventoryStore.extend_window_for_vendors(vendor_ids, start_date, end_date)
+            healed_rows_total = SlotInventoryStore.reconcile_window_for_vendors(vendor_ids, start_date, end_date, only_changed=only_changed)
+            db.session.commit()
+            return jsonify({
+                "success": True,
+                "message": "Slot window ensured for active cafes",
+                "backend": "shared",
+                "window_days": window_days,
+                "start_date": start_date.isoformat(),
+                "end_date": end_date.isoformat(),
+                "processed_vendors": len(vendor_ids),
+                "inserted_rows_total": int(inserted_rows_total),
+                "healed_rows_total": int(healed_rows_total),
+                "results": [],
+            }), 200
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"[cron_extend_slots_for_all_active_cafes] shared backend error={e}", exc_info=True)
+            return jsonify({"success": False, "message": "Failed to ensure slots", "error": str(e)}), 500
+
+    if bulk_mode:
+        return _extend_slots_for_vendors_in_chunks(vendor_ids, start_date, end_date, window_days, chunk_size, only_changed)
+
     results = []
     inserted_rows_total = 0
     healed_rows_total = 0
@@ -2380,7 +2994,7 @@ def cron_extend_slots_for_all_active_cafes():
             try:
                 _ensure_vendor_slot_table_exists(v_id)
                 inserted_rows = VendorService.extend_vendor_slot_window(v_id, start_date, end_date)
-                healed_rows = VendorService.reconcile_vendor_slot_capacity_window(v_id, start_date, end_date)
+                healed_rows = VendorService.reconcile_vendor_slot_capacity_window(v_id, start_date, end_date, only_changed=only_changed)
                 inserted_rows_total += int(inserted_rows)
                 healed_rows_total += int(healed_rows)
                 results.append({
@@ -2417,3 +3031,278 @@ def cron_extend_slots_for_all_active_cafes():
         db.session.rollback()
         current_app.logger.error(f"[cron_extend_slots_for_all_active_cafes] error={e}", exc_info=True)
         return jsonify({"success": False, "message": "Failed to ensure slots", "error": str(e)}), 500
+
+
+@vendor_bp.route('/internal/catalogue/invalidate', methods=['POST'])
+def invalidate_catalogue_cache():
+    """
+    Internal hook for sibling services (dashboard) that own amenity, payment-method
+    and subscription writes: bumps the catalogue version so getAllGamingCafe is rebuilt.
+    Payload (optional): {"reason": "amenities_updated", "vendor_id": 12}
+    """
+    if not _is_valid_cron_request():
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+
+    payload = request.get_json(silent=True) or {}
+    reason = str(payload.get("reason") or "external").strip()[:64]
+    vendor_id = payload.get("vendor_id")
+    version = CatalogueCache.bump(reason, vendor_id)
+    if version is None:
+        return jsonify({"success": False, "message": "Catalogue cache unavailable"}), 503
+    return jsonify({"success": True, "catalogue_version": version}), 200
+
+
+@vendor_bp.route('/internal/geo-index/vendors/<int:vendor_id>', methods=['POST'])
+def reindex_vendor_location(vendor_id):
+    """
+    Internal hook for address updates made outside this service: refreshes the
+    vendor's row in vendor_geo_index from its active physical_address.
+    """
+    if not _is_valid_cron_request():
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+    try:
+        indexed = GeoIndexService.reindex_vendor(vendor_id)
+        CatalogueCache.bump("address_updated", vendor_id)
+        return jsonify({"success": True, "vendor_id": vendor_id, "indexed": indexed}), 200
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"[reindex_vendor_location] vendor_id={vendor_id} error={e}", exc_info=True)
+        return jsonify({"success": False, "message": "Failed to reindex vendor", "error": str(e)}), 500
+
+
+@vendor_bp.route('/cron/geo-index/rebuild', methods=['POST'])
+def cron_rebuild_geo_index():
+    """Cron/backfill endpoint: rebuild vendor_geo_index from all active addresses."""
+    if not _is_valid_cron_request():
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+    try:
+        result = GeoIndexService.rebuild()
+        return jsonify({"success": True, **result}), 200
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"[cron_rebuild_geo_index] error={e}", exc_info=True)
+        return jsonify({"success": False, "message": "Failed to rebuild geo index", "error": str(e)}), 500
+
+
+@vendor_bp.route('/cron/slot-inventory/migrate', methods=['POST'])
+def cron_migrate_slot_inventory():
+    """
+    Copy legacy VENDOR_<id>_SLOT / _CONSOLE_AVAILABILITY / _DASHBOARD / _PROMO_DETAIL
+    tables into the shared slot-inventory tables. Idempotent per vendor; legacy
+    tables are kept so SLOT_INVENTORY_BACKEND can be flipped back.
+    Payload (optional): {"vendor_ids": [1, 2, 3]}  // defaults to every vendor with legacy tables
+    """
+    if not _is_valid_cron_request():
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+
+    payload = request.get_json(silent=True) or {}
+    vendor_ids = payload.get("vendor_ids")
+    if vendor_ids is not None:
+        if not isinstance(vendor_ids, list):
+            return jsonify({"success": False, "message": "vendor_ids must be a list"}), 400
+        try:
+            vendor_ids = [int(v) for v in vendor_ids]
+        except (TypeError, ValueError):
+            return jsonify({"success": False, "message": "vendor_ids must be integers"}), 400
+
+    try:
+        SlotInventoryStore.ensure_shared_tables()
+        summary = SlotInventoryStore.migrate_all(vendor_ids)
+        return jsonify({"success": summary["failed_vendors"] == 0, **summary}), 200
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"[cron_migrate_slot_inventory] error={e}", exc_info=True)
+        return jsonify({"success": False, "message": "Slot inventory migration failed", "error": str(e)}), 500
+
+
+@vendor_bp.route('/internal/slots/booking-events', methods=['POST'])
+def apply_slot_booking_events():
+    """
+    Incremental capacity hook for the booking service: applies ±1 to the booked
+    (slot_id, date) row on confirm/cancel/complete. Replays are no-ops.
+    Payload: {"event": "confirmed", "booking_id": 42, "vendor_id": 7, "slot_id": 3, "date": "2025-01-31"}
+             or {"events": [...]}; vendor_id/slot_id/date are optional.
+    """
+    if not _is_valid_cron_request():
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+
+    payload = request.get_json(silent=True) or {}
+    events = payload.get("events") if "events" in payload else [payload]
+    if not isinstance(events, list) or not events:
+        return jsonify({"success": False, "message": "events must be a non-empty list"}), 400
+
+    results = []
+    for item in events:
+        if not isinstance(item, dict) or item.get("booking_id") is None:
+            results.append({"success": False, "error": "booking_id is required"})
+            continue
+        try:
+            outcome = SlotCapacityService.apply_booking_event(
+                item.get("event"),
+                int(item["booking_id"]),
+                vendor_id=int(item["vendor_id"]) if item.get("vendor_id") is not None else None,
+                slot_id=int(item["slot_id"]) if item.get("slot_id") is not None else None,
+                date=item.get("date"),
+            )
+            db.session.commit()
+            results.append({"success": True, **outcome})
+        except (TypeError, ValueError) as e:
+            db.session.rollback()
+            results.append({"success": False, "booking_id": item.get("booking_id"), "error": str(e)})
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(
+                f"[apply_slot_booking_events] booking_id={item.get('booking_id')} error={e}", exc_info=True
+            )
+            results.append({"success": False, "booking_id": item.get("booking_id"), "error": str(e)})
+
+    failed = sum(1 for r in results if not r["success"])
+    return jsonify({"success": failed == 0, "processed": len(results), "failed": failed, "results": results}), 200
+
+
+@vendor_bp.route('/cron/slots/capacity/verify', methods=['POST'])
+def cron_verify_slot_capacity():
+    """
+    Nightly drift check for incrementally maintained capacity: compares each active
+    cafe's slot rows against its confirmed/current bookings and reports mismatches.
+    Payload (optional):
+    {
+      "window_days": 20,
+      "vendor_ids": [1, 2],  // defaults to all active cafes
+      "heal": false,         // rewrite only the drifted rows of vendors with drift
+      "sample_limit": 20     // drifted rows returned per vendor
+    }
+    """
+    if not _is_valid_cron_request():
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+
+    payload = request.get_json(silent=True) or {}
+    heal = str(payload.get("heal", "")).strip().lower() in {"1", "true", "yes", "y"}
+    try:
+        window_days = int(payload.get("window_days", FUTURE_WINDOW_DAYS))
+        sample_limit = int(payload.get("sample_limit", 20))
+        vendor_ids = payload.get("vendor_ids")
+        vendor_ids = [int(v) for v in vendor_ids] if vendor_ids is not None else _fetch_active_vendor_ids_for_slots()
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "message": "window_days, sample_limit and vendor_ids must be integers"}), 400
+    if window_days < 1 or window_days > 365:
+        return jsonify({"success": False, "message": "window_days must be between 1 and 365"}), 400
+
+    start_date = date.today()
+    end_date = start_date + timedelta(days=window_days)
+    started = time.perf_counter()
+
+    results = []
+    drifted_vendors = 0
+    drifted_rows_total = 0
+    healed_rows_total = 0
+    for v_id in vendor_ids:
+        try:
+            drift = VendorService.verify_vendor_slot_capacity_window(v_id, start_date, end_date, sample_limit)
+            healed_rows = 0
+            if drift["drifted_rows"]:
+                drifted_vendors += 1
+                drifted_rows_total += drift["drifted_rows"]
+                current_app.logger.warning(
+                    f"[cron_verify_slot_capacity] vendor_id={v_id} drifted_rows={drift['drifted_rows']}"
+                )
+                if heal:
+                    healed_rows = VendorService.reconcile_vendor_slot_capacity_window(
+                        v_id, start_date, end_date, only_changed=True
+                    )
+                    db.session.commit()
+                    healed_rows_total += int(healed_rows)
+                results.append({"vendor_id": int(v_id), "success": True, "healed_rows": int(healed_rows), **drift})
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"[cron_verify_slot_capacity] vendor_id={v_id} error={e}", exc_info=True)
+            results.append({"vendor_id": int(v_id), "success": False, "error": str(e)})
+
+    return jsonify({
+        "success": all(r["success"] for r in results),
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "checked_vendors": len(vendor_ids),
+        "drifted_vendors": drifted_vendors,
+        "drifted_rows_total": drifted_rows_total,
+        "healed_rows_total": healed_rows_total,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        "results": results,
+    }), 200
+
+
+@vendor_bp.route('/internal/drive-client/stats', methods=['GET'])
+def drive_client_stats():
+    """Process-local Google Drive client counters (credential refreshes, services built)."""
+    if not _is_valid_cron_request():
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+    return jsonify({"success": True, **DriveClient.stats()}), 200
+
+
+@vendor_bp.route('/internal/mail-queue/stats', methods=['GET'])
+def mail_queue_stats():
+    """Outbound email queue depth by status and whether this process's worker is running."""
+    if not _is_valid_cron_request():
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+    try:
+        return jsonify({"success": True, **MailQueue.stats()}), 200
+    except Exception as e:
+        current_app.logger.error(f"[mail_queue_stats] error={e}")
+        return jsonify({"success": False, "message": "Failed to read mail queue", "error": str(e)}), 500
+
+
+@vendor_bp.route('/internal/mail-queue/<int:email_id>', methods=['GET'])
+def mail_queue_status(email_id):
+    """Delivery status of one queued email."""
+    if not _is_valid_cron_request():
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+    email = MailQueue.get(email_id)
+    if not email:
+        return jsonify({"success": False, "message": "Email not found"}), 404
+    return jsonify({"success": True, "email": email}), 200
+
+
+@vendor_bp.route('/cron/mail-queue/drain', methods=['POST'])
+def mail_queue_drain():
+    """
+    Deliver due emails from a cron caller, for deployments where
+    MAIL_QUEUE_WORKER_ENABLED is off. Optional JSON: max_batches.
+    """
+    if not _is_valid_cron_request():
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+    payload = request.get_json(silent=True) or {}
+    try:
+        max_batches = int(payload.get("max_batches") or 20)
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "message": "max_batches must be an integer"}), 400
+    try:
+        return jsonify({"success": True, **MailQueue.drain(max_batches=max_batches)}), 200
+    except Exception as e:
+        current_app.logger.error(f"[mail_queue_drain] error={e}", exc_info=True)
+        return jsonify({"success": False, "message": "Mail queue drain failed", "error": str(e)}), 500
+
+
+@vendor_bp.route('/cron/onboard/jobs/resume', methods=['POST'])
+def onboarding_jobs_resume():
+    """Restart onboarding jobs that never started or whose worker died; fail those out of attempts."""
+    if not _is_valid_cron_request():
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+    try:
+        outcome = OnboardingJobService.resume_stalled()
+        return jsonify({"success": True, **outcome}), 200
+    except Exception as e:
+        current_app.logger.error(f"[onboarding_jobs_resume] error={e}", exc_info=True)
+        return jsonify({"success": False, "message": "Onboarding job resume failed", "error": str(e)}), 500
+
+
+@vendor_bp.route('/cron/newsletters/resume', methods=['POST'])
+def newsletter_campaigns_resume():
+    """Restart newsletter campaigns that are queued, interrupted, or whose runner died."""
+    if not _is_valid_cron_request():
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+    try:
+        resumed = NewsletterCampaign.resume_stalled()
+        return jsonify({"success": True, "resumed": resumed}), 200
+    except Exception as e:
+        current_app.logger.error(f"[newsletter_campaigns_resume] error={e}", exc_info=True)
+        return jsonify({"success": False, "message": "Newsletter resume failed", "error": str(e)}), 500
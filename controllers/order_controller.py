@@ -14,6 +14,7 @@ from models.commission_ledger import CommissionLedger
 from models.communication import Communication
 from db.extensions import mail
 from services.order_notification import NotificationService
+from services.http_cache import build_etag, is_not_modified, not_modified_response, resource_version, with_etag
 from flask_mail import Message
 
 order_bp = Blueprint('order', __name__)
@@ -33,6 +34,15 @@ def _notify_store_updated(vendor_id: int | None = None) -> None:
 
 @order_bp.route('/vendor/products', methods=['GET'])
 def vendor_all_products():
+    version = resource_version("""
+        SELECT (SELECT COUNT(*) FROM products WHERE status = 'active'),
+               (SELECT MAX(updated_at) FROM products),
+               (SELECT MAX(updated_at) FROM collaborators)
+    """)
+    etag = build_etag("vendor_products", *version)
+    if is_not_modified(etag):
+        return not_modified_response(etag)
+
     products = Product.query.filter_by(status='active').all()
     res = []
     for p in products:
@@ -48,7 +58,7 @@ def vendor_all_products():
             'collaborator_brand': c.brand_name,
             'image_url': p.image_url,
         })
-    return jsonify(res), 200
+    return with_etag(jsonify(res), etag), 200
 
 
 
@@ -402,12 +402,16 @@ def preview_newsletter():
     content = str(data.get("content") or "").strip()
     mode = (data.get("mode") or "all").strip().lower()
     vendor_ids = data.get("vendor_ids") if isinstance(data.get("vendor_ids"), list) else None
+    statuses = data.get("statuses") if isinstance(data.get("statuses"), list) else None
+    subscription_states = data.get("subscription_states") if isinstance(data.get("subscription_states"), list) else None
 
     ok, message, payload = SuperAdminService.preview_newsletter(
         topic=topic,
         content=content,
         mode=mode,
         vendor_ids=vendor_ids,
+        statuses=statuses,
+        subscription_states=subscription_states,
     )
     if not ok:
         return jsonify({"success": False, "message": message, "details": payload}), 400
@@ -422,6 +426,8 @@ def send_newsletter():
     content = str(data.get("content") or "").strip()
     mode = (data.get("mode") or "all").strip().lower()
     vendor_ids = data.get("vendor_ids") if isinstance(data.get("vendor_ids"), list) else None
+    statuses = data.get("statuses") if isinstance(data.get("statuses"), list) else None
+    subscription_states = data.get("subscription_states") if isinstance(data.get("subscription_states"), list) else None
     sent_by = (data.get("sent_by") or "super_admin_dashboard").strip()
 
     ok, message, payload = SuperAdminService.send_newsletter(
@@ -430,12 +436,43 @@ def send_newsletter():
         mode=mode,
         vendor_ids=vendor_ids,
         sent_by=sent_by,
+        statuses=statuses,
+        subscription_states=subscription_states,
     )
     if not ok:
         return jsonify({"success": False, "message": message, "details": payload}), 400
     return jsonify({"success": True, "message": message, "data": payload}), 200
 
 
+@super_admin_bp.route('/admin/newsletters/<string:campaign_id>', methods=['GET'])
+@require_super_admin
+def newsletter_campaign_progress(campaign_id):
+    ok, message, payload = SuperAdminService.get_newsletter_campaign(campaign_id)
+    if not ok:
+        return jsonify({"success": False, "message": message}), 404
+    return jsonify({"success": True, "message": message, "data": payload}), 200
+
+
+@super_admin_bp.route('/admin/newsletters/<string:campaign_id>/resume', methods=['POST'])
+@require_super_admin
+def resume_newsletter_campaign(campaign_id):
+    ok, message, payload = SuperAdminService.resume_newsletter_campaign(campaign_id)
+    if not ok:
+        status = 404 if payload is None else 409
+        return jsonify({"success": False, "message": message, "details": payload}), status
+    return jsonify({"success": True, "message": message, "data": payload}), 200
+
+
+@super_admin_bp.route('/admin/onboarding-jobs/<string:job_id>/retry', methods=['POST'])
+@require_super_admin
+def retry_onboarding_job(job_id):
+    ok, message, payload = SuperAdminService.retry_onboarding_job(job_id)
+    if not ok:
+        status = 404 if payload is None else 409
+        return jsonify({"success": False, "message": message, "details": payload}), status
+    return jsonify({"success": True, "message": message, "data": payload}), 200
+
+
 @super_admin_bp.route('/admin/vendors/<int:vendor_id>/notifications/promotion/early-onboard', methods=['POST'])
 @require_super_admin
 def send_vendor_early_onboard_promotion(vendor_id):
@@ -519,9 +556,13 @@ def deboard_vendor_admin(vendor_id):
     try:
         from services.services import VendorService
 
-        VendorService.deboard_vendor(vendor_id)
-        db.session.commit()
-        return jsonify({"success": True, "message": f"Vendor {vendor_id} deboarded successfully"}), 200
+        report = VendorService.deboard_vendor(vendor_id)
+        return jsonify({
+            "success": True,
+            "message": f"Vendor {vendor_id} deboarded successfully",
+            "rows_removed": report["rows_removed"],
+            "dropped_tables": report["dropped_tables"],
+        }), 200
     except Exception as exc:
         db.session.rollback()
         current_app.logger.error(f"Failed to deboard vendor {vendor_id}: {exc}", exc_info=True)
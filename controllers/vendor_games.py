@@ -5,6 +5,7 @@ from services.supported_game_service import SupportedGameService
 from models.supportedGame import PlatformEnum
 from models.game import Game
 from services.game_service import GameService
+from services.http_cache import build_etag, is_not_modified, not_modified_response, resource_version, with_etag
 import json
 
 vendor_games_bp = Blueprint('vendor_games', __name__)
@@ -279,6 +280,7 @@ def create_games_batch():
                 trailer_url=game_data.get('trailer_url'),
                 multiplayer=game_data.get('multiplayer'),
                 esrb_rating=game_data.get('esrb_rating'),
+                refresh_top_games=False,
             )
             created_games.append(game.to_dict())
         except Exception as e:
@@ -288,6 +290,9 @@ def create_games_batch():
                 "error": str(e)
             })
 
+    if created_games:
+        GameService.refresh_top_games()
+
     response_payload = {
         "created_games": created_games,
         "errors": errors
@@ -300,10 +305,15 @@ def create_games_batch():
 @vendor_games_bp.route('/games', methods=['GET'])
 def get_all_games():
     try:
+        version = resource_version("SELECT COUNT(*), MAX(id), MAX(updated_at) FROM games")
+        etag = build_etag("games", *version)
+        if is_not_modified(etag):
+            return not_modified_response(etag)
+
         games = Game.query.all()
-        return jsonify({
+        return with_etag(jsonify({
             "games": [game.to_dict() for game in games]
-        }), 200
+        }), etag), 200
     except Exception as e:
         return jsonify({"message": f"Failed to fetch games: {str(e)}"}), 500
     
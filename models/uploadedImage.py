@@ -11,6 +11,10 @@ class Image(db.Model):
     url = Column(String(512), nullable=False)                # Cloudinary secure_url
     image_id = Column(String(255), nullable=False)  # Google Drive file ID
     path=Column(String(255), nullable=False)
+    # Upload-time size variants (services/image_pipeline.py); NULL for older images.
+    thumbnail_url = Column(String(512), nullable=True)
+    card_url = Column(String(512), nullable=True)
+    full_url = Column(String(512), nullable=True)
     uploaded_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationship
@@ -0,0 +1,220 @@
+# scripts/benchmark_email_templates.py
+"""
+Microbenchmark: compiled email templates vs the f-string builders they replaced.
+
+Checks that both produce identical HTML for plain values, then times the shared
+layout, the OTP email, an order items table and a newsletter fan-out
+(per-recipient rebuild vs render-once plus merge-token substitution). The
+compiled templates HTML-escape every value and the old builders did not, so
+small fragments with several values pay for escaping.
+
+    python -m scripts.benchmark_email_templates --iterations 20000 --recipients 2000
+"""
+
+import argparse
+import html
+import os
+import timeit
+
+from services.email_template import DEFAULT_HASH_LOGO, _extract_body, build_hfg_email_html
+from services.newsletter_campaign import merge_token, render_for
+from services.order_notification import ORDER_ITEMS_TABLE_TEMPLATE, ORDER_ITEM_ROW_TEMPLATE
+from services.otp_service import OTP_EMAIL_TEMPLATE
+from services.super_admin_service import SuperAdminService
+
+
+def _legacy_layout(subject, content_html, preview_text=""):
+    """build_hfg_email_html as it was before templates were compiled."""
+    safe_subject = html.escape(subject or "Hash For Gamers Update")
+    safe_preview = html.escape(preview_text or "")
+    logo_url = (os.getenv("HASH_EMAIL_LOGO_URL") or DEFAULT_HASH_LOGO).strip()
+    inner = _extract_body(content_html)
+    return f"""<!doctype html>
+<html>
+  <head>
+    <meta charset="UTF-8" />
+    <meta name="viewport" content="width=device-width, initial-scale=1.0" />
+    <title>{safe_subject}</title>
+  </head>
+  <body style="margin:0;padding:0;background:#050912;font-family:Arial,Helvetica,sans-serif;color:#e5e7eb;">
+    <div style="display:none;max-height:0;overflow:hidden;opacity:0;">{safe_preview}</div>
+    <table role="presentation" width="100%" cellpadding="0" cellspacing="0" style="padding:24px 12px;">
+      <tr>
+        <td align="center">
+          <table role="presentation" width="100%" cellpadding="0" cellspacing="0" style="max-width:700px;background:#0b1220;border:1px solid #1e2a44;border-radius:12px;overflow:hidden;">
+            <tr>
+              <td style="padding:20px 24px;background:linear-gradient(180deg,#040915,#0b1220);color:#ffffff;">
+                <img src="{html.escape(logo_url)}" alt="Hash For Gamers" style="display:block;height:52px;width:auto;margin:0 0 10px 0;border-radius:10px;" />
+                <div style="font-size:12px;letter-spacing:.08em;text-transform:uppercase;color:#22c55e;font-weight:700;">Hash For Gamers</div>
+                <div style="margin-top:8px;font-size:22px;line-height:1.35;font-weight:700;">{safe_subject}</div>
+              </td>
+            </tr>
+            <tr>
+              <td style="padding:24px;color:#e5e7eb;">
+                {inner}
+              </td>
+            </tr>
+            <tr>
+              <td style="padding:14px 24px;border-top:1px solid #1e2a44;background:#091122;color:#94a3b8;font-size:12px;">
+                Need help? Contact <a href="mailto:support@hashforgamers.co.in" style="color:#60a5fa;text-decoration:none;">support@hashforgamers.co.in</a><br/>
+                © 2026 Hash For Gamers. All rights reserved.
+              </td>
+            </tr>
+          </table>
+        </td>
+      </tr>
+    </table>
+  </body>
+</html>"""
+
+
+def _legacy_otp(vendor_name, page_name, cafe_name, otp):
+    return f"""
+<p style="margin:0 0 12px 0;color:#e5e7eb;">Hello <strong>{vendor_name}</strong>,</p>
+<p style="margin:0 0 14px 0;color:#cbd5e1;line-height:1.7;">
+    You are trying to access <strong>{page_name}</strong> for <strong>{cafe_name}</strong>.
+    Please verify with the OTP below.
+</p>
+<div style="background:#0a1f45;border:1px solid #1d4ed8;border-radius:10px;padding:18px;text-align:center;margin:16px 0;">
+    <div style="color:#93c5fd;font-size:13px;margin-bottom:6px;">One-Time Password</div>
+    <div style="color:#ffffff;font-size:36px;letter-spacing:8px;font-weight:700;">{otp}</div>
+</div>
+<div style="background:#2b170a;border:1px solid #7c2d12;border-radius:8px;padding:12px;color:#fcd34d;line-height:1.65;">
+    <strong>Important:</strong>
+    <ul style="margin:8px 0 0 18px;padding:0;">
+        <li>This OTP is valid for 5 minutes.</li>
+        <li>Never share this OTP with anyone.</li>
+        <li>Hash For Gamers support will never ask for your OTP.</li>
+        <li>If you did not request this, you can ignore this email.</li>
+    </ul>
+</div>
+<p style="margin:14px 0 0 0;color:#94a3b8;font-size:12px;">
+    This is an automated security email from Hash For Gamers dashboard.
+</p>
+"""
+
+
+def _legacy_items_table(items):
+    head, _, tail = ORDER_ITEMS_TABLE_TEMPLATE.source.partition("{{ rows|raw }}")
+    table = head
+    for name, qty, price, subtotal in items:
+        table += f"""
+                <tr>
+                    <td style="border-bottom:1px solid #1e2a44; padding:8px; color:#e2e8f0;">{name}</td>
+                    <td style="border-bottom:1px solid #1e2a44; padding:8px; text-align:center; color:#e2e8f0;">{qty}</td>
+                    <td style="border-bottom:1px solid #1e2a44; padding:8px; text-align:right; color:#e2e8f0;">₹{float(price):.2f}</td>
+                    <td style="border-bottom:1px solid #1e2a44; padding:8px; text-align:right; color:#e2e8f0;">₹{float(subtotal):.2f}</td>
+                </tr>"""
+    table += tail
+    return table
+
+
+def _compiled_items_table(items):
+    return ORDER_ITEMS_TABLE_TEMPLATE.render(
+        rows="".join(
+            ORDER_ITEM_ROW_TEMPLATE.render(
+                name=name, quantity=qty, unit_price=f"{float(price):.2f}", subtotal=f"{float(subtotal):.2f}"
+            )
+            for name, qty, price, subtotal in items
+        )
+    )
+
+
+def _newsletter_args(i):
+    return {
+        "topic": "Weekend tournament",
+        "content": "Line one of the update.\nLine two with details.\nLine three.",
+        "owner_name": f"Owner {i}",
+        "cafe_name": f"Cafe {i}",
+        "recipient_email": f"owner{i}@example.invalid",
+        "support_email": "support@hashforgamers.co.in",
+        "dashboard_url": "https://dashboard.hashforgamers.com",
+    }
+
+
+def _newsletter_legacy(recipients):
+    for i in range(recipients):
+        _legacy_layout(
+            subject="Hash For Gamers · Weekend tournament",
+            content_html=SuperAdminService._build_newsletter_email_html(**_newsletter_args(i)),
+            preview_text="Weekend tournament",
+        )
+
+
+def _newsletter_template():
+    args = _newsletter_args(0)
+    args.update(owner_name=merge_token("owner_name"), cafe_name=merge_token("cafe_name"),
+                recipient_email=merge_token("recipient"))
+    return build_hfg_email_html(
+        subject="Hash For Gamers · Weekend tournament",
+        content_html=SuperAdminService._build_newsletter_email_html(**args),
+        preview_text="Weekend tournament",
+    )
+
+
+def _newsletter_compiled(recipients):
+    template = _newsletter_template()
+    for i in range(recipients):
+        render_for(template, {"owner_name": f"Owner {i}", "cafe_name": f"Cafe {i}",
+                              "recipient": f"owner{i}@example.invalid"}, escape=True)
+
+
+def _report(label, legacy_seconds, compiled_seconds, count):
+    print(
+        f"{label:<22} legacy={legacy_seconds * 1e6 / count:8.2f}us  "
+        f"compiled={compiled_seconds * 1e6 / count:8.2f}us  "
+        f"speedup={legacy_seconds / compiled_seconds:5.2f}x"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--recipients", type=int, default=2000)
+    parser.add_argument("--items", type=int, default=25, help="rows in the order items table")
+    args = parser.parse_args()
+
+    otp_args = {"vendor_name": "Owner", "page_name": "Bank Transfer", "cafe_name": "Cafe", "otp": "123456"}
+    items = [(f"Product {i}", i + 1, 99.5, 99.5 * (i + 1)) for i in range(args.items)]
+    fragment = OTP_EMAIL_TEMPLATE.render(**otp_args)
+
+    # Parity first: the compiled path must render the same bytes.
+    assert build_hfg_email_html("Subject", fragment, "Preview") == _legacy_layout("Subject", fragment, "Preview")
+    assert OTP_EMAIL_TEMPLATE.render(**otp_args) == _legacy_otp(**otp_args)
+    assert _compiled_items_table(items) == _legacy_items_table(items)
+    assert render_for(_newsletter_template(), {"owner_name": "Owner 1", "cafe_name": "Cafe 1",
+                                               "recipient": "owner1@example.invalid"}, escape=True) == _legacy_layout(
+        subject="Hash For Gamers · Weekend tournament",
+        content_html=SuperAdminService._build_newsletter_email_html(**_newsletter_args(1)),
+        preview_text="Weekend tournament",
+    )
+
+    n = args.iterations
+    _report(
+        "layout",
+        timeit.timeit(lambda: _legacy_layout("Subject", fragment, "Preview"), number=n),
+        timeit.timeit(lambda: build_hfg_email_html("Subject", fragment, "Preview"), number=n),
+        n,
+    )
+    _report(
+        "otp email",
+        timeit.timeit(lambda: _legacy_layout("OTP", _legacy_otp(**otp_args), "otp"), number=n),
+        timeit.timeit(lambda: build_hfg_email_html("OTP", OTP_EMAIL_TEMPLATE.render(**otp_args), "otp"), number=n),
+        n,
+    )
+    _report(
+        f"order items x{args.items}",
+        timeit.timeit(lambda: _legacy_items_table(items), number=n),
+        timeit.timeit(lambda: _compiled_items_table(items), number=n),
+        n,
+    )
+    _report(
+        f"newsletter x{args.recipients}",
+        timeit.timeit(lambda: _newsletter_legacy(args.recipients), number=1),
+        timeit.timeit(lambda: _newsletter_compiled(args.recipients), number=1),
+        args.recipients,
+    )
+
+
+if __name__ == "__main__":
+    main()
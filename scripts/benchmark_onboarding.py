@@ -0,0 +1,98 @@
+# scripts/benchmark_onboarding.py
+"""
+Round-trip benchmark for VendorService.onboard_vendor.
+
+Onboards synthetic cafes against the configured database (use a dev/staging DB),
+reports DB round trips and wall time per onboarding, then deboards each vendor.
+
+    python -m scripts.benchmark_onboarding --runs 5 --consoles 8
+"""
+
+import argparse
+import statistics
+import time
+import uuid
+
+from sqlalchemy import text
+
+from app import create_app
+from db.extensions import db
+from services.onboarding_writer import count_round_trips
+from services.services import VendorService
+
+
+def _payload(tag, consoles_per_game):
+    return {
+        "cafe_name": f"Benchmark Cafe {tag}",
+        "owner_name": "Benchmark Owner",
+        "description": "onboarding round-trip benchmark",
+        "vendor_account_email": f"bench+{tag}@example.invalid",
+        "contact_info": {"email": f"bench+{tag}@example.invalid", "phone": "0000000000"},
+        "physicalAddress": {
+            "address_type": "business",
+            "addressLine1": "1 Benchmark Street",
+            "addressLine2": "",
+            "pincode": "000000",
+            "state": "Benchmark",
+            "country": "India",
+            "latitude": "12.9716",
+            "longitude": "77.5946",
+        },
+        "business_registration_details": {"registration_number": f"BENCH-{tag}", "registration_date": "2024-01-01"},
+        "timing": {"opening_time": "10:00 AM", "closing_time": "11:00 PM"},
+        "opening_day": {day: True for day in ("mon", "tue", "wed", "thu", "fri", "sat", "sun")},
+        "amenities": {"Parking": True, "washroom": True},
+        "available_games": {
+            name: {"total_slot": consoles_per_game, "single_slot_price": 100}
+            for name in ("pc", "ps5", "xbox", "vr")
+        },
+        "slot_duration": 30,
+    }
+
+
+def _cleanup(vendor_id, account_email):
+    VendorService.deboard_vendor(vendor_id)
+    db.session.execute(
+        text(
+            """
+            DELETE FROM vendor_accounts a
+            WHERE lower(a.email) = :email
+              AND NOT EXISTS (SELECT 1 FROM vendors v WHERE v.account_id = a.id)
+            """
+        ),
+        {"email": account_email},
+    )
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--consoles", type=int, default=8, help="consoles (slots) per game type")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        trips, timings = [], []
+        for _ in range(args.runs):
+            payload = _payload(uuid.uuid4().hex[:10], args.consoles)
+            started = time.perf_counter()
+            with count_round_trips() as stats:
+                vendor = VendorService.onboard_vendor(payload, {}, defer_vendor_tables=True)
+            timings.append((time.perf_counter() - started) * 1000)
+            trips.append(stats["round_trips"])
+            print(
+                f"vendor={vendor.id} round_trips={stats['round_trips']} "
+                f"statements={stats['statements']} commits={stats['commits']} ms={timings[-1]:.1f}"
+            )
+            _cleanup(vendor.id, payload["vendor_account_email"])
+
+        print(
+            f"runs={args.runs} consoles={args.consoles * 4} "
+            f"round_trips median={statistics.median(trips)} max={max(trips)} "
+            f"ms median={statistics.median(timings):.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# services/catalogue_cache.py
+
+import os
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from flask import current_app
+
+from db.extensions import redis_client
+from services.http_cache import build_etag
+
+CATALOGUE_VERSION_KEY = "hfg:catalogue:version"
+GAMING_CAFE_CACHE_PREFIX = "hfg:catalogue:gaming_cafe"
+GAMING_CAFE_CACHE_TTL_SECONDS = int(os.getenv("GAMING_CAFE_CACHE_TTL_SECONDS", "300"))
+GAMING_CAFE_CACHE_ENABLED = str(os.getenv("GAMING_CAFE_CACHE_ENABLED", "true")).strip().lower() in {"1", "true", "yes", "y", "on"}
+
+
+class CatalogueCache:
+    """
+    Redis cache for the serialized cafe catalogue (getAllGamingCafe).
+
+    Entries are keyed by a catalogue version number. Write paths that change
+    listing data call `bump()`, which moves readers onto a fresh key space; stale
+    entries are never deleted explicitly and simply expire through their TTL.
+    Redis failures never break the listing, they only bypass the cache.
+    """
+
+    @staticmethod
+    def current_version():
+        try:
+            raw = redis_client.get(CATALOGUE_VERSION_KEY)
+            return int(raw or 0)
+        except Exception as exc:
+            current_app.logger.warning("Catalogue version read failed: %s", exc)
+            return None
+
+    @staticmethod
+    def bump(reason: str = "", vendor_id=None):
+        """Invalidate every cached listing by incrementing the catalogue version."""
+        try:
+            version = int(redis_client.incr(CATALOGUE_VERSION_KEY))
+            current_app.logger.info(
+                "Catalogue version bumped to %s (reason=%s vendor_id=%s)", version, reason or "-", vendor_id
+            )
+            return version
+        except Exception as exc:
+            current_app.logger.warning("Catalogue version bump failed (reason=%s): %s", reason or "-", exc)
+            return None
+
+    @staticmethod
+    def _listing_key(version: int, variant: str) -> str:
+        # Listing embeds "today's" hours, so the IST day is part of the key.
+        day_key = datetime.now(ZoneInfo("Asia/Kolkata")).strftime("%Y%m%d")
+        return f"{GAMING_CAFE_CACHE_PREFIX}:v{version}:{day_key}:{variant}"
+
+    @staticmethod
+    def get_or_build(variant: str, builder):
+        """
+        Return the serialized listing for `variant`, calling `builder()` on a miss.
+        `builder` must return the JSON string to cache.
+        """
+        if not GAMING_CAFE_CACHE_ENABLED:
+            return builder()
+
+        version = CatalogueCache.current_version()
+        if version is None:
+            return builder()
+
+        key = CatalogueCache._listing_key(version, variant)
+        try:
+            cached = redis_client.get(key)
+            if cached is not None:
+                return cached
+        except Exception as exc:
+            current_app.logger.warning("Catalogue cache read failed for %s: %s", key, exc)
+            return builder()
+
+        body = builder()
+        try:
+            redis_client.setex(key, GAMING_CAFE_CACHE_TTL_SECONDS, body)
+        except Exception as exc:
+            current_app.logger.warning("Catalogue cache write failed for %s: %s", key, exc)
+        return body
+
+    @staticmethod
+    def etag(variant: str):
+        """
+        Strong ETag for a listing variant, or None when the version is unavailable.
+        The TTL bucket makes time-driven changes (subscription expiry) visible at the
+        same cadence as the cached body.
+        """
+        version = CatalogueCache.current_version()
+        if version is None:
+            return None
+        day_key = datetime.now(ZoneInfo("Asia/Kolkata")).strftime("%Y%m%d")
+        ttl_bucket = int(time.time() // max(GAMING_CAFE_CACHE_TTL_SECONDS, 1))
+        return build_etag("gaming_cafe", version, day_key, ttl_bucket, variant)
@@ -15,6 +15,8 @@ import time
 import hashlib
 import hmac
 
+from services.upload_streams import cloudinary_upload, stream_size
+
 class CloudinaryGameImageService:
     """
     Service for handling game cover images
@@ -74,9 +76,7 @@ class CloudinaryGameImageService:
             
             # Check file size (prevent large file issues)
             try:
-                cover_image_file.seek(0, 2)  # Seek to end
-                file_size = cover_image_file.tell()
-                cover_image_file.seek(0)  # Reset to beginning
+                file_size = stream_size(cover_image_file)
                 
                 current_app.logger.info(f"File size: {file_size} bytes")
                 
@@ -108,7 +108,7 @@ class CloudinaryGameImageService:
             current_app.logger.info(f"Uploading to Cloudinary with public_id: {public_id}")
             
             # FIXED UPLOAD - Removed invalid format="auto" parameter
-            upload_result = cloudinary.uploader.upload(
+            upload_result = cloudinary_upload(
                 cover_image_file,
                 folder="POC",  # Senior's specified folder
                 public_id=public_id,
@@ -219,7 +219,7 @@ class CloudinaryGameImageService:
                 }
             
             # Minimal upload - just upload to poc folder with no extra parameters
-            upload_result = cloudinary.uploader.upload(
+            upload_result = cloudinary_upload(
                 cover_image_file,
                 folder="POC"
             )
@@ -359,9 +359,25 @@ class CloudinaryGameImageService:
       
     
     @staticmethod
-    def upload_vendor_document(document_file, cafe_name, document_type, vendor_id):
+    def delete_vendor_document(public_id, resource_type='image'):
+        """
+        Delete an uploaded vendor document. `resource_type` must be the one Cloudinary
+        reported on upload (documents uploaded with resource_type="auto" may be
+        "image" or "raw"); a "not found" result counts as a failure here.
+        """
+        try:
+            result = cloudinary.uploader.destroy(public_id, resource_type=resource_type or 'image', invalidate=True)
+        except Exception as e:
+            return {'success': False, 'error': f'Cloudinary deletion error: {str(e)}'}
+        if result.get('result') == 'ok':
+            return {'success': True, 'result': result}
+        return {'success': False, 'error': f"Cloudinary delete returned {result.get('result')!r}", 'result': result}
+
+    @staticmethod
+    def upload_vendor_document(document_file, cafe_name, document_type, vendor_id, timeout=None):
         """
         Upload vendor documents (PDFs and other files) to Cloudinary
+        `timeout` (seconds) bounds the HTTP call to Cloudinary when given.
         """
         try:
             if not document_file or document_file.filename == '':
@@ -388,13 +404,17 @@ class CloudinaryGameImageService:
             current_app.logger.info(f"Uploading document to Cloudinary: {folder_path}/{public_id}")
             
             # Upload document to Cloudinary
-            upload_result = cloudinary.uploader.upload(
+            upload_options = {}
+            if timeout:
+                upload_options["timeout"] = timeout
+            upload_result = cloudinary_upload(
                 document_file,
                 folder=folder_path,
                 public_id=public_id,
                 resource_type="auto",
                 overwrite=False,
-                quality="auto:best"
+                quality="auto:best",
+                **upload_options
             )
 
             if 'secure_url' in upload_result and 'public_id' in upload_result:
@@ -403,6 +423,7 @@ class CloudinaryGameImageService:
                     'success': True,
                     'url': upload_result['secure_url'],
                     'public_id': upload_result['public_id'],
+                    'resource_type': upload_result.get('resource_type', 'image'),
                     'error': None
                 }
             else:
@@ -455,7 +476,7 @@ class CloudinaryGameImageService:
 
             current_app.logger.info(f"Uploading collaborator product image to Cloudinary folder: {folder_path} with public_id: {public_id}")
 
-            upload_result = cloudinary.uploader.upload(
+            upload_result = cloudinary_upload(
                 image_file,
                 folder=folder_path,
                 public_id=public_id,
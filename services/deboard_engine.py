@@ -0,0 +1,230 @@
+# services/deboard_engine.py
+
+from flask import current_app
+from sqlalchemy import text
+
+from db.extensions import db
+from services.slot_inventory import SlotInventoryStore, LEGACY_TABLE_PATTERNS, SLOT, CONSOLE_AVAILABILITY, DASHBOARD, PROMO_DETAIL
+
+# Per-vendor dynamic tables dropped together at the end of a deboard.
+DEBOARD_DYNAMIC_KINDS = (SLOT, CONSOLE_AVAILABILITY, DASHBOARD, PROMO_DETAIL)
+
+# One statement removes the whole vendor graph. Every id set is derived server-side
+# from the snapshot the statement starts with, so nothing is fetched into Python.
+# Each table is deleted by exactly one CTE (Postgres forbids touching a row twice in
+# one statement); NO ACTION foreign keys are checked once the statement finishes, so
+# the order of the CTEs does not matter.
+_DEBOARD_SQL = """
+WITH target AS (
+    SELECT id, timing_id, business_registration_id
+    FROM vendors
+    WHERE id = :vendor_id
+),
+game_ids AS (
+    SELECT id FROM available_games WHERE vendor_id = :vendor_id
+),
+slot_ids AS (
+    SELECT s.id FROM slots s JOIN game_ids g ON g.id = s.gaming_type_id
+),
+booking_ids AS (
+    SELECT b.id FROM bookings b JOIN slot_ids s ON s.id = b.slot_id
+),
+transaction_ids AS (
+    SELECT t.id
+    FROM transactions t
+    WHERE t.vendor_id = :vendor_id
+       OR t.booking_id IN (SELECT id FROM booking_ids)
+),
+console_ids AS (
+    SELECT id FROM consoles WHERE vendor_id = :vendor_id
+),
+menu_ids AS (
+    SELECT m.id
+    FROM extra_service_menus m
+    JOIN extra_service_categories c ON c.id = m.category_id
+    WHERE c.vendor_id = :vendor_id
+),
+d_payment_transaction_mappings AS (
+    DELETE FROM payment_transaction_mappings
+    WHERE transaction_id IN (SELECT id FROM transaction_ids)
+    RETURNING 1
+),
+d_transactions AS (
+    DELETE FROM transactions WHERE id IN (SELECT id FROM transaction_ids) RETURNING 1
+),
+d_booking_queue AS (
+    DELETE FROM booking_queue
+    WHERE booking_id IN (SELECT id FROM booking_ids)
+       OR game_id IN (SELECT id FROM game_ids)
+    RETURNING 1
+),
+d_bookings AS (
+    DELETE FROM bookings WHERE id IN (SELECT id FROM booking_ids) RETURNING 1
+),
+d_slots AS (
+    DELETE FROM slots WHERE id IN (SELECT id FROM slot_ids) RETURNING 1
+),
+d_available_game_console AS (
+    DELETE FROM available_game_console
+    WHERE available_game_id IN (SELECT id FROM game_ids)
+       OR console_id IN (SELECT id FROM console_ids)
+    RETURNING 1
+),
+d_vendor_games AS (
+    DELETE FROM vendor_games WHERE vendor_id = :vendor_id RETURNING 1
+),
+d_hardware_specifications AS (
+    DELETE FROM hardware_specifications WHERE console_id IN (SELECT id FROM console_ids) RETURNING 1
+),
+d_maintenance_status AS (
+    DELETE FROM maintenance_status WHERE console_id IN (SELECT id FROM console_ids) RETURNING 1
+),
+d_price_and_cost AS (
+    DELETE FROM price_and_cost WHERE console_id IN (SELECT id FROM console_ids) RETURNING 1
+),
+d_additional_details AS (
+    DELETE FROM additional_details WHERE console_id IN (SELECT id FROM console_ids) RETURNING 1
+),
+d_consoles AS (
+    DELETE FROM consoles WHERE id IN (SELECT id FROM console_ids) RETURNING 1
+),
+d_available_games AS (
+    DELETE FROM available_games WHERE id IN (SELECT id FROM game_ids) RETURNING 1
+),
+d_amenities AS (
+    DELETE FROM amenities WHERE vendor_id = :vendor_id RETURNING 1
+),
+d_opening_days AS (
+    DELETE FROM opening_days WHERE vendor_id = :vendor_id RETURNING 1
+),
+d_physical_address AS (
+    DELETE FROM physical_address WHERE parent_id = :vendor_id AND parent_type = 'vendor' RETURNING 1
+),
+d_contact_info AS (
+    DELETE FROM contact_info WHERE parent_id = :vendor_id AND parent_type = 'vendor' RETURNING 1
+),
+d_vendor_pins AS (
+    DELETE FROM vendor_pins WHERE vendor_id = :vendor_id RETURNING 1
+),
+d_documents AS (
+    DELETE FROM documents WHERE vendor_id = :vendor_id RETURNING 1
+),
+d_documents_submitted AS (
+    DELETE FROM documents_submitted WHERE vendor_id = :vendor_id RETURNING 1
+),
+d_images AS (
+    DELETE FROM images WHERE vendor_id = :vendor_id RETURNING 1
+),
+d_password_manager AS (
+    DELETE FROM password_manager WHERE parent_id = :vendor_id AND parent_type = 'vendor' RETURNING 1
+),
+d_payment_vendor_map AS (
+    DELETE FROM payment_vendor_map WHERE vendor_id = :vendor_id RETURNING 1
+),
+d_vendor_statuses AS (
+    DELETE FROM vendor_statuses WHERE vendor_id = :vendor_id RETURNING 1
+),
+d_extra_service_menu_images AS (
+    DELETE FROM extra_service_menu_images WHERE menu_id IN (SELECT id FROM menu_ids) RETURNING 1
+),
+d_extra_service_menus AS (
+    DELETE FROM extra_service_menus WHERE id IN (SELECT id FROM menu_ids) RETURNING 1
+),
+d_user_passes AS (
+    DELETE FROM user_passes
+    WHERE cafe_pass_id IN (SELECT id FROM cafe_passes WHERE vendor_id = :vendor_id)
+    RETURNING 1
+),
+d_cafe_passes AS (
+    DELETE FROM cafe_passes WHERE vendor_id = :vendor_id RETURNING 1
+),
+d_vendors AS (
+    DELETE FROM vendors WHERE id IN (SELECT id FROM target) RETURNING 1
+),
+d_timing AS (
+    DELETE FROM timing
+    WHERE id IN (SELECT timing_id FROM target)
+      AND NOT EXISTS (SELECT 1 FROM vendors v WHERE v.timing_id = timing.id AND v.id <> :vendor_id)
+    RETURNING 1
+),
+d_business_registration AS (
+    DELETE FROM business_registration
+    WHERE id IN (SELECT business_registration_id FROM target)
+      AND NOT EXISTS (
+          SELECT 1 FROM vendors v
+          WHERE v.business_registration_id = business_registration.id AND v.id <> :vendor_id
+      )
+    RETURNING 1
+)
+SELECT
+    (SELECT count(*) FROM d_payment_transaction_mappings) AS payment_transaction_mappings,
+    (SELECT count(*) FROM d_transactions) AS transactions,
+    (SELECT count(*) FROM d_booking_queue) AS booking_queue,
+    (SELECT count(*) FROM d_bookings) AS bookings,
+    (SELECT count(*) FROM d_slots) AS slots,
+    (SELECT count(*) FROM d_available_game_console) AS available_game_console,
+    (SELECT count(*) FROM d_vendor_games) AS vendor_games,
+    (SELECT count(*) FROM d_hardware_specifications) AS hardware_specifications,
+    (SELECT count(*) FROM d_maintenance_status) AS maintenance_status,
+    (SELECT count(*) FROM d_price_and_cost) AS price_and_cost,
+    (SELECT count(*) FROM d_additional_details) AS additional_details,
+    (SELECT count(*) FROM d_consoles) AS consoles,
+    (SELECT count(*) FROM d_available_games) AS available_games,
+    (SELECT count(*) FROM d_amenities) AS amenities,
+    (SELECT count(*) FROM d_opening_days) AS opening_days,
+    (SELECT count(*) FROM d_physical_address) AS physical_address,
+    (SELECT count(*) FROM d_contact_info) AS contact_info,
+    (SELECT count(*) FROM d_vendor_pins) AS vendor_pins,
+    (SELECT count(*) FROM d_documents) AS documents,
+    (SELECT count(*) FROM d_documents_submitted) AS documents_submitted,
+    (SELECT count(*) FROM d_images) AS images,
+    (SELECT count(*) FROM d_password_manager) AS password_manager,
+    (SELECT count(*) FROM d_payment_vendor_map) AS payment_vendor_map,
+    (SELECT count(*) FROM d_vendor_statuses) AS vendor_statuses,
+    (SELECT count(*) FROM d_extra_service_menu_images) AS extra_service_menu_images,
+    (SELECT count(*) FROM d_extra_service_menus) AS extra_service_menus,
+    (SELECT count(*) FROM d_user_passes) AS user_passes,
+    (SELECT count(*) FROM d_cafe_passes) AS cafe_passes,
+    (SELECT count(*) FROM d_timing) AS timing,
+    (SELECT count(*) FROM d_business_registration) AS business_registration,
+    (SELECT count(*) FROM d_vendors) AS vendors
+"""
+
+
+class DeboardEngine:
+    """
+    Set-based vendor deboarding.
+
+    The vendor's rows go in one DELETE statement, its dynamic inventory tables in one
+    multi-table DROP, and both commit together. Returns rows removed per table.
+    """
+
+    @staticmethod
+    def run(vendor_id: int):
+        vendor_id = int(vendor_id)
+        try:
+            rows = dict(db.session.execute(text(_DEBOARD_SQL), {"vendor_id": vendor_id}).mappings().one())
+            if not rows["vendors"]:
+                raise ValueError(f"No vendor found with ID {vendor_id}")
+
+            if SlotInventoryStore.is_shared():
+                for kind in DEBOARD_DYNAMIC_KINDS:
+                    SlotInventoryStore.clear_vendor_kind(kind, vendor_id)
+
+            dynamic_tables = [
+                LEGACY_TABLE_PATTERNS[kind].format(vendor_id=vendor_id).lower() for kind in DEBOARD_DYNAMIC_KINDS
+            ]
+            db.session.execute(
+                text("DROP TABLE IF EXISTS " + ", ".join(f'"{name}"' for name in dynamic_tables))
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        removed = {table: int(count) for table, count in rows.items() if count}
+        current_app.logger.info(
+            f"Deboarded vendor {vendor_id}: removed {sum(removed.values())} rows {removed}; "
+            f"dropped {', '.join(dynamic_tables)}"
+        )
+        return {"vendor_id": vendor_id, "rows_removed": removed, "dropped_tables": dynamic_tables}
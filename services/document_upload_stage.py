@@ -0,0 +1,144 @@
+# services/document_upload_stage.py
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from threading import Lock
+from typing import Dict
+
+from flask import current_app
+
+from services.cloudinary_services import CloudinaryGameImageService
+
+DOC_UPLOAD_MAX_WORKERS = max(1, int(os.getenv("DOC_UPLOAD_MAX_WORKERS", "4")))
+DOC_UPLOAD_TIMEOUT_SECONDS = float(os.getenv("DOC_UPLOAD_TIMEOUT_SECONDS", "30"))
+DOC_UPLOAD_MAX_RETRIES = max(0, int(os.getenv("DOC_UPLOAD_MAX_RETRIES", "2")))
+DOC_UPLOAD_RETRY_BACKOFF_SECONDS = float(os.getenv("DOC_UPLOAD_RETRY_BACKOFF_SECONDS", "0.5"))
+
+
+class DocumentUploadError(Exception):
+    """Raised when any upload in a stage fails; `results` holds the per-document outcome."""
+
+    def __init__(self, message, results):
+        super().__init__(message)
+        self.results = results
+
+
+class DocumentUploadStage:
+    """
+    Concurrent Cloudinary upload of a set of vendor documents.
+
+    Documents upload in a bounded thread pool, each with its own HTTP timeout and
+    retries. The stage is all-or-nothing. If any document fails, the assets that
+    did upload are deleted, and uploads still running when the stage gives up are
+    deleted as soon as they finish.
+    """
+
+    @staticmethod
+    def _upload_one(app, file, cafe_name, doc_type, vendor_id):
+        with app.app_context():
+            last_error = None
+            for attempt in range(DOC_UPLOAD_MAX_RETRIES + 1):
+                if attempt:
+                    time.sleep(DOC_UPLOAD_RETRY_BACKOFF_SECONDS * (2 ** (attempt - 1)))
+                try:
+                    file.stream.seek(0)
+                except Exception:
+                    pass
+                result = CloudinaryGameImageService.upload_vendor_document(
+                    file, cafe_name, doc_type, vendor_id, timeout=DOC_UPLOAD_TIMEOUT_SECONDS
+                )
+                if result.get("success"):
+                    result["attempts"] = attempt + 1
+                    return result
+                last_error = result.get("error") or "upload failed"
+                app.logger.warning(
+                    f"Upload attempt {attempt + 1} failed for {doc_type} (vendor {vendor_id}): {last_error}"
+                )
+            return {"success": False, "error": last_error, "url": None, "public_id": None,
+                    "attempts": DOC_UPLOAD_MAX_RETRIES + 1}
+
+    @staticmethod
+    def _delete_assets(app, uploads):
+        """Delete uploaded assets; `uploads` are upload results carrying public_id and resource_type."""
+        with app.app_context():
+            for upload in uploads:
+                public_id = upload["public_id"]
+                resource_type = upload.get("resource_type") or "image"
+                outcome = CloudinaryGameImageService.delete_vendor_document(public_id, resource_type)
+                if not outcome.get("success"):
+                    app.logger.warning(
+                        f"Rollback delete failed for {public_id} ({resource_type}): {outcome.get('error')}"
+                    )
+
+    @staticmethod
+    def upload_all(files: Dict, vendor_id, cafe_name) -> Dict[str, Dict[str, str]]:
+        """
+        Upload `files` ({doc_type: FileStorage}) concurrently.
+        Returns {doc_type: {"url": ..., "public_id": ..., "resource_type": ...}}; raises DocumentUploadError
+        after rolling back the stage when any document fails.
+        """
+        if not files:
+            return {}
+
+        app = current_app._get_current_object()
+        started = time.perf_counter()
+        # Worst case for one document: every attempt hits the timeout plus backoff sleeps.
+        deadline = (DOC_UPLOAD_TIMEOUT_SECONDS + DOC_UPLOAD_RETRY_BACKOFF_SECONDS * 2 ** DOC_UPLOAD_MAX_RETRIES) \
+            * (DOC_UPLOAD_MAX_RETRIES + 1)
+
+        state_lock = Lock()
+        stage_failed = {"value": False}
+
+        def _late_cleanup(future):
+            # Uploads that finish after the stage failed are removed immediately.
+            with state_lock:
+                failed = stage_failed["value"]
+            if failed and not future.cancelled() and future.exception() is None:
+                result = future.result()
+                if result.get("success") and result.get("public_id"):
+                    DocumentUploadStage._delete_assets(app, [result])
+
+        executor = ThreadPoolExecutor(max_workers=min(DOC_UPLOAD_MAX_WORKERS, len(files)))
+        try:
+            futures = {
+                executor.submit(DocumentUploadStage._upload_one, app, file, cafe_name, doc_type, vendor_id): doc_type
+                for doc_type, file in files.items()
+            }
+            done, not_done = wait(futures, timeout=deadline)
+
+            results = {}
+            for future, doc_type in futures.items():
+                if future in not_done:
+                    results[doc_type] = {"success": False, "error": "upload timed out", "url": None, "public_id": None}
+                elif future.exception() is not None:
+                    results[doc_type] = {"success": False, "error": str(future.exception()), "url": None, "public_id": None}
+                else:
+                    results[doc_type] = future.result()
+
+            failed = {doc_type: r["error"] for doc_type, r in results.items() if not r.get("success")}
+            if failed:
+                with state_lock:
+                    stage_failed["value"] = True
+                for future in not_done:
+                    future.add_done_callback(_late_cleanup)
+                uploaded = [r for r in results.values() if r.get("success") and r.get("public_id")]
+                DocumentUploadStage._delete_assets(app, uploaded)
+                current_app.logger.error(
+                    f"Document upload stage failed for vendor {vendor_id}: {failed}; rolled back {len(uploaded)} uploads"
+                )
+                raise DocumentUploadError(
+                    "Document upload failed for " + ", ".join(sorted(failed)),
+                    results,
+                )
+        finally:
+            executor.shutdown(wait=False)
+
+        current_app.logger.info(
+            f"Uploaded {len(results)} documents for vendor {vendor_id} "
+            f"in {round((time.perf_counter() - started) * 1000, 2)} ms"
+        )
+        return {
+            doc_type: {"url": r["url"], "public_id": r["public_id"], "resource_type": r.get("resource_type")}
+            for doc_type, r in results.items()
+        }
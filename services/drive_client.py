@@ -0,0 +1,76 @@
+# services/drive_client.py
+
+import threading
+
+from flask import current_app
+from google.oauth2 import service_account
+from googleapiclient.discovery import build
+
+DRIVE_SCOPES = ['https://www.googleapis.com/auth/drive']
+
+
+class _CountingCredentials(service_account.Credentials):
+    """Service-account credentials that serialize and count token refreshes."""
+
+    def refresh(self, request):
+        with DriveClient._refresh_lock:
+            # Another thread may have refreshed while this one waited.
+            if self.valid:
+                return
+            super().refresh(request)
+            DriveClient._refresh_count += 1
+
+
+class DriveClient:
+    """
+    Process-wide Google Drive client.
+
+    Service-account credentials are loaded once and shared; their access token is
+    refreshed on demand (at most one refresh in flight). `build('drive', 'v3')`
+    parses the discovery document, so each thread builds its Drive service once and
+    reuses it. Service objects are not thread-safe, which is why they are per thread
+    rather than global.
+    """
+
+    _init_lock = threading.Lock()
+    _refresh_lock = threading.Lock()
+    _credentials = None
+    _credentials_path = None
+    _local = threading.local()
+    _refresh_count = 0
+    _services_built = 0
+
+    @staticmethod
+    def credentials():
+        path = current_app.config['GOOGLE_APPLICATION_CREDENTIALS']
+        if DriveClient._credentials is None or DriveClient._credentials_path != path:
+            with DriveClient._init_lock:
+                if DriveClient._credentials is None or DriveClient._credentials_path != path:
+                    DriveClient._credentials = _CountingCredentials.from_service_account_file(path, scopes=DRIVE_SCOPES)
+                    DriveClient._credentials_path = path
+                    DriveClient._local = threading.local()
+        return DriveClient._credentials
+
+    @staticmethod
+    def service():
+        """The calling thread's Drive v3 service, built on first use."""
+        credentials = DriveClient.credentials()
+        service = getattr(DriveClient._local, "service", None)
+        if service is None:
+            service = build('drive', 'v3', credentials=credentials, cache_discovery=False)
+            DriveClient._local.service = service
+            with DriveClient._init_lock:
+                DriveClient._services_built += 1
+            current_app.logger.debug("Google Drive service initialized for thread %s.", threading.get_ident())
+        return service
+
+    @staticmethod
+    def stats():
+        credentials = DriveClient._credentials
+        return {
+            "credentials_loaded": credentials is not None,
+            "token_valid": bool(credentials and credentials.valid),
+            "token_expiry": credentials.expiry.isoformat() if credentials and credentials.expiry else None,
+            "credential_refreshes": DriveClient._refresh_count,
+            "services_built": DriveClient._services_built,
+        }
@@ -1,46 +1,79 @@
 import html
 import os
 import re
+from functools import lru_cache
 
 DEFAULT_HASH_LOGO = "https://res.cloudinary.com/dxjjigepf/image/upload/v1774472024/hash_for_gamer_logo_d1v4wc.png"
 
+_BODY_RE = re.compile(r"<body[^>]*>(.*)</body>", flags=re.IGNORECASE | re.DOTALL)
+# {{ name }} is HTML-escaped on render, {{ name|raw }} is inserted as is.
+_PLACEHOLDER_RE = re.compile(r"\{\{\s*([A-Za-z]\w*)\s*(\|\s*raw\s*)?\}\}")
+_NEEDS_ESCAPE = re.compile(r"[&<>\"']").search
 
-def _extract_body(content: str) -> str:
-    text = str(content or "")
-    match = re.search(r"<body[^>]*>(.*)</body>", text, flags=re.IGNORECASE | re.DOTALL)
-    if match:
-        return match.group(1)
-    return text
 
+def _text(value) -> str:
+    return "" if value is None else str(value)
 
-def build_hfg_email_html(subject: str, content_html: str, preview_text: str = "") -> str:
-    safe_subject = html.escape(subject or "Hash For Gamers Update")
-    safe_preview = html.escape(preview_text or "")
-    logo_url = (os.getenv("HASH_EMAIL_LOGO_URL") or DEFAULT_HASH_LOGO).strip()
-    inner = _extract_body(content_html)
-    return f"""<!doctype html>
+
+class EmailTemplate:
+    """
+    A template compiled once into a Python function.
+
+    The source is split into literal chunks and placeholders, and turned into a
+    function returning a single f-string, so rendering costs about what the
+    hand-written f-string builders did plus escaping. Build templates at import
+    time. None renders as an empty string; unknown keyword arguments are ignored.
+    """
+
+    __slots__ = ("source", "render")
+
+    def __init__(self, source: str, placeholder=_PLACEHOLDER_RE, escape: bool = True):
+        # `placeholder` must capture (name, raw flag); escape=False inserts every value as is.
+        self.source = source
+        pieces = placeholder.split(source)
+        literals = pieces[0::3]
+        slots = [(name, bool(raw) or not escape) for name, raw in zip(pieces[1::3], pieces[2::3])]
+        names = list(dict.fromkeys(name for name, _ in slots))
+
+        lines = [f"def render(*, {''.join(name + ', ' for name in names)}**_unused):"]
+        for name in names:
+            lines.append(f"    if {name}.__class__ is not str: {name} = _text({name})")
+            if any(not raw for slot_name, raw in slots if slot_name == name):
+                lines.append(f"    {name}__html = _escape({name}) if _needs_escape({name}) else {name}")
+        body = literals[0].replace("{", "{{").replace("}", "}}")
+        for (name, raw), literal in zip(slots, literals[1:]):
+            body += "{" + (name if raw else name + "__html") + "}" + literal.replace("{", "{{").replace("}", "}}")
+        lines.append(f"    return f{body!r}")
+
+        namespace = {"_text": _text, "_escape": html.escape, "_needs_escape": _NEEDS_ESCAPE}
+        exec(compile("\n".join(lines), "<email-template>", "exec"), namespace)
+        # render(**values) -> str
+        self.render = namespace["render"]
+
+
+_LAYOUT_SOURCE = """<!doctype html>
 <html>
   <head>
     <meta charset="UTF-8" />
     <meta name="viewport" content="width=device-width, initial-scale=1.0" />
-    <title>{safe_subject}</title>
+    <title>{{ subject }}</title>
   </head>
   <body style="margin:0;padding:0;background:#050912;font-family:Arial,Helvetica,sans-serif;color:#e5e7eb;">
-    <div style="display:none;max-height:0;overflow:hidden;opacity:0;">{safe_preview}</div>
+    <div style="display:none;max-height:0;overflow:hidden;opacity:0;">{{ preview_text }}</div>
     <table role="presentation" width="100%" cellpadding="0" cellspacing="0" style="padding:24px 12px;">
       <tr>
         <td align="center">
           <table role="presentation" width="100%" cellpadding="0" cellspacing="0" style="max-width:700px;background:#0b1220;border:1px solid #1e2a44;border-radius:12px;overflow:hidden;">
             <tr>
               <td style="padding:20px 24px;background:linear-gradient(180deg,#040915,#0b1220);color:#ffffff;">
-                <img src="{html.escape(logo_url)}" alt="Hash For Gamers" style="display:block;height:52px;width:auto;margin:0 0 10px 0;border-radius:10px;" />
+                <img src="{{ logo_url|raw }}" alt="Hash For Gamers" style="display:block;height:52px;width:auto;margin:0 0 10px 0;border-radius:10px;" />
                 <div style="font-size:12px;letter-spacing:.08em;text-transform:uppercase;color:#22c55e;font-weight:700;">Hash For Gamers</div>
-                <div style="margin-top:8px;font-size:22px;line-height:1.35;font-weight:700;">{safe_subject}</div>
+                <div style="margin-top:8px;font-size:22px;line-height:1.35;font-weight:700;">{{ subject }}</div>
               </td>
             </tr>
             <tr>
               <td style="padding:24px;color:#e5e7eb;">
-                {inner}
+                {{ content|raw }}
               </td>
             </tr>
             <tr>
@@ -55,3 +88,26 @@ def build_hfg_email_html(subject: str, content_html: str, preview_text: str = ""
     </table>
   </body>
 </html>"""
+
+
+@lru_cache(maxsize=8)
+def _layout(logo_url: str) -> EmailTemplate:
+    """The shared layout with the logo baked in, compiled once per logo URL."""
+    return EmailTemplate(_LAYOUT_SOURCE.replace("{{ logo_url|raw }}", html.escape(logo_url)))
+
+
+def _extract_body(content: str) -> str:
+    text = str(content or "")
+    match = _BODY_RE.search(text)
+    if match:
+        return match.group(1)
+    return text
+
+
+def build_hfg_email_html(subject: str, content_html: str, preview_text: str = "") -> str:
+    logo_url = (os.getenv("HASH_EMAIL_LOGO_URL") or DEFAULT_HASH_LOGO).strip()
+    return _layout(logo_url).render(
+        subject=subject or "Hash For Gamers Update",
+        preview_text=preview_text or "",
+        content=_extract_body(content_html),
+    )
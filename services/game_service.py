@@ -1,8 +1,16 @@
+import json
+import os
+
 from models.game import Game
-from db.extensions import db
+from db.extensions import db, redis_client
 from datetime import datetime
 from services.cloudinary_services import CloudinaryGameImageService
 from flask import current_app
+from sqlalchemy import text
+
+TOP_GAMES_VERSION_KEY = "hfg:games:top:version"
+TOP_GAMES_CACHE_PREFIX = "hfg:games:top"
+TOP_GAMES_CACHE_TTL_SECONDS = int(os.getenv("TOP_GAMES_CACHE_TTL_SECONDS", "86400"))
 
 class GameService:
     @staticmethod
@@ -19,6 +27,7 @@ class GameService:
         trailer_url=None,
         multiplayer=False,
         esrb_rating=None,
+        refresh_top_games=True,
     ):
         if not name:
             raise ValueError("Game name is required.")
@@ -59,7 +68,63 @@ class GameService:
             db.session.rollback()
             raise Exception(f"Failed to create game: {str(e)}")
 
+        if refresh_top_games:
+            GameService.refresh_top_games()
         return game
+
+    @staticmethod
+    def refresh_top_games():
+        """Invalidate cached top-N-per-platform lists after the games catalogue changes."""
+        try:
+            return int(redis_client.incr(TOP_GAMES_VERSION_KEY))
+        except Exception as exc:
+            current_app.logger.warning("Top games cache refresh failed: %s", exc)
+            return None
+
+    @staticmethod
+    def _load_top_game_ids(limit):
+        rows = db.session.execute(
+            text("""
+                SELECT platform, id
+                FROM (
+                    SELECT platform, id,
+                           ROW_NUMBER() OVER (PARTITION BY platform ORDER BY average_rating DESC, id) AS rn
+                    FROM games
+                    WHERE platform IS NOT NULL
+                ) ranked
+                WHERE rn <= :limit
+                ORDER BY platform, rn
+            """),
+            {"limit": int(limit)},
+        ).fetchall()
+        top = {}
+        for platform, game_id in rows:
+            top.setdefault(platform, []).append(int(game_id))
+        return top
+
+    @staticmethod
+    def top_game_ids_by_platform(limit=3):
+        """
+        {platform: [game_id, ...]} with the `limit` highest-rated games per platform,
+        computed in one ranked query and cached in Redis until the next refresh.
+        """
+        try:
+            version = int(redis_client.get(TOP_GAMES_VERSION_KEY) or 0)
+            key = f"{TOP_GAMES_CACHE_PREFIX}:v{version}:n{int(limit)}"
+            cached = redis_client.get(key)
+        except Exception as exc:
+            current_app.logger.warning("Top games cache read failed: %s", exc)
+            return GameService._load_top_game_ids(limit)
+
+        if cached is not None:
+            return json.loads(cached)
+
+        top = GameService._load_top_game_ids(limit)
+        try:
+            redis_client.setex(key, TOP_GAMES_CACHE_TTL_SECONDS, json.dumps(top))
+        except Exception as exc:
+            current_app.logger.warning("Top games cache write failed: %s", exc)
+        return top
     
     # new game service with cloudinary
 
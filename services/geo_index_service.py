@@ -0,0 +1,240 @@
+# services/geo_index_service.py
+
+import math
+import os
+from typing import Dict, List, Optional
+
+from flask import current_app
+from sqlalchemy import inspect, text
+
+from db.extensions import db
+
+# Grid cell edge in degrees (0.1 deg ~ 11 km of latitude).
+GEO_INDEX_CELL_DEGREES = float(os.getenv("GEO_INDEX_CELL_DEGREES", "0.1"))
+EARTH_RADIUS_KM = 6371.0
+
+
+class GeoIndexService:
+    """
+    Numeric grid-bucket index over cafe coordinates.
+
+    `physical_address.latitude/longitude` are strings, so they cannot be used for
+    range filtering. `vendor_geo_index` keeps one row per vendor with parsed
+    coordinates and an integer (cell_lat, cell_lng) bucket; nearby search scans
+    only the buckets overlapping the search radius and ranks them by haversine.
+    """
+
+    _table_ready = False
+
+    @staticmethod
+    def _ensure_table():
+        if GeoIndexService._table_ready:
+            return
+        try:
+            if not inspect(db.engine).has_table("vendor_geo_index"):
+                db.session.execute(
+                    text(
+                        """
+                        CREATE TABLE IF NOT EXISTS vendor_geo_index (
+                          vendor_id INTEGER PRIMARY KEY REFERENCES vendors(id) ON DELETE CASCADE,
+                          latitude DOUBLE PRECISION NOT NULL,
+                          longitude DOUBLE PRECISION NOT NULL,
+                          cell_lat INTEGER NOT NULL,
+                          cell_lng INTEGER NOT NULL,
+                          updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                        )
+                        """
+                    )
+                )
+                db.session.execute(
+                    text(
+                        """
+                        CREATE INDEX IF NOT EXISTS idx_vendor_geo_index_cell
+                        ON vendor_geo_index (cell_lat, cell_lng)
+                        """
+                    )
+                )
+            # Latest-status lookups per candidate vendor (nearby_vendor_ids).
+            db.session.execute(
+                text(
+                    """
+                    CREATE INDEX IF NOT EXISTS idx_vendor_statuses_vendor_latest
+                    ON vendor_statuses (vendor_id, updated_at DESC, id DESC)
+                    """
+                )
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        GeoIndexService._table_ready = True
+
+    @staticmethod
+    def _parse_coordinate(value, bound: float) -> Optional[float]:
+        if value is None:
+            return None
+        try:
+            parsed = float(str(value).strip())
+        except (TypeError, ValueError):
+            return None
+        if math.isnan(parsed) or abs(parsed) > bound:
+            return None
+        return parsed
+
+    @staticmethod
+    def _cell(value: float) -> int:
+        return int(math.floor(value / GEO_INDEX_CELL_DEGREES))
+
+    @staticmethod
+    def index_vendor(vendor_id: int, latitude, longitude, commit: bool = True) -> bool:
+        """
+        Upsert one vendor's coordinates. Unparseable coordinates remove the vendor
+        from the index. Returns True when the vendor is indexed.
+        """
+        GeoIndexService._ensure_table()
+        lat = GeoIndexService._parse_coordinate(latitude, 90.0)
+        lng = GeoIndexService._parse_coordinate(longitude, 180.0)
+
+        if lat is None or lng is None:
+            db.session.execute(
+                text("DELETE FROM vendor_geo_index WHERE vendor_id = :vendor_id"),
+                {"vendor_id": int(vendor_id)},
+            )
+            indexed = False
+        else:
+            db.session.execute(
+                text(
+                    """
+                    INSERT INTO vendor_geo_index (vendor_id, latitude, longitude, cell_lat, cell_lng, updated_at)
+                    VALUES (:vendor_id, :latitude, :longitude, :cell_lat, :cell_lng, now())
+                    ON CONFLICT (vendor_id) DO UPDATE
+                       SET latitude = EXCLUDED.latitude,
+                           longitude = EXCLUDED.longitude,
+                           cell_lat = EXCLUDED.cell_lat,
+                           cell_lng = EXCLUDED.cell_lng,
+                           updated_at = now()
+                    """
+                ),
+                {
+                    "vendor_id": int(vendor_id),
+                    "latitude": lat,
+                    "longitude": lng,
+                    "cell_lat": GeoIndexService._cell(lat),
+                    "cell_lng": GeoIndexService._cell(lng),
+                },
+            )
+            indexed = True
+
+        if commit:
+            db.session.commit()
+        return indexed
+
+    @staticmethod
+    def reindex_vendor(vendor_id: int, commit: bool = True) -> bool:
+        """Re-read the vendor's active address and refresh its index row."""
+        row = db.session.execute(
+            text(
+                """
+                SELECT latitude, longitude
+                FROM physical_address
+                WHERE parent_id = :vendor_id
+                  AND parent_type = 'vendor'
+                  AND COALESCE(is_active, TRUE) = TRUE
+                ORDER BY id DESC
+                LIMIT 1
+                """
+            ),
+            {"vendor_id": int(vendor_id)},
+        ).mappings().first()
+        return GeoIndexService.index_vendor(
+            vendor_id,
+            row["latitude"] if row else None,
+            row["longitude"] if row else None,
+            commit=commit,
+        )
+
+    @staticmethod
+    def rebuild() -> Dict[str, int]:
+        """Backfill/refresh the whole index from physical_address."""
+        GeoIndexService._ensure_table()
+        rows = db.session.execute(
+            text(
+                """
+                SELECT DISTINCT ON (parent_id) parent_id AS vendor_id, latitude, longitude
+                FROM physical_address
+                WHERE parent_type = 'vendor'
+                  AND COALESCE(is_active, TRUE) = TRUE
+                ORDER BY parent_id, id DESC
+                """
+            )
+        ).mappings().all()
+
+        indexed = 0
+        skipped = 0
+        for row in rows:
+            if GeoIndexService.index_vendor(row["vendor_id"], row["latitude"], row["longitude"], commit=False):
+                indexed += 1
+            else:
+                skipped += 1
+        db.session.commit()
+        current_app.logger.info("vendor_geo_index rebuilt: indexed=%s skipped=%s", indexed, skipped)
+        return {"indexed": indexed, "skipped": skipped}
+
+    @staticmethod
+    def nearby_vendor_ids(latitude: float, longitude: float, radius_km: float, limit: int) -> List[Dict[str, float]]:
+        """
+        Active vendors within `radius_km`, nearest first.
+        Returns [{"vendor_id": int, "distance_km": float}, ...].
+        """
+        GeoIndexService._ensure_table()
+
+        lat_span = radius_km / 111.0
+        cos_lat = max(math.cos(math.radians(latitude)), 0.01)
+        lng_span = min(radius_km / (111.32 * cos_lat), 180.0)
+
+        rows = db.session.execute(
+            text(
+                """
+                WITH candidates AS (
+                    SELECT g.vendor_id,
+                           2 * :earth_radius * ASIN(SQRT(
+                               POWER(SIN(RADIANS(g.latitude - :lat) / 2), 2)
+                               + COS(RADIANS(:lat)) * COS(RADIANS(g.latitude))
+                                 * POWER(SIN(RADIANS(g.longitude - :lng) / 2), 2)
+                           )) AS distance_km
+                    FROM vendor_geo_index g
+                    WHERE g.cell_lat BETWEEN :cell_lat_min AND :cell_lat_max
+                      AND g.cell_lng BETWEEN :cell_lng_min AND :cell_lng_max
+                )
+                SELECT c.vendor_id, c.distance_km
+                FROM candidates c
+                CROSS JOIN LATERAL (
+                    SELECT lower(vs.status) AS status
+                    FROM vendor_statuses vs
+                    WHERE vs.vendor_id = c.vendor_id
+                    ORDER BY vs.updated_at DESC, vs.id DESC
+                    LIMIT 1
+                ) latest
+                WHERE c.distance_km <= :radius_km
+                  AND latest.status = 'active'
+                ORDER BY c.distance_km, c.vendor_id
+                LIMIT :limit
+                """
+            ),
+            {
+                "earth_radius": EARTH_RADIUS_KM,
+                "lat": latitude,
+                "lng": longitude,
+                "radius_km": radius_km,
+                "cell_lat_min": GeoIndexService._cell(latitude - lat_span),
+                "cell_lat_max": GeoIndexService._cell(latitude + lat_span),
+                "cell_lng_min": GeoIndexService._cell(longitude - lng_span),
+                "cell_lng_max": GeoIndexService._cell(longitude + lng_span),
+                "limit": int(limit),
+            },
+        ).mappings().all()
+
+        return [
+            {"vendor_id": int(r["vendor_id"]), "distance_km": round(float(r["distance_km"]), 3)}
+            for r in rows
+        ]
@@ -0,0 +1,42 @@
+# services/http_cache.py
+
+import hashlib
+
+from flask import current_app, request
+from sqlalchemy import text
+
+from db.extensions import db
+
+
+def build_etag(*parts) -> str:
+    """Strong ETag value (unquoted) derived from cheap resource version parts."""
+    raw = "|".join("" if p is None else str(p) for p in parts)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def resource_version(sql: str, params=None):
+    """Run a single aggregate query (max(updated_at), count, ...) and return its row as a tuple."""
+    row = db.session.execute(text(sql), params or {}).first()
+    return tuple(row) if row is not None else ()
+
+
+def _etag_cache_control() -> str:
+    return current_app.config.get("API_ETAG_CACHE_CONTROL", "private, no-cache")
+
+
+def is_not_modified(etag: str) -> bool:
+    return bool(etag) and request.if_none_match.contains(etag)
+
+
+def not_modified_response(etag: str):
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = _etag_cache_control()
+    return response
+
+
+def with_etag(response, etag: str):
+    if etag:
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = _etag_cache_control()
+    return response
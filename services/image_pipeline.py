@@ -0,0 +1,144 @@
+# services/image_pipeline.py
+
+import os
+import uuid
+from datetime import datetime
+
+import cloudinary
+from flask import current_app
+from werkzeug.utils import secure_filename
+
+from services.cloudinary_services import CloudinaryGameImageService
+from services.upload_streams import cloudinary_upload
+
+try:
+    from PIL import Image as PILImage, ImageOps
+except ImportError:  # Pillow is only needed for the local backend
+    PILImage = None
+    ImageOps = None
+
+# "cloudinary" (default) or "local" (Pillow, files served from IMAGE_PIPELINE_LOCAL_DIR).
+IMAGE_PIPELINE_BACKEND = str(os.getenv("IMAGE_PIPELINE_BACKEND", "cloudinary") or "cloudinary").strip().lower()
+IMAGE_PIPELINE_LOCAL_DIR = os.getenv("IMAGE_PIPELINE_LOCAL_DIR", "/tmp/hfg-media")
+IMAGE_PIPELINE_PUBLIC_BASE_URL = (os.getenv("IMAGE_PIPELINE_PUBLIC_BASE_URL") or "/api/media").rstrip("/")
+LOCAL_PUBLIC_ID_PREFIX = "local:"
+
+# name -> (width, height, crop). "fill" crops to the exact box, "limit" only shrinks.
+IMAGE_VARIANTS = {
+    "thumbnail": (200, 200, "fill"),
+    "card": (480, 320, "fill"),
+    "full": (1600, 1600, "limit"),
+}
+
+
+class ImagePipeline:
+    """
+    Upload-time gallery image variants.
+
+    Every vendor gallery image gets thumbnail/card/full renditions. On Cloudinary
+    the variants are eager transformations of one uploaded original; the local
+    backend renders them with Pillow for environments without Cloudinary.
+    `public_id` of local images is prefixed with "local:".
+    """
+
+    @staticmethod
+    def variant_names():
+        return tuple(IMAGE_VARIANTS.keys())
+
+    @staticmethod
+    def process(image_file, vendor_id, cafe_name):
+        """
+        Returns {"success", "public_id", "url", "variants": {name: url}, "error"}.
+        `url` is the original upload (kept for existing clients).
+        """
+        if not image_file or image_file.filename == '':
+            return {'success': False, 'error': 'No image file provided', 'url': None, 'public_id': None, 'variants': {}}
+        if IMAGE_PIPELINE_BACKEND == "local":
+            return ImagePipeline._process_local(image_file, vendor_id)
+        return ImagePipeline._process_cloudinary(image_file, vendor_id, cafe_name)
+
+    @staticmethod
+    def _process_cloudinary(image_file, vendor_id, cafe_name):
+        if not CloudinaryGameImageService.configure_cloudinary():
+            return {'success': False, 'error': 'Cloudinary not configured', 'url': None, 'public_id': None, 'variants': {}}
+
+        safe_cafe_name = secure_filename((cafe_name or 'vendor').replace(' ', '_').lower()) or 'vendor'
+        transformations = {
+            name: {'width': w, 'height': h, 'crop': crop, 'gravity': 'auto' if crop == 'fill' else 'center',
+                   'quality': 'auto', 'fetch_format': 'auto'}
+            for name, (w, h, crop) in IMAGE_VARIANTS.items()
+        }
+        try:
+            upload_result = cloudinary_upload(
+                image_file,
+                folder=f"VENDOR_IMAGES/{safe_cafe_name}_ID_{vendor_id}",
+                public_id=f"gallery_{int(datetime.utcnow().timestamp())}_{uuid.uuid4().hex[:8]}",
+                resource_type="image",
+                overwrite=False,
+                eager=list(transformations.values()),
+            )
+        except Exception as e:
+            current_app.logger.error(f"Gallery image upload failed for vendor {vendor_id}: {e}")
+            return {'success': False, 'error': str(e), 'url': None, 'public_id': None, 'variants': {}}
+
+        if 'secure_url' not in upload_result or 'public_id' not in upload_result:
+            return {'success': False, 'error': 'Invalid Cloudinary response', 'url': None, 'public_id': None, 'variants': {}}
+
+        public_id = upload_result['public_id']
+        variants = {
+            name: cloudinary.CloudinaryImage(public_id).build_url(secure=True, **options)
+            for name, options in transformations.items()
+        }
+        return {'success': True, 'error': None, 'public_id': public_id, 'url': upload_result['secure_url'], 'variants': variants}
+
+    @staticmethod
+    def _process_local(image_file, vendor_id):
+        if PILImage is None:
+            return {'success': False, 'error': 'Pillow is not installed', 'url': None, 'public_id': None, 'variants': {}}
+
+        key = f"{int(vendor_id)}/{int(datetime.utcnow().timestamp())}_{uuid.uuid4().hex[:8]}"
+        target_dir = os.path.join(IMAGE_PIPELINE_LOCAL_DIR, str(int(vendor_id)))
+        try:
+            os.makedirs(target_dir, exist_ok=True)
+            stream = getattr(image_file, "stream", image_file)
+            stream.seek(0)
+            with PILImage.open(stream) as source:
+                source = ImageOps.exif_transpose(source).convert("RGB")
+                variants = {}
+                for name, (w, h, crop) in IMAGE_VARIANTS.items():
+                    if crop == "fill":
+                        rendered = ImageOps.fit(source, (w, h), method=PILImage.LANCZOS)
+                    else:
+                        rendered = source.copy()
+                        rendered.thumbnail((w, h), PILImage.LANCZOS)
+                    filename = f"{key}_{name}.jpg"
+                    rendered.save(os.path.join(IMAGE_PIPELINE_LOCAL_DIR, filename), "JPEG", quality=85, optimize=True)
+                    variants[name] = f"{IMAGE_PIPELINE_PUBLIC_BASE_URL}/{filename}"
+        except Exception as e:
+            current_app.logger.error(f"Local image pipeline failed for vendor {vendor_id}: {e}")
+            return {'success': False, 'error': str(e), 'url': None, 'public_id': None, 'variants': {}}
+
+        return {
+            'success': True,
+            'error': None,
+            'public_id': f"{LOCAL_PUBLIC_ID_PREFIX}{key}",
+            'url': variants["full"],
+            'variants': variants,
+        }
+
+    @staticmethod
+    def delete(public_id):
+        """Delete an image and its variants; same result shape as CloudinaryGameImageService.delete_image."""
+        if not public_id or not str(public_id).startswith(LOCAL_PUBLIC_ID_PREFIX):
+            return CloudinaryGameImageService.delete_image(public_id)
+
+        key = str(public_id)[len(LOCAL_PUBLIC_ID_PREFIX):]
+        for name in IMAGE_VARIANTS:
+            path = os.path.join(IMAGE_PIPELINE_LOCAL_DIR, f"{key}_{name}.jpg")
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                return {'success': False, 'error': str(e)}
+        return {'success': True, 'message': 'Image deleted successfully'}
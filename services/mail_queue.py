@@ -0,0 +1,380 @@
+# services/mail_queue.py
+
+import json
+import os
+import smtplib
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from flask import current_app
+from flask_mail import Message
+from sqlalchemy import inspect, text
+
+from db.extensions import db, mail
+
+# Whether this process runs a delivery worker (started on first enqueue).
+MAIL_QUEUE_WORKER_ENABLED = str(os.getenv("MAIL_QUEUE_WORKER_ENABLED", "true")).strip().lower() in {"1", "true", "yes", "y", "on"}
+# Messages claimed per batch; one SMTP connection is reused while batches keep coming.
+MAIL_QUEUE_BATCH_SIZE = max(1, int(os.getenv("MAIL_QUEUE_BATCH_SIZE", "50")))
+# Idle poll interval; enqueue wakes the worker immediately.
+MAIL_QUEUE_POLL_SECONDS = float(os.getenv("MAIL_QUEUE_POLL_SECONDS", "5"))
+MAIL_QUEUE_MAX_ATTEMPTS = max(1, int(os.getenv("MAIL_QUEUE_MAX_ATTEMPTS", "5")))
+MAIL_QUEUE_RETRY_BASE_SECONDS = float(os.getenv("MAIL_QUEUE_RETRY_BASE_SECONDS", "30"))
+MAIL_QUEUE_RETRY_MAX_SECONDS = float(os.getenv("MAIL_QUEUE_RETRY_MAX_SECONDS", "3600"))
+# Rows stuck in "sending" longer than this (worker died mid-batch) are requeued.
+MAIL_QUEUE_STALE_SECONDS = int(os.getenv("MAIL_QUEUE_STALE_SECONDS", "600"))
+
+QUEUED = "queued"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+
+def is_connection_error(exc) -> bool:
+    """The SMTP session itself is gone (not a per-message rejection); reconnect and resend."""
+    if isinstance(exc, smtplib.SMTPServerDisconnected):
+        return True
+    # smtplib.SMTPException subclasses OSError; only plain socket errors count here.
+    return isinstance(exc, OSError) and not isinstance(exc, smtplib.SMTPException)
+
+
+class MailQueue:
+    """
+    Persistent outbound email queue.
+
+    Senders build a flask_mail.Message as before and call MailQueue.enqueue instead
+    of mail.send. The message is stored in `outbound_emails`, which is also the
+    delivery status table. A per-process worker thread claims queued rows in batches
+    (FOR UPDATE SKIP LOCKED, so several processes can share the queue), sends them
+    over one SMTP connection that stays open while work keeps arriving, and retries
+    failures with exponential backoff up to MAIL_QUEUE_MAX_ATTEMPTS.
+    """
+
+    _table_ready = False
+    _worker_lock = threading.Lock()
+    _worker = None
+    _wakeup = threading.Event()
+
+    @staticmethod
+    def _ensure_table():
+        if MailQueue._table_ready:
+            return
+        if not inspect(db.engine).has_table("outbound_emails"):
+            with db.engine.begin() as conn:
+                conn.execute(
+                    text(
+                        """
+                        CREATE TABLE IF NOT EXISTS outbound_emails (
+                          id BIGSERIAL PRIMARY KEY,
+                          category VARCHAR(64) NOT NULL DEFAULT 'transactional',
+                          status VARCHAR(16) NOT NULL DEFAULT 'queued',
+                          subject TEXT NOT NULL,
+                          sender VARCHAR(320),
+                          recipients JSONB NOT NULL,
+                          cc JSONB NOT NULL DEFAULT '[]'::jsonb,
+                          bcc JSONB NOT NULL DEFAULT '[]'::jsonb,
+                          reply_to VARCHAR(320),
+                          body TEXT,
+                          html TEXT,
+                          meta JSONB NOT NULL DEFAULT '{}'::jsonb,
+                          attempts INTEGER NOT NULL DEFAULT 0,
+                          max_attempts INTEGER NOT NULL,
+                          next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                          locked_at TIMESTAMPTZ,
+                          last_error TEXT,
+                          created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                          sent_at TIMESTAMPTZ
+                        )
+                        """
+                    )
+                )
+                conn.execute(
+                    text(
+                        """
+                        CREATE INDEX IF NOT EXISTS ix_outbound_emails_due
+                        ON outbound_emails (next_attempt_at, id)
+                        WHERE status = 'queued'
+                        """
+                    )
+                )
+        MailQueue._table_ready = True
+
+    @staticmethod
+    def _row_for(msg: Message, category: str, meta: Optional[Dict], max_attempts: Optional[int]) -> Dict:
+        sender = msg.sender
+        if isinstance(sender, tuple):
+            sender = f"{sender[0]} <{sender[1]}>"
+        return {
+            "category": category,
+            "subject": msg.subject or "",
+            "sender": sender,
+            "recipients": list(msg.recipients or []),
+            "cc": list(msg.cc or []),
+            "bcc": list(msg.bcc or []),
+            "reply_to": msg.reply_to,
+            "body": msg.body,
+            "html": msg.html,
+            "meta": meta or {},
+            "max_attempts": int(max_attempts or MAIL_QUEUE_MAX_ATTEMPTS),
+        }
+
+    @staticmethod
+    def enqueue(msg: Message, category: str = "transactional", meta: Optional[Dict] = None,
+                max_attempts: Optional[int] = None) -> int:
+        """Queue one message; returns its outbound_emails id. Never talks to SMTP."""
+        return MailQueue.enqueue_many([msg], category=category, meta=meta, max_attempts=max_attempts)[0]
+
+    @staticmethod
+    def enqueue_many(messages: Iterable[Message], category: str = "transactional", meta: Optional[Dict] = None,
+                     max_attempts: Optional[int] = None, metas: Optional[List[Dict]] = None) -> List[int]:
+        """
+        Queue messages in one INSERT on its own connection, so the caller's session
+        transaction is neither committed nor required. `metas` gives per-message meta.
+        """
+        messages = list(messages)
+        if not messages:
+            return []
+        MailQueue._ensure_table()
+        rows = [
+            MailQueue._row_for(msg, category, (metas[i] if metas else meta), max_attempts)
+            for i, msg in enumerate(messages)
+        ]
+        with db.engine.begin() as conn:
+            ids = conn.execute(
+                text(
+                    """
+                    INSERT INTO outbound_emails
+                      (category, subject, sender, recipients, cc, bcc, reply_to, body, html, meta, max_attempts)
+                    SELECT r.category, r.subject, r.sender, r.recipients, r.cc, r.bcc, r.reply_to,
+                           r.body, r.html, r.meta, r.max_attempts
+                    FROM jsonb_to_recordset(CAST(:rows AS jsonb)) AS r(
+                        category text, subject text, sender text, recipients jsonb, cc jsonb, bcc jsonb,
+                        reply_to text, body text, html text, meta jsonb, max_attempts int
+                    )
+                    RETURNING id
+                    """
+                ),
+                {"rows": json.dumps(rows, default=str)},
+            ).scalars().all()
+        MailQueue.start_worker()
+        MailQueue._wakeup.set()
+        return list(ids)
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def start_worker(app=None):
+        """Start this process's delivery worker if it is enabled and not running."""
+        if not MAIL_QUEUE_WORKER_ENABLED:
+            return False
+        worker = MailQueue._worker
+        if worker is not None and worker.is_alive():
+            return True
+        with MailQueue._worker_lock:
+            worker = MailQueue._worker
+            if worker is not None and worker.is_alive():
+                return True
+            app_obj = app or current_app._get_current_object()
+            MailQueue._worker = threading.Thread(
+                target=MailQueue._worker_loop, args=(app_obj,), name="mail-queue-worker", daemon=True
+            )
+            MailQueue._worker.start()
+        return True
+
+    @staticmethod
+    def _worker_loop(app):
+        with app.app_context():
+            app.logger.info("Mail queue worker started")
+            while True:
+                MailQueue._wakeup.clear()
+                try:
+                    MailQueue.drain()
+                except Exception as exc:
+                    app.logger.error(f"Mail queue worker error: {exc}", exc_info=True)
+                MailQueue._wakeup.wait(MAIL_QUEUE_POLL_SECONDS)
+
+    @staticmethod
+    def _claim(conn, limit: int) -> List[Dict]:
+        rows = conn.execute(
+            text(
+                """
+                UPDATE outbound_emails o
+                   SET status = 'sending', locked_at = now(), attempts = o.attempts + 1
+                 WHERE o.id IN (
+                    SELECT id FROM outbound_emails
+                    WHERE (status = 'queued' AND next_attempt_at <= now())
+                       OR (status = 'sending' AND locked_at < now() - make_interval(secs => :stale))
+                    ORDER BY id
+                    LIMIT :limit
+                    FOR UPDATE SKIP LOCKED
+                 )
+                RETURNING o.id, o.subject, o.sender, o.recipients, o.cc, o.bcc, o.reply_to,
+                          o.body, o.html, o.attempts, o.max_attempts
+                """
+            ),
+            {"limit": int(limit), "stale": MAIL_QUEUE_STALE_SECONDS},
+        ).mappings().all()
+        return [dict(row) for row in rows]
+
+    @staticmethod
+    def _message_for(row: Dict) -> Message:
+        return Message(
+            subject=row["subject"],
+            sender=row["sender"],
+            recipients=row["recipients"] or [],
+            cc=row["cc"] or None,
+            bcc=row["bcc"] or None,
+            reply_to=row["reply_to"],
+            body=row["body"],
+            html=row["html"],
+        )
+
+    @staticmethod
+    def _retry_delay(attempts: int) -> float:
+        return min(MAIL_QUEUE_RETRY_MAX_SECONDS, MAIL_QUEUE_RETRY_BASE_SECONDS * (2 ** max(0, attempts - 1)))
+
+    @staticmethod
+    def _record(results: List[Dict]):
+        if not results:
+            return
+        with db.engine.begin() as conn:
+            conn.execute(
+                text(
+                    """
+                    UPDATE outbound_emails o
+                       SET status = r.status,
+                           sent_at = CASE WHEN r.status = 'sent' THEN now() ELSE o.sent_at END,
+                           next_attempt_at = now() + make_interval(secs => r.delay),
+                           last_error = r.error,
+                           locked_at = NULL,
+                           -- Bodies carry OTPs and temporary passwords; keep them only while a retry is pending.
+                           body = CASE WHEN r.status = 'queued' THEN o.body END,
+                           html = CASE WHEN r.status = 'queued' THEN o.html END
+                      FROM jsonb_to_recordset(CAST(:rows AS jsonb)) AS r(id bigint, status text, delay float8, error text)
+                     WHERE o.id = r.id
+                    """
+                ),
+                {"rows": json.dumps(results)},
+            )
+
+    @staticmethod
+    def drain(max_batches: Optional[int] = None) -> Dict[str, int]:
+        """
+        Deliver due messages until the queue is empty (or `max_batches` is reached),
+        reusing one SMTP connection across batches. Returns sent/retried/failed counts.
+        """
+        MailQueue._ensure_table()
+        totals = {"sent": 0, "retried": 0, "failed": 0, "batches": 0}
+        smtp = None
+        try:
+            while max_batches is None or totals["batches"] < max_batches:
+                with db.engine.begin() as conn:
+                    rows = MailQueue._claim(conn, MAIL_QUEUE_BATCH_SIZE)
+                if not rows:
+                    break
+                totals["batches"] += 1
+
+                results = []
+                connect_error = None
+                for row in rows:
+                    error = connect_error
+                    attempts_left = 0 if connect_error else 2  # one reconnect if the session dropped
+                    while attempts_left:
+                        attempts_left -= 1
+                        if smtp is None:
+                            try:
+                                smtp = mail.connect()
+                                smtp.__enter__()
+                            except Exception as exc:
+                                # SMTP unreachable: the rest of the batch retries later.
+                                smtp = None
+                                error = connect_error = exc
+                                break
+                        try:
+                            smtp.send(MailQueue._message_for(row))
+                            error = None
+                            break
+                        except Exception as exc:
+                            error = exc
+                            if not is_connection_error(exc):
+                                break
+                            smtp = MailQueue._close(smtp)
+
+                    if error is None:
+                        results.append({"id": row["id"], "status": SENT, "delay": 0, "error": None})
+                        totals["sent"] += 1
+                    elif row["attempts"] < row["max_attempts"]:
+                        results.append({"id": row["id"], "status": QUEUED,
+                                        "delay": MailQueue._retry_delay(row["attempts"]), "error": str(error)[:1500]})
+                        totals["retried"] += 1
+                    else:
+                        results.append({"id": row["id"], "status": FAILED, "delay": 0, "error": str(error)[:1500]})
+                        totals["failed"] += 1
+                        current_app.logger.error(
+                            f"Email {row['id']} to {row['recipients']} failed after {row['attempts']} attempts: {error}"
+                        )
+                MailQueue._record(results)
+        finally:
+            MailQueue._close(smtp)
+
+        if totals["batches"]:
+            current_app.logger.info(f"Mail queue drained: {totals}")
+        return totals
+
+    @staticmethod
+    def _close(smtp):
+        if smtp is not None:
+            try:
+                smtp.__exit__(None, None, None)
+            except Exception:
+                pass
+        return None
+
+    # ------------------------------------------------------------------
+    # Status
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def get(email_id: int) -> Optional[Dict]:
+        MailQueue._ensure_table()
+        with db.engine.connect() as conn:
+            row = conn.execute(
+                text(
+                    """
+                    SELECT id, category, status, subject, recipients, attempts, max_attempts,
+                           next_attempt_at, last_error, created_at, sent_at, meta
+                    FROM outbound_emails
+                    WHERE id = :id
+                    """
+                ),
+                {"id": int(email_id)},
+            ).mappings().first()
+        if not row:
+            return None
+        out = dict(row)
+        for key in ("next_attempt_at", "created_at", "sent_at"):
+            out[key] = out[key].isoformat() if out[key] else None
+        return out
+
+    @staticmethod
+    def stats() -> Dict:
+        MailQueue._ensure_table()
+        with db.engine.connect() as conn:
+            rows = conn.execute(
+                text(
+                    """
+                    SELECT status, count(*) AS n, min(created_at) AS oldest
+                    FROM outbound_emails
+                    WHERE status <> 'sent' OR sent_at > now() - interval '1 day'
+                    GROUP BY status
+                    """
+                )
+            ).mappings().all()
+        worker = MailQueue._worker
+        return {
+            "worker_running": bool(worker is not None and worker.is_alive()),
+            "by_status": {row["status"]: int(row["n"]) for row in rows},
+            "oldest_by_status": {row["status"]: row["oldest"].isoformat() if row["oldest"] else None for row in rows},
+        }
@@ -0,0 +1,540 @@
+# services/newsletter_campaign.py
+
+import json
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from flask import current_app
+from flask_mail import Message
+from sqlalchemy import inspect, text
+
+from db.extensions import db, mail
+from services.email_template import EmailTemplate
+from services.mail_queue import is_connection_error
+
+# Concurrent SMTP connections per running campaign.
+NEWSLETTER_SMTP_CONNECTIONS = max(1, int(os.getenv("NEWSLETTER_SMTP_CONNECTIONS", "4")))
+# Messages per second across all connections of a campaign (0 disables the cap).
+NEWSLETTER_MAX_PER_SECOND = float(os.getenv("NEWSLETTER_MAX_PER_SECOND", "10"))
+# Recipients sent between two log checkpoints.
+NEWSLETTER_CHECKPOINT_SIZE = max(1, int(os.getenv("NEWSLETTER_CHECKPOINT_SIZE", "100")))
+# A running campaign whose heartbeat is older than this is considered dead and may be resumed.
+NEWSLETTER_STALE_SECONDS = int(os.getenv("NEWSLETTER_STALE_SECONDS", "300"))
+# How often a running campaign refreshes its heartbeat while sending; well below the stale limit.
+NEWSLETTER_HEARTBEAT_SECONDS = max(1, min(int(os.getenv("NEWSLETTER_HEARTBEAT_SECONDS", "15")), NEWSLETTER_STALE_SECONDS // 3))
+
+QUEUED = "queued"
+RUNNING = "running"
+INTERRUPTED = "interrupted"
+COMPLETED = "completed"
+
+# Per-recipient merge fields; templates are rendered once with these tokens in place.
+# The empty second group stands in for EmailTemplate's raw flag.
+_MERGE_TOKEN_RE = re.compile(r"__HFG_(OWNER_NAME|CAFE_NAME|RECIPIENT)__()")
+
+
+def merge_token(field: str) -> str:
+    return f"__HFG_{field.upper()}__"
+
+
+@lru_cache(maxsize=32)
+def _compiled(template: str, escape: bool) -> EmailTemplate:
+    return EmailTemplate(template, placeholder=_MERGE_TOKEN_RE, escape=escape)
+
+
+def render_for(template: str, values: Dict[str, str], escape: bool) -> str:
+    """Substitute merge tokens in one pass, so a value that looks like a token is left alone."""
+    return _compiled(template, escape).render(
+        OWNER_NAME=values.get("owner_name"),
+        CAFE_NAME=values.get("cafe_name"),
+        RECIPIENT=values.get("recipient"),
+    )
+
+
+class _RateLimiter:
+    """Spaces calls evenly at `rate` per second across threads."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class NewsletterCampaign:
+    """
+    Resumable background newsletter campaigns.
+
+    A campaign is stored in `newsletter_campaigns` with its subject and its HTML/text
+    bodies rendered once, holding merge tokens for the per-recipient fields. Every
+    recipient gets a `vendor_newsletter_logs` row up front with status 'pending'.
+
+    The runner thread sends pending rows in batches of NEWSLETTER_CHECKPOINT_SIZE
+    over NEWSLETTER_SMTP_CONNECTIONS connections under NEWSLETTER_MAX_PER_SECOND,
+    and checkpoints each batch (log statuses, counters, heartbeat) in one
+    transaction. Between checkpoints the heartbeat is refreshed every
+    NEWSLETTER_HEARTBEAT_SECONDS, so a slow batch is not mistaken for a dead
+    runner; if the lease is lost, the senders stop sending at once. A campaign whose process died, or that stopped because SMTP was
+    unreachable, resumes from its remaining pending rows; at most the batch in
+    flight when it died is sent twice.
+    """
+
+    _table_ready = False
+    _runners_lock = threading.Lock()
+    _runners: Dict[str, threading.Thread] = {}
+
+    @staticmethod
+    def _ensure_table():
+        if NewsletterCampaign._table_ready:
+            return
+        if not inspect(db.engine).has_table("newsletter_campaigns"):
+            with db.engine.begin() as conn:
+                conn.execute(
+                    text(
+                        """
+                        CREATE TABLE IF NOT EXISTS newsletter_campaigns (
+                          campaign_id VARCHAR(64) PRIMARY KEY,
+                          topic VARCHAR(255) NOT NULL,
+                          subject TEXT NOT NULL,
+                          sender VARCHAR(320),
+                          reply_to VARCHAR(320),
+                          html_template TEXT NOT NULL,
+                          text_template TEXT NOT NULL,
+                          audience JSONB NOT NULL DEFAULT '{}'::jsonb,
+                          sent_by VARCHAR(128),
+                          status VARCHAR(16) NOT NULL DEFAULT 'queued',
+                          total INTEGER NOT NULL DEFAULT 0,
+                          sent_count INTEGER NOT NULL DEFAULT 0,
+                          failed_count INTEGER NOT NULL DEFAULT 0,
+                          lease_token VARCHAR(32),
+                          last_error TEXT,
+                          created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                          started_at TIMESTAMPTZ,
+                          heartbeat_at TIMESTAMPTZ,
+                          finished_at TIMESTAMPTZ
+                        )
+                        """
+                    )
+                )
+        NewsletterCampaign._table_ready = True
+
+    @staticmethod
+    def new_campaign_id(now) -> str:
+        return f"nl_{now.strftime('%Y%m%d%H%M%S')}_{secrets.token_hex(4)}"
+
+    @staticmethod
+    def create(campaign_id: str, topic: str, content: str, subject: str, sender: str, reply_to: str,
+               html_template: str, text_template: str, targets: List[Dict[str, Any]],
+               audience: Optional[Dict[str, Any]] = None, sent_by: str = "super_admin") -> int:
+        """
+        Store the campaign and one 'pending' log row per target in one transaction.
+        `vendor_newsletter_logs` must already exist. Returns the recipient count.
+        """
+        NewsletterCampaign._ensure_table()
+        recipients = [
+            {"vendor_id": int(t["vendor_id"]) if t.get("vendor_id") else None, "sent_to_email": t["recipient"]}
+            for t in targets
+            if t.get("recipient")
+        ]
+        with db.engine.begin() as conn:
+            conn.execute(
+                text(
+                    """
+                    INSERT INTO newsletter_campaigns
+                      (campaign_id, topic, subject, sender, reply_to, html_template, text_template,
+                       audience, sent_by, status, total)
+                    VALUES
+                      (:campaign_id, :topic, :subject, :sender, :reply_to, :html_template, :text_template,
+                       CAST(:audience AS jsonb), :sent_by, 'queued', :total)
+                    """
+                ),
+                {
+                    "campaign_id": campaign_id,
+                    "topic": topic,
+                    "subject": subject,
+                    "sender": sender,
+                    "reply_to": reply_to,
+                    "html_template": html_template,
+                    "text_template": text_template,
+                    "audience": json.dumps(audience or {}),
+                    "sent_by": sent_by,
+                    "total": len(recipients),
+                },
+            )
+            conn.execute(
+                text(
+                    """
+                    INSERT INTO vendor_newsletter_logs
+                      (campaign_id, vendor_id, sent_to_email, topic, content, status, error_message, sent_by, sent_at)
+                    SELECT :campaign_id, r.vendor_id, r.sent_to_email, :topic, :content, 'pending', NULL, :sent_by, now()
+                    FROM jsonb_to_recordset(CAST(:rows AS jsonb)) AS r(vendor_id int, sent_to_email text)
+                    """
+                ),
+                {
+                    "campaign_id": campaign_id,
+                    "topic": topic,
+                    "content": content,
+                    "sent_by": sent_by,
+                    "rows": json.dumps(recipients),
+                },
+            )
+        return len(recipients)
+
+    # ------------------------------------------------------------------
+    # Runner
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def start(campaign_id: str, app=None) -> bool:
+        """
+        Take the campaign's lease and run it on a background thread. Returns False when
+        it is finished, missing, or running elsewhere with a live heartbeat.
+        """
+        NewsletterCampaign._ensure_table()
+        with NewsletterCampaign._runners_lock:
+            runner = NewsletterCampaign._runners.get(campaign_id)
+            if runner is not None and runner.is_alive():
+                return False
+            token = secrets.token_hex(16)
+            with db.engine.begin() as conn:
+                claimed = conn.execute(
+                    text(
+                        """
+                        UPDATE newsletter_campaigns
+                           SET status = 'running', lease_token = :token, last_error = NULL,
+                               started_at = COALESCE(started_at, now()), heartbeat_at = now()
+                         WHERE campaign_id = :campaign_id
+                           AND (status IN ('queued', 'interrupted')
+                                OR (status = 'running' AND heartbeat_at < now() - make_interval(secs => :stale)))
+                        RETURNING campaign_id
+                        """
+                    ),
+                    {"campaign_id": campaign_id, "token": token, "stale": NEWSLETTER_STALE_SECONDS},
+                ).first()
+            if not claimed:
+                return False
+            app_obj = app or current_app._get_current_object()
+            runner = threading.Thread(
+                target=NewsletterCampaign._run, args=(app_obj, campaign_id, token),
+                name=f"newsletter-{campaign_id}", daemon=True,
+            )
+            NewsletterCampaign._runners[campaign_id] = runner
+            runner.start()
+        return True
+
+    @staticmethod
+    def resume_stalled(app=None) -> List[str]:
+        """Restart every queued, interrupted or dead campaign; returns the ids started here."""
+        NewsletterCampaign._ensure_table()
+        with db.engine.connect() as conn:
+            campaign_ids = conn.execute(
+                text(
+                    """
+                    SELECT campaign_id
+                    FROM newsletter_campaigns
+                    WHERE status IN ('queued', 'interrupted')
+                       OR (status = 'running' AND heartbeat_at < now() - make_interval(secs => :stale))
+                    ORDER BY created_at
+                    """
+                ),
+                {"stale": NEWSLETTER_STALE_SECONDS},
+            ).scalars().all()
+        return [cid for cid in campaign_ids if NewsletterCampaign.start(cid, app=app)]
+
+    @staticmethod
+    def _run(app, campaign_id: str, token: str):
+        with app.app_context():
+            work: "queue.Queue" = queue.Queue()
+            results: List[Dict[str, Any]] = []
+            results_lock = threading.Lock()
+            senders: List[threading.Thread] = []
+            stop_heartbeat = threading.Event()
+            lease_lost = threading.Event()
+            heartbeat = threading.Thread(
+                target=NewsletterCampaign._heartbeat_loop,
+                args=(app, campaign_id, token, stop_heartbeat, lease_lost),
+                name=f"newsletter-{campaign_id}-heartbeat", daemon=True,
+            )
+            heartbeat.start()
+            try:
+                campaign = NewsletterCampaign._load(campaign_id)
+                limiter = _RateLimiter(NEWSLETTER_MAX_PER_SECOND)
+                for i in range(NEWSLETTER_SMTP_CONNECTIONS):
+                    sender = threading.Thread(
+                        target=NewsletterCampaign._sender_loop,
+                        args=(app, campaign, work, limiter, results, results_lock, lease_lost),
+                        name=f"newsletter-{campaign_id}-smtp-{i}", daemon=True,
+                    )
+                    sender.start()
+                    senders.append(sender)
+
+                app.logger.info(f"Newsletter campaign {campaign_id} running")
+                while True:
+                    rows = NewsletterCampaign._next_batch(campaign_id)
+                    if not rows:
+                        NewsletterCampaign._finish(campaign_id, token, COMPLETED, None)
+                        break
+                    for row in rows:
+                        work.put(row)
+                    work.join()
+                    with results_lock:
+                        batch, results[:] = list(results), []
+
+                    if not NewsletterCampaign._checkpoint(campaign_id, token, batch):
+                        app.logger.warning(f"Newsletter campaign {campaign_id} lost its lease; stopping")
+                        break
+                    unreachable = next((r["error"] for r in batch if r["status"] == "pending"), None)
+                    if unreachable:
+                        NewsletterCampaign._finish(campaign_id, token, INTERRUPTED, f"SMTP unreachable: {unreachable}")
+                        app.logger.error(f"Newsletter campaign {campaign_id} interrupted: {unreachable}")
+                        break
+            except Exception as exc:
+                app.logger.error(f"Newsletter campaign {campaign_id} failed: {exc}", exc_info=True)
+                try:
+                    NewsletterCampaign._finish(campaign_id, token, INTERRUPTED, str(exc)[:1500])
+                except Exception:
+                    pass
+            finally:
+                for _ in senders:
+                    work.put(None)
+                for sender in senders:
+                    sender.join()
+                stop_heartbeat.set()
+                heartbeat.join()
+                with NewsletterCampaign._runners_lock:
+                    NewsletterCampaign._runners.pop(campaign_id, None)
+
+    @staticmethod
+    def _heartbeat_loop(app, campaign_id: str, token: str, stop, lease_lost):
+        """Refresh the lease's heartbeat until `stop`; sets `lease_lost` if another runner took over."""
+        with app.app_context():
+            while not stop.wait(NEWSLETTER_HEARTBEAT_SECONDS):
+                try:
+                    with db.engine.begin() as conn:
+                        owned = conn.execute(
+                            text(
+                                """
+                                UPDATE newsletter_campaigns
+                                   SET heartbeat_at = now()
+                                 WHERE campaign_id = :campaign_id AND lease_token = :token AND status = 'running'
+                                RETURNING campaign_id
+                                """
+                            ),
+                            {"campaign_id": campaign_id, "token": token},
+                        ).first()
+                except Exception as exc:
+                    app.logger.warning(f"Newsletter campaign {campaign_id} heartbeat failed: {exc}")
+                    continue
+                if not owned:
+                    lease_lost.set()
+                    return
+
+    @staticmethod
+    def _sender_loop(app, campaign, work, limiter, results, results_lock, lease_lost):
+        """One SMTP connection; sends rows from `work` until it gets None."""
+        with app.app_context():
+            smtp = None
+            try:
+                while True:
+                    row = work.get()
+                    if row is None:
+                        work.task_done()
+                        break
+                    try:
+                        if lease_lost.is_set():
+                            # Another runner owns the campaign; leave the row to it.
+                            result = {"id": row["id"], "status": "pending", "error": "lease lost"}
+                        else:
+                            smtp, result = NewsletterCampaign._send_one(smtp, campaign, row, limiter)
+                        with results_lock:
+                            results.append(result)
+                    finally:
+                        work.task_done()
+            finally:
+                NewsletterCampaign._close(smtp)
+
+    @staticmethod
+    def _send_one(smtp, campaign, row, limiter):
+        values = {"owner_name": row["owner_name"], "cafe_name": row["cafe_name"], "recipient": row["sent_to_email"]}
+        msg = Message(
+            subject=campaign["subject"],
+            sender=campaign["sender"],
+            recipients=[row["sent_to_email"]],
+            reply_to=campaign["reply_to"],
+        )
+        msg.body = render_for(campaign["text_template"], values, escape=False)
+        msg.html = render_for(campaign["html_template"], values, escape=True)
+
+        limiter.acquire()
+        error = None
+        for _ in range(2):  # one reconnect if the session dropped
+            try:
+                if smtp is None:
+                    smtp = mail.connect()
+                    smtp.__enter__()
+                smtp.send(msg)
+                return smtp, {"id": row["id"], "status": "sent", "error": None}
+            except Exception as exc:
+                error = exc
+                smtp = NewsletterCampaign._close(smtp)
+                if not is_connection_error(exc):
+                    return smtp, {"id": row["id"], "status": "failed", "error": str(exc)[:1500]}
+        # Still unreachable: leave the row pending so a resume sends it.
+        return smtp, {"id": row["id"], "status": "pending", "error": str(error)[:1500]}
+
+    @staticmethod
+    def _close(smtp):
+        if smtp is not None:
+            try:
+                smtp.__exit__(None, None, None)
+            except Exception:
+                pass
+        return None
+
+    @staticmethod
+    def _load(campaign_id: str) -> Dict[str, Any]:
+        with db.engine.connect() as conn:
+            return dict(
+                conn.execute(
+                    text(
+                        """
+                        SELECT campaign_id, subject, sender, reply_to, html_template, text_template
+                        FROM newsletter_campaigns
+                        WHERE campaign_id = :campaign_id
+                        """
+                    ),
+                    {"campaign_id": campaign_id},
+                ).mappings().one()
+            )
+
+    @staticmethod
+    def _next_batch(campaign_id: str) -> List[Dict[str, Any]]:
+        with db.engine.connect() as conn:
+            rows = conn.execute(
+                text(
+                    """
+                    SELECT l.id, l.sent_to_email,
+                           COALESCE(NULLIF(v.owner_name, ''), 'Partner') AS owner_name,
+                           COALESCE(NULLIF(v.cafe_name, ''), 'Cafe #' || l.vendor_id) AS cafe_name
+                    FROM vendor_newsletter_logs l
+                    LEFT JOIN vendors v ON v.id = l.vendor_id
+                    WHERE l.campaign_id = :campaign_id AND l.status = 'pending'
+                    ORDER BY l.id
+                    LIMIT :limit
+                    """
+                ),
+                {"campaign_id": campaign_id, "limit": NEWSLETTER_CHECKPOINT_SIZE},
+            ).mappings().all()
+        return [dict(row) for row in rows]
+
+    @staticmethod
+    def _checkpoint(campaign_id: str, token: str, batch: List[Dict[str, Any]]) -> bool:
+        """Write a batch's outcomes and bump the counters; False if another runner owns the campaign."""
+        sent = sum(1 for r in batch if r["status"] == "sent")
+        failed = sum(1 for r in batch if r["status"] == "failed")
+        with db.engine.begin() as conn:
+            owned = conn.execute(
+                text(
+                    """
+                    UPDATE newsletter_campaigns
+                       SET sent_count = sent_count + :sent, failed_count = failed_count + :failed,
+                           heartbeat_at = now()
+                     WHERE campaign_id = :campaign_id AND lease_token = :token AND status = 'running'
+                    RETURNING campaign_id
+                    """
+                ),
+                {"campaign_id": campaign_id, "token": token, "sent": sent, "failed": failed},
+            ).first()
+            if not owned:
+                return False
+            conn.execute(
+                text(
+                    """
+                    UPDATE vendor_newsletter_logs l
+                       SET status = r.status,
+                           error_message = r.error,
+                           sent_at = CASE WHEN r.status = 'pending' THEN l.sent_at ELSE now() END
+                      FROM jsonb_to_recordset(CAST(:rows AS jsonb)) AS r(id bigint, status text, error text)
+                     WHERE l.id = r.id AND l.campaign_id = :campaign_id
+                    """
+                ),
+                {"campaign_id": campaign_id, "rows": json.dumps(batch)},
+            )
+        return True
+
+    @staticmethod
+    def _finish(campaign_id: str, token: str, status: str, error: Optional[str]):
+        with db.engine.begin() as conn:
+            conn.execute(
+                text(
+                    """
+                    UPDATE newsletter_campaigns
+                       SET status = :status, last_error = :error, heartbeat_at = now(),
+                           finished_at = CASE WHEN :status = 'completed' THEN now() END
+                     WHERE campaign_id = :campaign_id AND lease_token = :token
+                    """
+                ),
+                {"campaign_id": campaign_id, "token": token, "status": status, "error": error},
+            )
+
+    # ------------------------------------------------------------------
+    # Progress
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def progress(campaign_id: str) -> Optional[Dict[str, Any]]:
+        NewsletterCampaign._ensure_table()
+        with db.engine.connect() as conn:
+            campaign = conn.execute(
+                text(
+                    """
+                    SELECT campaign_id, topic, subject, sent_by, status, total, last_error,
+                           created_at, started_at, heartbeat_at, finished_at, audience
+                    FROM newsletter_campaigns
+                    WHERE campaign_id = :campaign_id
+                    """
+                ),
+                {"campaign_id": campaign_id},
+            ).mappings().first()
+            if not campaign:
+                return None
+            counts = conn.execute(
+                text(
+                    """
+                    SELECT status, count(*) AS n
+                    FROM vendor_newsletter_logs
+                    WHERE campaign_id = :campaign_id
+                    GROUP BY status
+                    """
+                ),
+                {"campaign_id": campaign_id},
+            ).mappings().all()
+
+        out = dict(campaign)
+        for key in ("created_at", "started_at", "heartbeat_at", "finished_at"):
+            out[key] = out[key].isoformat() if out[key] else None
+        by_status = {row["status"]: int(row["n"]) for row in counts}
+        total = int(out["total"] or 0)
+        done = by_status.get("sent", 0) + by_status.get("failed", 0)
+        out.update({
+            "sent": by_status.get("sent", 0),
+            "failed": by_status.get("failed", 0),
+            "pending": by_status.get("pending", 0),
+            "percent_complete": round(done * 100.0 / total, 1) if total else 100.0,
+        })
+        return out
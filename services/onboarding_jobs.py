@@ -0,0 +1,370 @@
+# services/onboarding_jobs.py
+
+import json
+import os
+import secrets
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from flask import current_app
+from sqlalchemy import inspect, text
+
+from db.extensions import db
+
+ONBOARD_ASYNC_ENABLED = str(os.getenv("ONBOARD_ASYNC_ENABLED", "true")).strip().lower() in {"1", "true", "yes", "y", "on"}
+# A running job whose heartbeat is older than this lost its worker and may be resumed.
+ONBOARD_JOB_STALE_SECONDS = int(os.getenv("ONBOARD_JOB_STALE_SECONDS", "300"))
+# Runs the cron resume may start per job; after that a dead job is marked failed and
+# only an explicit retry runs it again.
+ONBOARD_JOB_MAX_ATTEMPTS = max(1, int(os.getenv("ONBOARD_JOB_MAX_ATTEMPTS", "3")))
+
+PENDING = "pending"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class OnboardingJobService:
+    """
+    Persisted background jobs for the slow tail of onboarding.
+
+    The request writes the core vendor rows and creates a job; the remaining steps
+    (vendor inventory tables, document rows, credentials email) run on a background
+    thread under the app context. Everything a step needs lives in the job row:
+    `inputs` holds plain data and references (uploaded document URLs, not files),
+    and steps are looked up by name in a registry filled with register_step, so any
+    worker can pick a job up.
+
+    A runner holds the job's lease (`lease_token`) and heartbeats on every step
+    change. A job whose runner died (worker recycled, deploy) is resumed by
+    resume_stalled, and a failed job can be retried; both re-run only the steps that
+    have not succeeded, so steps must be idempotent. Inputs a step marks as secret
+    are dropped as soon as that step has run, whatever its outcome; the rest of
+    `inputs` is cleared once the job succeeds or is given up.
+    """
+
+    _table_ready = False
+    _steps: Dict[str, Callable[[Dict[str, Any]], Optional[Dict]]] = {}
+    _step_secrets: Dict[str, tuple] = {}
+    _runners_lock = threading.Lock()
+    _runners: Dict[str, threading.Thread] = {}
+
+    @staticmethod
+    def _ensure_table():
+        if OnboardingJobService._table_ready:
+            return
+        with db.engine.begin() as conn:
+            if not inspect(conn).has_table("onboarding_jobs"):
+                conn.execute(
+                    text(
+                        """
+                        CREATE TABLE IF NOT EXISTS onboarding_jobs (
+                          id VARCHAR(36) PRIMARY KEY,
+                          vendor_id INTEGER,
+                          status VARCHAR(16) NOT NULL,
+                          steps JSONB NOT NULL DEFAULT '{}'::jsonb,
+                          step_order JSONB NOT NULL DEFAULT '[]'::jsonb,
+                          result JSONB,
+                          error TEXT,
+                          created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                          updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                        )
+                        """
+                    )
+                )
+            # Columns added after the first release of the table.
+            conn.execute(
+                text(
+                    """
+                    ALTER TABLE onboarding_jobs
+                      ADD COLUMN IF NOT EXISTS inputs JSONB NOT NULL DEFAULT '{}'::jsonb,
+                      ADD COLUMN IF NOT EXISTS lease_token VARCHAR(32),
+                      ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMPTZ,
+                      ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0
+                    """
+                )
+            )
+        OnboardingJobService._table_ready = True
+
+    @staticmethod
+    def register_step(name: str, step: Callable[[Dict[str, Any]], Optional[Dict]], secret_inputs=()):
+        """
+        Make `step` runnable by name. It receives the job ({"job_id", "vendor_id",
+        "inputs", "result"}) and may return a dict of outputs, merged into `result`.
+        `secret_inputs` are input keys removed from the job row once the step has run.
+        """
+        OnboardingJobService._steps[name] = step
+        OnboardingJobService._step_secrets[name] = tuple(secret_inputs)
+
+    @staticmethod
+    def create_job(vendor_id: int, step_names: List[str], inputs: Optional[Dict[str, Any]] = None) -> str:
+        OnboardingJobService._ensure_table()
+        job_id = uuid.uuid4().hex
+        with db.engine.begin() as conn:
+            conn.execute(
+                text(
+                    """
+                    INSERT INTO onboarding_jobs (id, vendor_id, status, steps, step_order, inputs, result)
+                    VALUES (:id, :vendor_id, :status, CAST(:steps AS jsonb), CAST(:step_order AS jsonb),
+                            CAST(:inputs AS jsonb), '{}'::jsonb)
+                    """
+                ),
+                {
+                    "id": job_id,
+                    "vendor_id": vendor_id,
+                    "status": PENDING,
+                    "steps": json.dumps({name: {"status": PENDING} for name in step_names}),
+                    "step_order": json.dumps(list(step_names)),
+                    "inputs": json.dumps(inputs or {}, default=str),
+                },
+            )
+        return job_id
+
+    @staticmethod
+    def get_job(job_id: str) -> Optional[Dict]:
+        OnboardingJobService._ensure_table()
+        with db.engine.connect() as conn:
+            row = conn.execute(
+                text(
+                    """
+                    SELECT id, vendor_id, status, steps, step_order, result, error, attempts,
+                           heartbeat_at, created_at, updated_at
+                    FROM onboarding_jobs
+                    WHERE id = :id
+                    """
+                ),
+                {"id": job_id},
+            ).mappings().first()
+        if not row:
+            return None
+        steps = row["steps"] or {}
+        return {
+            "job_id": row["id"],
+            "vendor_id": row["vendor_id"],
+            "status": row["status"],
+            "steps": [{"name": name, **steps.get(name, {})} for name in (row["step_order"] or [])],
+            "result": row["result"],
+            "error": row["error"],
+            "attempts": row["attempts"],
+            "heartbeat_at": row["heartbeat_at"].isoformat() if row["heartbeat_at"] else None,
+            "created_at": row["created_at"].isoformat() if row["created_at"] else None,
+            "updated_at": row["updated_at"].isoformat() if row["updated_at"] else None,
+        }
+
+    # ------------------------------------------------------------------
+    # Runner
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def start(job_id: str, app=None, retry: bool = False) -> bool:
+        """
+        Take the job's lease and run its unfinished steps on a background thread.
+        Pending jobs and running jobs with a stale heartbeat (within
+        ONBOARD_JOB_MAX_ATTEMPTS) can be started; `retry` also allows failed jobs and
+        ignores the attempt cap. Returns False when the job is finished, missing, or
+        running elsewhere with a live heartbeat.
+        """
+        OnboardingJobService._ensure_table()
+        with OnboardingJobService._runners_lock:
+            runner = OnboardingJobService._runners.get(job_id)
+            if runner is not None and runner.is_alive():
+                return False
+            token = secrets.token_hex(16)
+            with db.engine.begin() as conn:
+                claimed = conn.execute(
+                    text(
+                        """
+                        UPDATE onboarding_jobs
+                           SET status = 'running', lease_token = :token, error = NULL,
+                               attempts = attempts + 1, heartbeat_at = now(), updated_at = now()
+                         WHERE id = :id
+                           AND (status = 'pending'
+                                OR (status = 'running'
+                                    AND COALESCE(heartbeat_at, updated_at) < now() - make_interval(secs => :stale)
+                                    AND (:retry OR attempts < :max_attempts))
+                                OR (:retry AND status = 'failed'))
+                        RETURNING id
+                        """
+                    ),
+                    {
+                        "id": job_id,
+                        "token": token,
+                        "stale": ONBOARD_JOB_STALE_SECONDS,
+                        "retry": retry,
+                        "max_attempts": ONBOARD_JOB_MAX_ATTEMPTS,
+                    },
+                ).first()
+            if not claimed:
+                return False
+            app_obj = app or current_app._get_current_object()
+            runner = threading.Thread(
+                target=OnboardingJobService._run, args=(app_obj, job_id, token),
+                name=f"onboarding-job-{job_id}", daemon=True,
+            )
+            OnboardingJobService._runners[job_id] = runner
+            runner.start()
+        return True
+
+    @staticmethod
+    def resume_stalled(app=None) -> Dict[str, List[str]]:
+        """
+        Restart pending jobs and jobs whose runner died. Dead jobs that used up
+        ONBOARD_JOB_MAX_ATTEMPTS are marked failed instead, so they show up for retry.
+        Returns {"resumed": [...], "failed": [...]}.
+        """
+        OnboardingJobService._ensure_table()
+        with db.engine.begin() as conn:
+            failed = conn.execute(
+                text(
+                    """
+                    UPDATE onboarding_jobs
+                       SET status = 'failed', lease_token = NULL, inputs = '{}'::jsonb, updated_at = now(),
+                           error = 'worker stopped during the job; retry attempts exhausted'
+                     WHERE status = 'running'
+                       AND COALESCE(heartbeat_at, updated_at) < now() - make_interval(secs => :stale)
+                       AND attempts >= :max_attempts
+                    RETURNING id
+                    """
+                ),
+                {"stale": ONBOARD_JOB_STALE_SECONDS, "max_attempts": ONBOARD_JOB_MAX_ATTEMPTS},
+            ).scalars().all()
+            job_ids = conn.execute(
+                text(
+                    """
+                    SELECT id
+                    FROM onboarding_jobs
+                    WHERE status = 'pending'
+                       OR (status = 'running'
+                           AND COALESCE(heartbeat_at, updated_at) < now() - make_interval(secs => :stale))
+                    ORDER BY created_at
+                    """
+                ),
+                {"stale": ONBOARD_JOB_STALE_SECONDS},
+            ).scalars().all()
+        resumed = [job_id for job_id in job_ids if OnboardingJobService.start(job_id, app=app)]
+        return {"resumed": resumed, "failed": list(failed)}
+
+    @staticmethod
+    def _run(app, job_id: str, token: str):
+        with app.app_context():
+            try:
+                job = OnboardingJobService._load(job_id)
+                for name in job["step_order"]:
+                    if job["steps"].get(name, {}).get("status") == SUCCEEDED:
+                        continue
+                    started_at = _utc_now_iso()
+                    if not OnboardingJobService._set_step(job_id, token, name, {"status": RUNNING, "started_at": started_at}):
+                        app.logger.warning(f"[onboarding_job] job={job_id} lost its lease; stopping")
+                        return
+                    try:
+                        step = OnboardingJobService._steps.get(name)
+                        if step is None:
+                            raise RuntimeError(f"no handler registered for step {name!r}")
+                        output = step(job) or {}
+                    except Exception as exc:
+                        db.session.rollback()
+                        app.logger.error(f"[onboarding_job] job={job_id} step={name} failed: {exc}", exc_info=True)
+                        OnboardingJobService._set_step(
+                            job_id,
+                            token,
+                            name,
+                            {"status": FAILED, "started_at": started_at, "finished_at": _utc_now_iso(), "error": str(exc)},
+                            job_status=FAILED,
+                            error=f"{name}: {exc}",
+                            drop_inputs=OnboardingJobService._step_secrets.get(name, ()),
+                        )
+                        return
+                    job["result"].update(output)
+                    if not OnboardingJobService._set_step(
+                        job_id,
+                        token,
+                        name,
+                        {"status": SUCCEEDED, "started_at": started_at, "finished_at": _utc_now_iso()},
+                        output=output,
+                        drop_inputs=OnboardingJobService._step_secrets.get(name, ()),
+                    ):
+                        app.logger.warning(f"[onboarding_job] job={job_id} lost its lease; stopping")
+                        return
+                OnboardingJobService._finish(job_id, token)
+            except Exception as exc:
+                db.session.rollback()
+                app.logger.error(f"[onboarding_job] job={job_id} bookkeeping failed: {exc}", exc_info=True)
+            finally:
+                db.session.remove()
+                with OnboardingJobService._runners_lock:
+                    OnboardingJobService._runners.pop(job_id, None)
+
+    @staticmethod
+    def _load(job_id: str) -> Dict[str, Any]:
+        with db.engine.connect() as conn:
+            row = conn.execute(
+                text(
+                    """
+                    SELECT id, vendor_id, steps, step_order, inputs, result
+                    FROM onboarding_jobs
+                    WHERE id = :id
+                    """
+                ),
+                {"id": job_id},
+            ).mappings().one()
+        return {
+            "job_id": row["id"],
+            "vendor_id": row["vendor_id"],
+            "steps": row["steps"] or {},
+            "step_order": row["step_order"] or [],
+            "inputs": row["inputs"] or {},
+            "result": row["result"] or {},
+        }
+
+    @staticmethod
+    def _set_step(job_id: str, token: str, step: str, state: Dict, job_status: Optional[str] = None,
+                  error: Optional[str] = None, output: Optional[Dict] = None, drop_inputs=()) -> bool:
+        """Record a step's state and heartbeat, dropping `drop_inputs`; False if another runner owns the job."""
+        with db.engine.begin() as conn:
+            owned = conn.execute(
+                text(
+                    """
+                    UPDATE onboarding_jobs
+                       SET steps = steps || jsonb_build_object(CAST(:step AS text), CAST(:state AS jsonb)),
+                           result = COALESCE(result, '{}'::jsonb) || CAST(:output AS jsonb),
+                           inputs = inputs - CAST(:drop_inputs AS text[]),
+                           status = COALESCE(:job_status, status),
+                           error = COALESCE(:error, error),
+                           heartbeat_at = now(),
+                           updated_at = now()
+                     WHERE id = :id AND lease_token = :token AND status = 'running'
+                    RETURNING id
+                    """
+                ),
+                {
+                    "id": job_id,
+                    "token": token,
+                    "step": step,
+                    "state": json.dumps(state),
+                    "output": json.dumps(output or {}, default=str),
+                    "drop_inputs": list(drop_inputs),
+                    "job_status": job_status,
+                    "error": error,
+                },
+            ).first()
+        return owned is not None
+
+    @staticmethod
+    def _finish(job_id: str, token: str):
+        with db.engine.begin() as conn:
+            conn.execute(
+                text(
+                    """
+                    UPDATE onboarding_jobs
+                       SET status = 'succeeded', inputs = '{}'::jsonb, heartbeat_at = now(), updated_at = now()
+                     WHERE id = :id AND lease_token = :token
+                    """
+                ),
+                {"id": job_id, "token": token},
+            )
+
+
+def _utc_now_iso():
+    return datetime.now(timezone.utc).isoformat()
@@ -0,0 +1,336 @@
+# services/onboarding_writer.py
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+
+from db.extensions import db
+
+
+class OnboardingWriter:
+    """
+    Staged bulk writer for the onboarding entity graph.
+
+    Each stage is one INSERT statement built from data-modifying CTEs: parent rows
+    hand their ids to children through RETURNING, so no flush or read-back is needed
+    between tables.
+
+    - write_vendor: account (find or create), business registration, timing, vendor,
+      PIN, contact info, address, opening days and amenities.
+    - write_inventory: available games, slots, consoles with their four child rows
+      and available_game_console links.
+    """
+
+    @staticmethod
+    def write_vendor(plan):
+        """
+        `plan` keys: account_email, cafe_name, owner_name, description,
+        registration_number, registration_date, opening_time, closing_time, pin_code
+        (None picks a free 4-digit PIN), contact_email, contact_phone, address (dict),
+        opening_days ({day: is_open}), amenities ({name: available}).
+        Returns the row (vendor_id, account_id, account_created, pin_code).
+        """
+        now = datetime.utcnow()
+        address = plan["address"]
+        return db.session.execute(
+            text(
+                """
+                WITH found_account AS (
+                    SELECT id
+                    FROM vendor_accounts
+                    WHERE lower(email) = :account_email
+                    ORDER BY id
+                    LIMIT 1
+                ),
+                new_account AS (
+                    INSERT INTO vendor_accounts (email, created_at)
+                    SELECT :account_email, :now
+                    WHERE NOT EXISTS (SELECT 1 FROM found_account)
+                    RETURNING id
+                ),
+                account AS (
+                    SELECT id, false AS created FROM found_account
+                    UNION ALL
+                    SELECT id, true AS created FROM new_account
+                ),
+                registration AS (
+                    INSERT INTO business_registration (registration_number, registration_date)
+                    VALUES (:registration_number, :registration_date)
+                    RETURNING id
+                ),
+                timing_row AS (
+                    INSERT INTO timing (opening_time, closing_time)
+                    VALUES (:opening_time, :closing_time)
+                    RETURNING id
+                ),
+                vendor AS (
+                    INSERT INTO vendors (
+                        cafe_name, owner_name, description,
+                        business_registration_id, timing_id, account_id,
+                        created_at, updated_at
+                    )
+                    SELECT :cafe_name, :owner_name, :description,
+                           registration.id, timing_row.id, account.id,
+                           :now, :now
+                    FROM registration, timing_row, account
+                    RETURNING id, account_id
+                ),
+                pin AS (
+                    INSERT INTO vendor_pins (vendor_id, pin_code)
+                    SELECT vendor.id,
+                           COALESCE(
+                               CAST(:pin_code AS varchar),
+                               (
+                                   SELECT lpad(n::text, 4, '0')
+                                   FROM generate_series(0, 9999) AS n
+                                   WHERE NOT EXISTS (
+                                       SELECT 1 FROM vendor_pins p WHERE p.pin_code = lpad(n::text, 4, '0')
+                                   )
+                                   ORDER BY random()
+                                   LIMIT 1
+                               )
+                           )
+                    FROM vendor
+                    RETURNING pin_code
+                ),
+                contact AS (
+                    INSERT INTO contact_info (email, phone, parent_id, parent_type)
+                    SELECT :contact_email, :contact_phone, vendor.id, 'vendor'
+                    FROM vendor
+                ),
+                address AS (
+                    INSERT INTO physical_address (
+                        address_type, "addressLine1", "addressLine2", pincode, state, country,
+                        is_active, latitude, longitude, parent_id, parent_type
+                    )
+                    SELECT :address_type, :address_line1, :address_line2, :pincode, :state, :country,
+                           true, :latitude, :longitude, vendor.id, 'vendor'
+                    FROM vendor
+                ),
+                opening AS (
+                    INSERT INTO opening_days (vendor_id, day, is_open)
+                    SELECT vendor.id, d.day, d.is_open
+                    FROM vendor,
+                         unnest(CAST(:opening_days AS varchar[]), CAST(:opening_flags AS boolean[])) AS d(day, is_open)
+                ),
+                amenity AS (
+                    INSERT INTO amenities (vendor_id, name, available)
+                    SELECT vendor.id, a.name, a.available
+                    FROM vendor,
+                         unnest(CAST(:amenity_names AS varchar[]), CAST(:amenity_flags AS boolean[])) AS a(name, available)
+                )
+                SELECT vendor.id AS vendor_id, vendor.account_id, account.created AS account_created, pin.pin_code
+                FROM vendor, account, pin
+                """
+            ),
+            {
+                "now": now,
+                "account_email": plan["account_email"],
+                "registration_number": plan["registration_number"],
+                "registration_date": plan["registration_date"],
+                "opening_time": plan["opening_time"].strftime("%H:%M:%S"),
+                "closing_time": plan["closing_time"].strftime("%H:%M:%S"),
+                "cafe_name": plan["cafe_name"],
+                "owner_name": plan["owner_name"],
+                "description": plan["description"],
+                "pin_code": plan["pin_code"],
+                "contact_email": plan["contact_email"],
+                "contact_phone": plan["contact_phone"],
+                "address_type": address.get("address_type"),
+                "address_line1": address.get("addressLine1"),
+                "address_line2": address.get("addressLine2"),
+                "pincode": address.get("pincode"),
+                "state": address.get("state"),
+                "country": address.get("country"),
+                "latitude": address.get("latitude"),
+                "longitude": address.get("longitude"),
+                "opening_days": list(plan["opening_days"].keys()),
+                "opening_flags": [bool(v) for v in plan["opening_days"].values()],
+                "amenity_names": list(plan["amenities"].keys()),
+                "amenity_flags": [bool(v) for v in plan["amenities"].values()],
+            },
+        ).mappings().one()
+
+    @staticmethod
+    def write_inventory(vendor_id, cafe_name, games, slot_windows, brand_map, model_map):
+        """
+        `games` is {game_name: {"total_slot", "single_slot_price"}}; `slot_windows` is a
+        list of (start_time, end_time) applied to every game. One console is created
+        per slot, numbered from 1, with its hardware/maintenance/price/details rows and
+        its available_game_console link.
+        Returns the inserted console rows (id, console_type, console_number).
+        """
+        today = datetime.now()
+        game_names, game_slots, game_prices = [], [], []
+        console_games, console_numbers, console_types = [], [], []
+        console_models, console_hw_models, console_serials, console_brands, console_descriptions = [], [], [], [], []
+        for game_name, details in games.items():
+            total_slot = int(details.get("total_slot", 0) or 0)
+            game_names.append(game_name)
+            game_slots.append(total_slot)
+            game_prices.append(details.get("single_slot_price", 0))
+
+            game_type = game_name.lower()
+            for slot_num in range(1, total_slot + 1):
+                console_games.append(game_name)
+                console_numbers.append(slot_num)
+                console_types.append(game_type)
+                console_models.append(model_map.get(game_type, 'Unknown'))
+                console_hw_models.append(model_map.get(game_type, ''))
+                console_serials.append(f"{vendor_id}-{game_type.upper()}-{slot_num:03d}-{today.strftime('%Y%m%d')}")
+                console_brands.append(brand_map.get(game_type, 'Generic'))
+                console_descriptions.append(f"{game_type.upper()} Console #{slot_num} for {cafe_name}")
+
+        if not game_names:
+            return []
+
+        return db.session.execute(
+            text(
+                """
+                WITH games AS (
+                    INSERT INTO available_games (vendor_id, game_name, total_slot, single_slot_price)
+                    SELECT :vendor_id, g.game_name, g.total_slot, g.single_slot_price
+                    FROM unnest(
+                        CAST(:game_names AS varchar[]),
+                        CAST(:game_slots AS int[]),
+                        CAST(:game_prices AS int[])
+                    ) AS g(game_name, total_slot, single_slot_price)
+                    RETURNING id, game_name, total_slot, single_slot_price
+                ),
+                slot_rows AS (
+                    INSERT INTO slots (gaming_type_id, start_time, end_time, available_slot, is_available)
+                    SELECT games.id, w.start_time, w.end_time, games.total_slot, true
+                    FROM games,
+                         unnest(CAST(:slot_starts AS time[]), CAST(:slot_ends AS time[])) AS w(start_time, end_time)
+                ),
+                console_input AS (
+                    SELECT *
+                    FROM unnest(
+                        CAST(:console_games AS varchar[]),
+                        CAST(:console_numbers AS int[]),
+                        CAST(:console_types AS varchar[]),
+                        CAST(:console_models AS varchar[]),
+                        CAST(:console_hw_models AS varchar[]),
+                        CAST(:console_serials AS varchar[]),
+                        CAST(:console_brands AS varchar[]),
+                        CAST(:console_descriptions AS varchar[])
+                    ) AS c(game_name, console_number, console_type, model_number, hw_model,
+                           serial_number, brand, description)
+                ),
+                console_rows AS (
+                    INSERT INTO consoles (
+                        vendor_id, console_number, model_number, serial_number,
+                        brand, console_type, release_date, description
+                    )
+                    SELECT :vendor_id, console_number, model_number, serial_number,
+                           brand, console_type, NULL, description
+                    FROM console_input
+                    RETURNING id, console_type, console_number, serial_number
+                ),
+                console_game AS (
+                    SELECT console_rows.id AS console_id, console_rows.console_type,
+                           console_input.hw_model, games.id AS available_game_id,
+                           games.single_slot_price
+                    FROM console_rows
+                    JOIN console_input ON console_input.serial_number = console_rows.serial_number
+                    JOIN games ON games.game_name = console_input.game_name
+                ),
+                hardware AS (
+                    INSERT INTO hardware_specifications (
+                        console_id, processor_type, graphics_card, ram_size,
+                        storage_capacity, connectivity, console_model_type
+                    )
+                    SELECT console_id,
+                           CASE WHEN console_type = 'pc' THEN '' END,
+                           CASE WHEN console_type = 'pc' THEN '' END,
+                           CASE WHEN console_type = 'pc' THEN '' END,
+                           CASE WHEN console_type = 'pc' THEN '' END,
+                           CASE WHEN console_type = 'pc' THEN '' END,
+                           hw_model
+                    FROM console_game
+                ),
+                maintenance AS (
+                    INSERT INTO maintenance_status (
+                        console_id, available_status, condition,
+                        last_maintenance, next_maintenance, maintenance_notes
+                    )
+                    SELECT console_id, 'available', 'new',
+                           :last_maintenance, :next_maintenance, 'Initial setup during onboarding'
+                    FROM console_game
+                ),
+                price AS (
+                    INSERT INTO price_and_cost (console_id, price, rental_price, warranty_period, insurance_status)
+                    SELECT console_id, 0, single_slot_price, '1 year', 'notInsured'
+                    FROM console_game
+                ),
+                details AS (
+                    INSERT INTO additional_details (console_id, supported_games, accessories)
+                    SELECT console_id, '', ''
+                    FROM console_game
+                ),
+                links AS (
+                    INSERT INTO available_game_console (available_game_id, console_id)
+                    SELECT available_game_id, console_id
+                    FROM console_game
+                )
+                SELECT id, console_type, console_number
+                FROM console_rows
+                ORDER BY id
+                """
+            ),
+            {
+                "vendor_id": vendor_id,
+                "game_names": game_names,
+                "game_slots": game_slots,
+                "game_prices": game_prices,
+                "slot_starts": [start for start, _ in slot_windows],
+                "slot_ends": [end for _, end in slot_windows],
+                "console_games": console_games,
+                "console_numbers": console_numbers,
+                "console_types": console_types,
+                "console_models": console_models,
+                "console_hw_models": console_hw_models,
+                "console_serials": console_serials,
+                "console_brands": console_brands,
+                "console_descriptions": console_descriptions,
+                "last_maintenance": today.date(),
+                "next_maintenance": (today + timedelta(days=90)).date(),
+            },
+        ).fetchall()
+
+
+# Stats dicts of the count_round_trips blocks open in the current thread (blocks
+# nest). The engine listeners below are registered once at import: adding or
+# removing listeners while other threads execute statements is not safe.
+_round_trip_stats = ContextVar("onboarding_round_trip_stats", default=())
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    for stats in _round_trip_stats.get():
+        stats["statements"] += 1
+        stats["round_trips"] += 1
+
+
+@event.listens_for(Engine, "commit")
+def _count_commit(conn):
+    for stats in _round_trip_stats.get():
+        stats["commits"] += 1
+        stats["round_trips"] += 1
+
+
+@contextmanager
+def count_round_trips():
+    """
+    Count database round trips (statements sent plus commits) made by the calling
+    thread inside the block. Yields a dict whose "round_trips" is filled in as it goes.
+    """
+    stats = {"statements": 0, "commits": 0, "round_trips": 0}
+    token = _round_trip_stats.set(_round_trip_stats.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _round_trip_stats.reset(token)
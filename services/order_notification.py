@@ -8,7 +8,24 @@ from models.orderItem import OrderItem
 from models.product import Product
 from models.communication import Communication
 from datetime import datetime
-from services.email_template import build_hfg_email_html
+from services.email_template import EmailTemplate, build_hfg_email_html
+from services.mail_queue import MailQueue
+
+ORDER_ITEMS_TABLE_TEMPLATE = EmailTemplate("""
+            <table style="width:100%; border-collapse:collapse; margin-bottom:15px; border:1px solid #1e2a44; border-radius:8px; overflow:hidden; background:#08142c;">
+                <tr>
+                    <th style="border-bottom:1px solid #1e2a44; padding:8px; background:#050f23; color:#cbd5e1;">Product</th>
+                    <th style="border-bottom:1px solid #1e2a44; padding:8px; background:#050f23; color:#cbd5e1;">Qty</th>
+                    <th style="border-bottom:1px solid #1e2a44; padding:8px; background:#050f23; color:#cbd5e1;">Unit Price</th>
+                    <th style="border-bottom:1px solid #1e2a44; padding:8px; background:#050f23; color:#cbd5e1;">Subtotal</th>
+                </tr>{{ rows|raw }}</table>""")
+ORDER_ITEM_ROW_TEMPLATE = EmailTemplate("""
+                <tr>
+                    <td style="border-bottom:1px solid #1e2a44; padding:8px; color:#e2e8f0;">{{ name }}</td>
+                    <td style="border-bottom:1px solid #1e2a44; padding:8px; text-align:center; color:#e2e8f0;">{{ quantity }}</td>
+                    <td style="border-bottom:1px solid #1e2a44; padding:8px; text-align:right; color:#e2e8f0;">₹{{ unit_price }}</td>
+                    <td style="border-bottom:1px solid #1e2a44; padding:8px; text-align:right; color:#e2e8f0;">₹{{ subtotal }}</td>
+                </tr>""")
 
 class NotificationService:
     
@@ -31,25 +48,22 @@ class NotificationService:
 
             subject = f"Order Confirmation - {order.order_id}"
            
-            # Products table (HTML)
-            items_table = """
-            <table style="width:100%; border-collapse:collapse; margin-bottom:15px; border:1px solid #1e2a44; border-radius:8px; overflow:hidden; background:#08142c;">
-                <tr>
-                    <th style="border-bottom:1px solid #1e2a44; padding:8px; background:#050f23; color:#cbd5e1;">Product</th>
-                    <th style="border-bottom:1px solid #1e2a44; padding:8px; background:#050f23; color:#cbd5e1;">Qty</th>
-                    <th style="border-bottom:1px solid #1e2a44; padding:8px; background:#050f23; color:#cbd5e1;">Unit Price</th>
-                    <th style="border-bottom:1px solid #1e2a44; padding:8px; background:#050f23; color:#cbd5e1;">Subtotal</th>
-                </tr>"""
-            for item in items:
-                p = Product.query.get(item.product_id)
-                items_table += f"""
-                <tr>
-                    <td style="border-bottom:1px solid #1e2a44; padding:8px; color:#e2e8f0;">{p.name}</td>
-                    <td style="border-bottom:1px solid #1e2a44; padding:8px; text-align:center; color:#e2e8f0;">{item.quantity}</td>
-                    <td style="border-bottom:1px solid #1e2a44; padding:8px; text-align:right; color:#e2e8f0;">₹{float(item.unit_price):.2f}</td>
-                    <td style="border-bottom:1px solid #1e2a44; padding:8px; text-align:right; color:#e2e8f0;">₹{float(item.subtotal):.2f}</td>
-                </tr>"""
-            items_table += "</table>"
+            # Products table (HTML); products loaded in one query
+            products = {
+                p.product_id: p
+                for p in Product.query.filter(Product.product_id.in_({item.product_id for item in items})).all()
+            } if items else {}
+            items_table = ORDER_ITEMS_TABLE_TEMPLATE.render(
+                rows="".join(
+                    ORDER_ITEM_ROW_TEMPLATE.render(
+                        name=products[item.product_id].name,
+                        quantity=item.quantity,
+                        unit_price=f"{float(item.unit_price):.2f}",
+                        subtotal=f"{float(item.subtotal):.2f}",
+                    )
+                    for item in items
+                )
+            )
 
             # Order summary table (HTML)
             order_summary_table = f"""
@@ -104,7 +118,7 @@ Phone: {vendor_phone}
 
 Products:
 """ + "".join([
-    f"- {Product.query.get(item.product_id).name}: Qty {item.quantity} x ₹{float(item.unit_price):.2f} = ₹{float(item.subtotal):.2f}\n"
+    f"- {products[item.product_id].name}: Qty {item.quantity} x ₹{float(item.unit_price):.2f} = ₹{float(item.subtotal):.2f}\n"
     for item in items
 ]) + f"""
 
@@ -132,13 +146,8 @@ HashForGamers © {order.order_date.year}
                 )
             )
             
-            mail = current_app.extensions.get('mail')
-            if mail:
-                mail.send(msg)
-                status = 'sent'
-            else:
-                current_app.logger.error("Flask-Mail not initialized")
-                status = 'failed'
+            MailQueue.enqueue(msg, category="order_notification", meta={"order_id": order_id})
+            status = 'queued'
 
             db.session.add(Communication(
                 collaborator_id=collaborator.collaborator_id,
@@ -214,13 +223,8 @@ Support: support@hashforgamers.co.in
                     preview_text=f"Invoice {invoice_data.get('invoice_id')}",
                 )
             )
-            mail = current_app.extensions.get('mail')
-            if mail:
-                mail.send(msg)
-                return True
-            else:
-                current_app.logger.error("Flask-Mail not initialized")
-                return False
+            MailQueue.enqueue(msg, category="invoice_notification", meta={"invoice_id": invoice_data.get('invoice_id')})
+            return True
         except Exception as e:
             current_app.logger.error(f"Failed to send invoice notification: {e}")
             return False
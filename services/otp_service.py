@@ -4,31 +4,55 @@ import random
 import string
 from flask import current_app
 from flask_mail import Message
-from db.extensions import mail, redis_client, db
+from db.extensions import db
 from models.vendor import Vendor
 from models.vendorAccount import VendorAccount
-from services.email_template import build_hfg_email_html
+from services.email_template import EmailTemplate, build_hfg_email_html
+from services.mail_queue import MailQueue
+from services import otp_store
+from services.otp_store import OTPStore
 import logging
-from threading import Thread
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
-
-# CRITICAL: Async email sender function
-def send_async_email(app, msg):
-    """Send email asynchronously in background thread"""
-    with app.app_context():
-        try:
-            mail.send(msg)
-            app.logger.info("✅ Email sent successfully in background")
-        except Exception as e:
-            app.logger.error(f"❌ Failed to send email asynchronously: {str(e)}")
+OTP_EMAIL_TEMPLATE = EmailTemplate("""
+<p style="margin:0 0 12px 0;color:#e5e7eb;">Hello <strong>{{ vendor_name }}</strong>,</p>
+<p style="margin:0 0 14px 0;color:#cbd5e1;line-height:1.7;">
+    You are trying to access <strong>{{ page_name }}</strong> for <strong>{{ cafe_name }}</strong>.
+    Please verify with the OTP below.
+</p>
+<div style="background:#0a1f45;border:1px solid #1d4ed8;border-radius:10px;padding:18px;text-align:center;margin:16px 0;">
+    <div style="color:#93c5fd;font-size:13px;margin-bottom:6px;">One-Time Password</div>
+    <div style="color:#ffffff;font-size:36px;letter-spacing:8px;font-weight:700;">{{ otp }}</div>
+</div>
+<div style="background:#2b170a;border:1px solid #7c2d12;border-radius:8px;padding:12px;color:#fcd34d;line-height:1.65;">
+    <strong>Important:</strong>
+    <ul style="margin:8px 0 0 18px;padding:0;">
+        <li>This OTP is valid for 5 minutes.</li>
+        <li>Never share this OTP with anyone.</li>
+        <li>Hash For Gamers support will never ask for your OTP.</li>
+        <li>If you did not request this, you can ignore this email.</li>
+    </ul>
+</div>
+<p style="margin:14px 0 0 0;color:#94a3b8;font-size:12px;">
+    This is an automated security email from Hash For Gamers dashboard.
+</p>
+""")
 
 
 class OTPService:
     OTP_EXPIRY_SECONDS = 300  # 5 minutes
     VERIFICATION_EXPIRY_SECONDS = 1800  # 30 minutes
+
+    # Subject is "{vendor_id}:{page_type}"; key names match the pre-store layout.
+    store = OTPStore(
+        otp_key='vendor_otp:{subject}',
+        verified_key='vendor_verified:{subject}',
+        otp_ttl=OTP_EXPIRY_SECONDS,
+        verified_ttl=VERIFICATION_EXPIRY_SECONDS,
+        verified_value='verified',
+    )
     
     @staticmethod
     def generate_otp(length=6):
@@ -69,9 +93,14 @@ class OTPService:
             # Generate OTP
             otp = OTPService.generate_otp()
             
-            # Store OTP in Redis with 5-minute expiry
-            redis_key = f'vendor_otp:{vendor_id}:{page_type}'
-            redis_client.setex(redis_key, OTPService.OTP_EXPIRY_SECONDS, otp)
+            # Store OTP with 5-minute expiry (one atomic round trip; refused while locked out)
+            issued = OTPService.store.issue(f'{vendor_id}:{page_type}', otp)
+            if issued['status'] == otp_store.LOCKED:
+                logger.warning(f"⚠️  OTP requested while locked out for vendor {vendor_id}, page {page_type}")
+                return {
+                    'success': False,
+                    'message': f"Too many invalid attempts. Try again in {max(1, issued['retry_after'] // 60)} minutes."
+                }
             
             # Prepare email
             page_name = "Bank Transfer" if page_type == "bank_transfer" else "Payout History"
@@ -82,32 +111,11 @@ class OTPService:
                 sender=current_app.config['MAIL_DEFAULT_SENDER']
             )
             
-            otp_html = f"""
-            <p style="margin:0 0 12px 0;color:#e5e7eb;">Hello <strong>{vendor_name}</strong>,</p>
-            <p style="margin:0 0 14px 0;color:#cbd5e1;line-height:1.7;">
-                You are trying to access <strong>{page_name}</strong> for <strong>{cafe_name}</strong>.
-                Please verify with the OTP below.
-            </p>
-            <div style="background:#0a1f45;border:1px solid #1d4ed8;border-radius:10px;padding:18px;text-align:center;margin:16px 0;">
-                <div style="color:#93c5fd;font-size:13px;margin-bottom:6px;">One-Time Password</div>
-                <div style="color:#ffffff;font-size:36px;letter-spacing:8px;font-weight:700;">{otp}</div>
-            </div>
-            <div style="background:#2b170a;border:1px solid #7c2d12;border-radius:8px;padding:12px;color:#fcd34d;line-height:1.65;">
-                <strong>Important:</strong>
-                <ul style="margin:8px 0 0 18px;padding:0;">
-                    <li>This OTP is valid for 5 minutes.</li>
-                    <li>Never share this OTP with anyone.</li>
-                    <li>Hash For Gamers support will never ask for your OTP.</li>
-                    <li>If you did not request this, you can ignore this email.</li>
-                </ul>
-            </div>
-            <p style="margin:14px 0 0 0;color:#94a3b8;font-size:12px;">
-                This is an automated security email from Hash For Gamers dashboard.
-            </p>
-            """
             msg.html = build_hfg_email_html(
                 subject=msg.subject,
-                content_html=otp_html,
+                content_html=OTP_EMAIL_TEMPLATE.render(
+                    vendor_name=vendor_name, page_name=page_name, cafe_name=cafe_name, otp=otp
+                ),
                 preview_text=f"Your OTP for {page_name} is {otp}",
             )
             
@@ -136,13 +144,8 @@ Hash For Gamers Team
 This is an automated security email. Please do not reply.
 """
             
-            # CRITICAL: Send email asynchronously in background thread
-            # This allows the API to return immediately (50-100ms instead of 1500-3000ms)
-            Thread(
-                target=send_async_email,
-                args=(current_app._get_current_object(), msg),
-                daemon=True
-            ).start()
+            # Queued for the mail worker; the API returns without waiting on SMTP
+            MailQueue.enqueue(msg, category="vendor_otp", meta={"vendor_id": vendor_id, "page_type": page_type})
             
             elapsed = (datetime.now() - start_time).total_seconds() * 1000
             logger.info(f"✅ OTP generated for vendor {vendor_id} ({vendor_email}) for {page_type} in {elapsed:.2f}ms")
@@ -167,36 +170,28 @@ This is an automated security email. Please do not reply.
         start_time = datetime.now()
         
         try:
-            redis_key = f'vendor_otp:{vendor_id}:{page_type}'
-            stored_otp = redis_client.get(redis_key)
-            
-            if not stored_otp:
-                logger.warning(f"⚠️  OTP not found or expired for vendor {vendor_id}, page {page_type}")
-                return {'success': False, 'message': 'OTP expired or not found. Please request a new one.'}
-            
-            # Handle bytes vs string (if decode_responses is False)
-            if isinstance(stored_otp, bytes):
-                stored_otp = stored_otp.decode('utf-8')
+            result = OTPService.store.verify(f'{vendor_id}:{page_type}', str(provided_otp or ''))
+            elapsed = (datetime.now() - start_time).total_seconds() * 1000
             
-            if provided_otp.strip() == stored_otp.strip():
-                # OTP is correct - delete it and set verification flag
-                redis_client.delete(redis_key)
-                
-                # Mark as verified for 30 minutes
-                verification_key = f'vendor_verified:{vendor_id}:{page_type}'
-                redis_client.setex(
-                    verification_key, 
-                    OTPService.VERIFICATION_EXPIRY_SECONDS, 
-                    'verified'
-                )
-                
-                elapsed = (datetime.now() - start_time).total_seconds() * 1000
+            if result['status'] == otp_store.VERIFIED:
+                # OTP consumed and verification flag set for 30 minutes in the same script
                 logger.info(f"✅ OTP verified for vendor {vendor_id} for {page_type} in {elapsed:.2f}ms")
                 return {'success': True, 'message': 'OTP verified successfully'}
-            else:
-                elapsed = (datetime.now() - start_time).total_seconds() * 1000
-                logger.warning(f"⚠️  Invalid OTP for vendor {vendor_id}, page {page_type} (took {elapsed:.2f}ms)")
-                return {'success': False, 'message': 'Invalid OTP. Please try again.'}
+            if result['status'] == otp_store.EXPIRED:
+                logger.warning(f"⚠️  OTP not found or expired for vendor {vendor_id}, page {page_type}")
+                return {'success': False, 'message': 'OTP expired or not found. Please request a new one.'}
+            if result['status'] == otp_store.LOCKED:
+                logger.warning(f"🔒 OTP locked out for vendor {vendor_id}, page {page_type}")
+                return {
+                    'success': False,
+                    'message': f"Too many invalid attempts. Try again in {max(1, result['retry_after'] // 60)} minutes."
+                }
+            logger.warning(f"⚠️  Invalid OTP for vendor {vendor_id}, page {page_type} (took {elapsed:.2f}ms)")
+            return {
+                'success': False,
+                'message': 'Invalid OTP. Please try again.',
+                'attempts_left': result['attempts_left']
+            }
                 
         except Exception as e:
             elapsed = (datetime.now() - start_time).total_seconds() * 1000
@@ -210,8 +205,7 @@ This is an automated security email. Please do not reply.
         Just checks Redis - no database query
         """
         try:
-            verification_key = f'vendor_verified:{vendor_id}:{page_type}'
-            is_verified = redis_client.exists(verification_key) > 0
+            is_verified = OTPService.store.is_verified(f'{vendor_id}:{page_type}')
             
             logger.debug(f"{'✅' if is_verified else '❌'} Verification check for vendor {vendor_id}, {page_type}: {is_verified}")
             return is_verified
@@ -224,8 +218,7 @@ This is an automated security email. Please do not reply.
     def clear_verification(vendor_id, page_type):
         """Clear verification status"""
         try:
-            verification_key = f'vendor_verified:{vendor_id}:{page_type}'
-            redis_client.delete(verification_key)
+            OTPService.store.clear_verified(f'{vendor_id}:{page_type}')
             logger.info(f"🗑️  Verification cleared for vendor {vendor_id}, page {page_type}")
             return True
         except Exception as e:
@@ -236,9 +229,7 @@ This is an automated security email. Please do not reply.
     def clear_all_verification(vendor_id):
         """Clear all verification status for a vendor (for logout)"""
         try:
-            for page_type in ['bank_transfer', 'payout_history']:
-                verification_key = f'vendor_verified:{vendor_id}:{page_type}'
-                redis_client.delete(verification_key)
+            OTPService.store.clear_verified(*(f'{vendor_id}:{page_type}' for page_type in ['bank_transfer', 'payout_history']))
             
             logger.info(f"🗑️  All verification cleared for vendor {vendor_id}")
             return True
@@ -250,11 +241,7 @@ This is an automated security email. Please do not reply.
     def resend_otp(vendor_id, page_type):
         """Resend OTP"""
         try:
-            # Delete existing OTP
-            redis_key = f'vendor_otp:{vendor_id}:{page_type}'
-            redis_client.delete(redis_key)
-            
-            # Send new OTP
+            # Send new OTP (issuing overwrites the existing one)
             result = OTPService.send_otp(vendor_id, page_type)
             
             if result['success']:
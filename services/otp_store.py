@@ -0,0 +1,165 @@
+# services/otp_store.py
+
+import os
+from typing import Dict, Optional
+
+from db.extensions import redis_client
+
+# Wrong codes allowed within OTP_ATTEMPT_WINDOW_SECONDS before the subject is locked out.
+OTP_MAX_ATTEMPTS = max(1, int(os.getenv("OTP_MAX_ATTEMPTS", "5")))
+OTP_ATTEMPT_WINDOW_SECONDS = int(os.getenv("OTP_ATTEMPT_WINDOW_SECONDS", "900"))
+OTP_LOCKOUT_SECONDS = int(os.getenv("OTP_LOCKOUT_SECONDS", "900"))
+
+ISSUED = "issued"
+VERIFIED = "verified"
+INVALID = "invalid"
+EXPIRED = "expired"
+LOCKED = "locked"
+COOLDOWN = "cooldown"
+MISMATCH = "mismatch"
+CONSUMED = "consumed"
+
+# KEYS: otp, cooldown, verified, lock
+# ARGV: otp, otp_ttl, cooldown_ttl, clear_verified
+# Failed-attempt counters are deliberately kept across re-issues, so requesting a
+# fresh code does not reset the lockout budget.
+_ISSUE_LUA = """
+local lock_ttl = redis.call('TTL', KEYS[4])
+if lock_ttl > 0 then return {'locked', lock_ttl} end
+local cooldown = tonumber(ARGV[3])
+if cooldown > 0 then
+  local cooldown_ttl = redis.call('TTL', KEYS[2])
+  if cooldown_ttl > 0 then return {'cooldown', cooldown_ttl} end
+  redis.call('SET', KEYS[2], '1', 'EX', cooldown)
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', tonumber(ARGV[2]))
+if ARGV[4] == '1' then redis.call('DEL', KEYS[3]) end
+return {'issued', 0}
+"""
+
+# KEYS: otp, verified, attempts, lock[, token]
+# ARGV: provided, verified_ttl, verified_value, max_attempts, attempt_window, lockout_ttl[, token_value]
+_VERIFY_LUA = """
+local lock_ttl = redis.call('TTL', KEYS[4])
+if lock_ttl > 0 then return {'locked', lock_ttl} end
+local stored = redis.call('GET', KEYS[1])
+if not stored then return {'expired', 0} end
+if stored ~= ARGV[1] then
+  local failures = redis.call('INCR', KEYS[3])
+  if failures == 1 then redis.call('EXPIRE', KEYS[3], tonumber(ARGV[5])) end
+  local max_attempts = tonumber(ARGV[4])
+  if failures >= max_attempts then
+    redis.call('SET', KEYS[4], '1', 'EX', tonumber(ARGV[6]))
+    redis.call('DEL', KEYS[1], KEYS[3])
+    return {'locked', tonumber(ARGV[6])}
+  end
+  return {'invalid', max_attempts - failures}
+end
+redis.call('DEL', KEYS[1], KEYS[3])
+redis.call('SET', KEYS[2], ARGV[3], 'EX', tonumber(ARGV[2]))
+if KEYS[5] then redis.call('SET', KEYS[5], ARGV[7], 'EX', tonumber(ARGV[2])) end
+return {'verified', 0}
+"""
+
+# KEYS: token, verified   ARGV: expected_value, verified_ttl
+_CONSUME_TOKEN_LUA = """
+local stored = redis.call('GET', KEYS[1])
+if not stored then return 'expired' end
+if stored ~= ARGV[1] then return 'mismatch' end
+redis.call('DEL', KEYS[1])
+redis.call('SET', KEYS[2], '1', 'EX', tonumber(ARGV[2]))
+return 'consumed'
+"""
+
+# register_script sends EVALSHA (falling back to EVAL once per process), so each
+# flow below is a single Redis round trip.
+_issue_script = redis_client.register_script(_ISSUE_LUA)
+_verify_script = redis_client.register_script(_VERIFY_LUA)
+_consume_token_script = redis_client.register_script(_CONSUME_TOKEN_LUA)
+
+
+class OTPStore:
+    """
+    Atomic OTP flows on Redis.
+
+    Each store is one OTP namespace: key patterns (formatted with `subject`) and
+    lifetimes. issue, verify and consume_token each run as one Lua script, so the
+    cooldown check, the writes and the failed-attempt counter cannot interleave
+    with a concurrent request. OTP_MAX_ATTEMPTS wrong codes within
+    OTP_ATTEMPT_WINDOW_SECONDS lock the subject out for OTP_LOCKOUT_SECONDS.
+
+    Results are dicts with "status" (one of the module constants) and, where it
+    applies, "retry_after" seconds or "attempts_left".
+    """
+
+    def __init__(self, otp_key: str, verified_key: str, otp_ttl: int, verified_ttl: int,
+                 cooldown_key: Optional[str] = None, cooldown_seconds: int = 0,
+                 verified_value: str = "1", clear_verified_on_issue: bool = False):
+        self.otp_key = otp_key
+        self.verified_key = verified_key
+        self.cooldown_key = cooldown_key or f"{otp_key}:cooldown"
+        self.attempts_key = f"{otp_key}:attempts"
+        self.lock_key = f"{otp_key}:lock"
+        self.otp_ttl = int(otp_ttl)
+        self.verified_ttl = int(verified_ttl)
+        self.cooldown_seconds = int(cooldown_seconds)
+        self.verified_value = verified_value
+        self.clear_verified_on_issue = clear_verified_on_issue
+
+    def _keys(self, subject) -> Dict[str, str]:
+        return {
+            name: pattern.format(subject=subject)
+            for name, pattern in (
+                ("otp", self.otp_key),
+                ("verified", self.verified_key),
+                ("cooldown", self.cooldown_key),
+                ("attempts", self.attempts_key),
+                ("lock", self.lock_key),
+            )
+        }
+
+    def issue(self, subject, otp: str) -> Dict:
+        """Store `otp` unless the subject is locked out or inside its resend cooldown."""
+        keys = self._keys(subject)
+        status, ttl = _issue_script(
+            keys=[keys["otp"], keys["cooldown"], keys["verified"], keys["lock"]],
+            args=[otp, self.otp_ttl, self.cooldown_seconds, "1" if self.clear_verified_on_issue else "0"],
+        )
+        if status == ISSUED:
+            return {"status": ISSUED}
+        return {"status": status, "retry_after": int(ttl)}
+
+    def verify(self, subject, provided: str, token_key: Optional[str] = None,
+               token_value: Optional[str] = None) -> Dict:
+        """
+        Check `provided` against the stored OTP. On success the OTP and failure count
+        are cleared, the verified flag is set and, when given, `token_key` is set to
+        `token_value` for the verified lifetime.
+        """
+        keys = self._keys(subject)
+        redis_keys = [keys["otp"], keys["verified"], keys["attempts"], keys["lock"]]
+        args = [str(provided or "").strip(), self.verified_ttl, self.verified_value,
+                OTP_MAX_ATTEMPTS, OTP_ATTEMPT_WINDOW_SECONDS, OTP_LOCKOUT_SECONDS]
+        if token_key:
+            redis_keys.append(token_key)
+            args.append(token_value)
+        status, value = _verify_script(keys=redis_keys, args=args)
+        if status == INVALID:
+            return {"status": INVALID, "attempts_left": int(value)}
+        if status == LOCKED:
+            return {"status": LOCKED, "retry_after": int(value)}
+        return {"status": status}
+
+    def consume_token(self, token_key: str, expected_value: str, subject) -> str:
+        """Spend a one-time token holding `expected_value` and (re)set the subject's verified flag."""
+        return _consume_token_script(
+            keys=[token_key, self._keys(subject)["verified"]],
+            args=[expected_value, self.verified_ttl],
+        )
+
+    def is_verified(self, subject) -> bool:
+        return redis_client.exists(self._keys(subject)["verified"]) > 0
+
+    def clear_verified(self, *subjects) -> None:
+        if subjects:
+            redis_client.delete(*(self._keys(subject)["verified"] for subject in subjects))
@@ -15,45 +15,77 @@ from models.hardwareSpecification import HardwareSpecification
 from models.maintenanceStatus import MaintenanceStatus
 from models.priceAndCost import PriceAndCost
 from models.additionalDetails import AdditionalDetails
-from models.businessRegistration import BusinessRegistration
 from models.timing import Timing
 from models.amenity import Amenity
-from models.openingDay import OpeningDay
 from models.vendorDaySlotConfig import VendorDaySlotConfig
 from models.vendorCredentials import VendorCredential
 from models.passwordManager import PasswordManager
 from models.vendorStatus import VendorStatus
 from models.uploadedImage import Image
-from models.slots import Slot
 from models.game import Game
 from models.vendorGame import VendorGame
-from models.vendorAccount import VendorAccount
 from models.vendorPin import VendorPin
-from models.booking import Booking
-from models.transaction import Transaction
 from models.paymentMethod import PaymentMethod
 from models.paymentVendorMap import PaymentVendorMap
 from sqlalchemy import exists
 from db.extensions import db
-from .utils import send_email, generate_credentials, generate_unique_vendor_pin
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseUpload
-from google.oauth2 import service_account
-import io
+from .utils import send_email, generate_credentials
+from services.upload_streams import drive_media
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
-from threading import Thread
+from concurrent.futures import ThreadPoolExecutor
 from flask_mail import Message
-from db.extensions import mail
-from services.email_template import build_hfg_email_html
+from services.email_template import EmailTemplate, build_hfg_email_html
+from services.catalogue_cache import CatalogueCache
+from services.drive_client import DriveClient
+from services.geo_index_service import GeoIndexService
+from services.game_service import GameService
+from services.onboarding_writer import OnboardingWriter, count_round_trips
+from services.deboard_engine import DeboardEngine
+from services.mail_queue import MailQueue
+from services.slot_inventory import SlotInventoryStore, SLOT, CONSOLE_AVAILABILITY, DASHBOARD, PROMO_DETAIL
 
 from sqlalchemy import case, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy import text
 
 from sqlalchemy import and_
 from sqlalchemy.orm import joinedload
 
 
+PHOTO_UPLOAD_CONCURRENT = str(os.getenv("PHOTO_UPLOAD_CONCURRENT", "true")).strip().lower() in {"1", "true", "yes", "y", "on"}
+PHOTO_UPLOAD_MAX_WORKERS = max(1, int(os.getenv("PHOTO_UPLOAD_MAX_WORKERS", "4")))
+# Shared by every request so its worker threads, and the Drive service each one
+# caches (DriveClient.service), live for the whole process. Threads start lazily.
+_PHOTO_UPLOAD_EXECUTOR = ThreadPoolExecutor(max_workers=PHOTO_UPLOAD_MAX_WORKERS, thread_name_prefix="drive-upload")
+
+WELCOME_PASSWORD_TEMPLATE = EmailTemplate("<strong>{{ password }}</strong>")
+WELCOME_PARENT_ROW_TEMPLATE = EmailTemplate(
+    "<tr><td style='padding:8px 0;color:#94a3b8;'>Parent Account Email</td>"
+    "<td style='padding:8px 0;color:#e2e8f0;'><strong>{{ parent_email }}</strong></td></tr>"
+)
+WELCOME_EMAIL_TEMPLATE = EmailTemplate("""
+<p style="margin:0 0 12px 0;color:#e5e7eb;">Hello <strong>{{ owner_name }}</strong>,</p>
+<p style="margin:0 0 16px 0;line-height:1.7;color:#cbd5e1;">
+  Your cafe <strong>{{ cafe_name }}</strong> has been onboarded successfully.
+</p>
+<table role="presentation" width="100%" cellpadding="0" cellspacing="0" style="border:1px solid #1e2a44;border-radius:10px;padding:12px;background:#08142c;">
+  <tr><td style="padding:8px 0;color:#94a3b8;">Login Email</td><td style="padding:8px 0;color:#e2e8f0;"><strong>{{ email }}</strong></td></tr>
+  <tr><td style="padding:8px 0;color:#94a3b8;">Password</td><td style="padding:8px 0;color:#e2e8f0;">{{ password_html|raw }}</td></tr>
+  <tr><td style="padding:8px 0;color:#94a3b8;">Vendor PIN</td><td style="padding:8px 0;color:#e2e8f0;"><strong>{{ pin_code }}</strong></td></tr>
+  <tr><td style="padding:8px 0;color:#94a3b8;">Vendor ID</td><td style="padding:8px 0;color:#e2e8f0;"><strong>{{ vendor_id }}</strong></td></tr>
+  {{ parent_row|raw }}
+</table>
+<p style="margin:16px 0 6px 0;line-height:1.6;color:#cbd5e1;">
+  Dashboard: <a href="{{ dashboard_url }}" style="color:#60a5fa;text-decoration:none;">{{ dashboard_url }}</a>
+</p>
+<p style="margin:6px 0 0 0;line-height:1.6;color:#cbd5e1;">Status: <strong>Pending Verification</strong></p>
+<p style="margin:18px 0 0 0;font-size:12px;color:#94a3b8;line-height:1.6;">
+  Keep credentials confidential. If you did not request this onboarding, contact Hash support immediately.
+</p>
+""")
+
+
 class VendorService:
 
     PAYMENT_METHOD_ALIASES = {
@@ -62,6 +94,34 @@ class VendorService:
         "cafe_specific_pass": {"cafe_specific_pass", "cafe specific pass", "vendor pass"},
     }
 
+    GAMING_CAFE_LISTING_FIELDS = (
+        "vendor_id",
+        "cafe_name",
+        "owner_name",
+        "status",
+        "created_at",
+        "updated_at",
+        "email",
+        "phone",
+        "address",
+        "coordinates",
+        "opening_time",
+        "closing_time",
+        "total_documents",
+        "verified_documents",
+        "amenities",
+        "images",
+        "subscription",
+        "payment_methods",
+        "accepted_payment_methods",
+        "accepted_payment_method_list",
+    )
+    GAMING_CAFE_FIELD_PRESETS = {
+        # Consumer map view: pin, label and today's hours only.
+        "map": {"vendor_id", "cafe_name", "coordinates", "opening_time", "closing_time"},
+    }
+    GAMING_CAFE_MAX_PAGE_SIZE = 200
+
     @staticmethod
     def _normalize_payment_method_name(method_name):
         if not method_name:
@@ -93,432 +153,217 @@ class VendorService:
             return None
         
     @staticmethod
-    def onboard_vendor(data, files):
+    def onboard_vendor(data, files, defer_vendor_tables=False):
+        """
+        Write the vendor's core entity graph. Input is validated and turned into a
+        write plan first; OnboardingWriter then persists it in two statements
+        (vendor graph, inventory graph), vendor games follow in a savepoint and the
+        whole transaction commits once.
+        """
         current_app.logger.debug("Onboard Vendor Started.")
         current_app.logger.debug(f"Received data: {data}")
         current_app.logger.debug(f"Received files: {files}")
     
         try:
-           vendor_account = None
-           contact_payload = data.get("contact_info", {}) or {}
-           vendor_account_email = (data.get("vendor_account_email") or contact_payload.get("email") or "").strip().lower()
-
-           if not vendor_account_email:
-               raise ValueError("vendor_account_email (or contact email) is required")
-
-           # Create or get VendorAccount (case-insensitive)
-           vendor_account = (
-               VendorAccount.query
-               .filter(func.lower(VendorAccount.email) == vendor_account_email)
-               .first()
-           )
-           if not vendor_account:
-               vendor_account = VendorAccount(email=vendor_account_email)
-               db.session.add(vendor_account)
-               db.session.flush()
-               current_app.logger.info(f"Created VendorAccount for {vendor_account_email} with ID: {vendor_account.id}")
-           else:
-               current_app.logger.info(f"Found existing VendorAccount with ID: {vendor_account.id}")
-
-           # Keep normalized value for downstream workflows and transparency
-           data["vendor_account_email"] = vendor_account_email
-
-        # Step 1: Vendor creation with explicit account_id
-           vendor = Vendor(
-               cafe_name=data.get("cafe_name"),
-               owner_name=data.get("owner_name"),
-               description=data.get("description", ""),
-               business_registration_id=None,
-               timing_id=None,
-               account_id=vendor_account.id if vendor_account else None
-           )
-           db.session.add(vendor)
-           db.session.flush()
-           current_app.logger.info(f"Vendor created with ID: {vendor.id}, Account ID: {vendor.account_id}")
-
-        # Verify the relationship works
-           if vendor_account:
-              try:
-                 test_account = vendor.account  # This should work if relationship is correct
-                 current_app.logger.info(f"Vendor account relationship verified: {test_account.email if test_account else 'None'}")
-              except Exception as e:
-                 current_app.logger.warning(f"Vendor account relationship issue: {e}")
-
-        # ✅ UPDATED Step 2: Vendor PIN - Use provided or generate
-           provided_pin = data.get("vendor_pin")
-           if provided_pin and provided_pin.strip():
-               # Validate PIN format
-               if not re.match(r'^\d{4}$', provided_pin.strip()):
-                   raise ValueError("PIN must be exactly 4 digits")
-               pin_code = provided_pin.strip()
-               current_app.logger.info(f"Using provided PIN for vendor {vendor.id}")
-           else:
-               pin_code = generate_unique_vendor_pin()
-               current_app.logger.info(f"Generated PIN for vendor {vendor.id}")
-           
-           vendor_pin = VendorPin(
-               vendor_id=vendor.id,
-               pin_code=pin_code
-           )
-           db.session.add(vendor_pin)
-           
-           # ✅ ADDED: Store provided password temporarily if given
-           provided_password = data.get("vendor_password")
-           if provided_password and provided_password.strip():
-               if len(provided_password.strip()) < 6:
-                   raise ValueError("Password must be at least 6 characters")
-               vendor._temp_password = provided_password.strip()  # Temporary storage
-               current_app.logger.info(f"Manual password provided for vendor {vendor.id}")
-           else:
-               vendor._temp_password = None
-               current_app.logger.info(f"Will auto-generate password for vendor {vendor.id}")
-
-        # Step 3: Contact Info
-           contact = data.get("contact_info", {}) or {}
-           contact_email = (contact.get("email") or vendor_account_email).strip().lower()
-           contact_info = ContactInfo(
-              email=contact_email,
-              phone=contact.get("phone"),
-              parent_id=vendor.id,
-              parent_type="vendor"
-           )
-           db.session.add(contact_info)
-
-        # Step 4: Address
-           address = data.get("physicalAddress", {})
-           physical_address = PhysicalAddress(
-               address_type=address.get("address_type"),
-               addressLine1=address.get("addressLine1"),
-               addressLine2=address.get("addressLine2"),
-               pincode=address.get("pincode"),
-               state=address.get("state"),
-               country=address.get("country"),
-               latitude=address.get("latitude"),
-               longitude=address.get("longitude"),
-               parent_id=vendor.id,
-               parent_type="vendor"
-           )
-           db.session.add(physical_address)
-
-        # Step 5: Business Registration with safe parsing
-           registration = data.get("business_registration_details", {})
-           registration_date_str = registration.get("registration_date")
-        
-           if registration_date_str:
-               registration_date_parsed = VendorService.safe_strptime(registration_date_str, "%Y-%m-%d")
-               if registration_date_parsed:
-                  registration_date = registration_date_parsed.date()
-               else:
-                   registration_date = datetime.now().date()
-           else:
-               registration_date = datetime.now().date()
-        
-           business_registration = BusinessRegistration(
-                registration_number=registration.get("registration_number"),
-                registration_date=registration_date
-            )
-           db.session.add(business_registration)
-
-        # Step 6: Timing with safe parsing
-           timing_data = data.get("timing", {})
-           opening_time_str = timing_data.get("opening_time")
-           closing_time_str = timing_data.get("closing_time")
-        
-           if not opening_time_str or not closing_time_str:
-              raise ValueError("Opening time and closing time are required")
-        
-           opening_time_parsed = VendorService.safe_strptime(opening_time_str, "%I:%M %p")
-           closing_time_parsed = VendorService.safe_strptime(closing_time_str, "%I:%M %p")
-        
-           if not opening_time_parsed or not closing_time_parsed:
-               raise ValueError(f"Invalid time format: opening_time={opening_time_str}, closing_time={closing_time_str}")
-        
-           opening_time = opening_time_parsed.time()
-           closing_time = closing_time_parsed.time()
-
-           timing = Timing(opening_time=opening_time, closing_time=closing_time)
-           db.session.add(timing)
-
-        # Step 7: Update Vendor with foreign keys
-           db.session.flush()
-           vendor.business_registration_id = business_registration.id
-           vendor.timing_id = timing.id
-           db.session.flush()
-
-        # Step 8: Opening Days
-           opening_day_data = data.get("opening_day", {})
-           opening_days = [
-                OpeningDay(day=day, is_open=is_open, vendor_id=vendor.id)
-                for day, is_open in opening_day_data.items()
-            ]
-           db.session.add_all(opening_days)
-
-                # Step 9: Amenities
-           # ✅ All default amenities — always created, default False
-           DEFAULT_AMENITIES = [
-               "24/7",
-               "Parking",
-               "seating_area",
-               "sound_system",
-               "washroom",
-               "air_conditioner",
-               "food",
-           ]
-
-           # Get amenities from payload (if any)
-           payload_amenities = data.get("amenities", {})
-
-           # Merge: default list + payload values, fallback to False
-           amenities = [
-               Amenity(
-                   name=amenity_name,
-                   available=payload_amenities.get(amenity_name, False),
-                   vendor_id=vendor.id
+           with count_round_trips() as round_trips:
+               contact_payload = data.get("contact_info", {}) or {}
+               vendor_account_email = (data.get("vendor_account_email") or contact_payload.get("email") or "").strip().lower()
+
+               if not vendor_account_email:
+                   raise ValueError("vendor_account_email (or contact email) is required")
+
+               # Keep normalized value for downstream workflows and transparency
+               data["vendor_account_email"] = vendor_account_email
+
+            # Vendor PIN - use provided or let the writer pick a free one
+               provided_pin = data.get("vendor_pin")
+               pin_code = None
+               if provided_pin and provided_pin.strip():
+                   # Validate PIN format
+                   if not re.match(r'^\d{4}$', provided_pin.strip()):
+                       raise ValueError("PIN must be exactly 4 digits")
+                   pin_code = provided_pin.strip()
+
+               # Store provided password temporarily if given
+               provided_password = data.get("vendor_password")
+               temp_password = None
+               if provided_password and provided_password.strip():
+                   if len(provided_password.strip()) < 6:
+                       raise ValueError("Password must be at least 6 characters")
+                   temp_password = provided_password.strip()
+
+            # Business Registration with safe parsing
+               registration = data.get("business_registration_details", {})
+               registration_date = None
+               if registration.get("registration_date"):
+                   registration_date_parsed = VendorService.safe_strptime(registration.get("registration_date"), "%Y-%m-%d")
+                   if registration_date_parsed:
+                       registration_date = registration_date_parsed.date()
+               registration_date = registration_date or datetime.now().date()
+
+            # Timing with safe parsing
+               timing_data = data.get("timing", {})
+               opening_time_str = timing_data.get("opening_time")
+               closing_time_str = timing_data.get("closing_time")
+            
+               if not opening_time_str or not closing_time_str:
+                  raise ValueError("Opening time and closing time are required")
+            
+               opening_time_parsed = VendorService.safe_strptime(opening_time_str, "%I:%M %p")
+               closing_time_parsed = VendorService.safe_strptime(closing_time_str, "%I:%M %p")
+            
+               if not opening_time_parsed or not closing_time_parsed:
+                   raise ValueError(f"Invalid time format: opening_time={opening_time_str}, closing_time={closing_time_str}")
+            
+               opening_time = opening_time_parsed.time()
+               closing_time = closing_time_parsed.time()
+
+            # Amenities: all defaults are always created, default False
+               DEFAULT_AMENITIES = [
+                   "24/7",
+                   "Parking",
+                   "seating_area",
+                   "sound_system",
+                   "washroom",
+                   "air_conditioner",
+                   "food",
+               ]
+               payload_amenities = data.get("amenities", {})
+
+               contact = data.get("contact_info", {}) or {}
+               address = data.get("physicalAddress", {})
+
+            # Stage 1: account, registration, timing, vendor, PIN, contact, address, days, amenities
+               vendor_row = OnboardingWriter.write_vendor({
+                   "account_email": vendor_account_email,
+                   "cafe_name": data.get("cafe_name"),
+                   "owner_name": data.get("owner_name"),
+                   "description": data.get("description", ""),
+                   "registration_number": registration.get("registration_number"),
+                   "registration_date": registration_date,
+                   "opening_time": opening_time,
+                   "closing_time": closing_time,
+                   "pin_code": pin_code,
+                   "contact_email": (contact.get("email") or vendor_account_email).strip().lower(),
+                   "contact_phone": contact.get("phone"),
+                   "address": address,
+                   "opening_days": data.get("opening_day", {}) or {},
+                   "amenities": {name: payload_amenities.get(name, False) for name in DEFAULT_AMENITIES},
+               })
+               vendor_id = vendor_row["vendor_id"]
+               current_app.logger.info(
+                   f"Vendor created with ID: {vendor_id}, Account ID: {vendor_row['account_id']} "
+                   f"({'new' if vendor_row['account_created'] else 'existing'} account), "
+                   f"{'provided' if pin_code else 'generated'} PIN, "
+                   f"{'manual' if temp_password else 'auto-generated'} password"
                )
-               for amenity_name in DEFAULT_AMENITIES
-           ]
-           db.session.add_all(amenities)
-           current_app.logger.info(f"Created {len(amenities)} amenity records for vendor {vendor.id}")
-
-
-
-        # Step 10: Available Games
-           available_games_data = data.get("available_games", {})
-           available_games_instances = [
-                AvailableGame(
-                   game_name=game_name,
-                   total_slot=details.get("total_slot", 0),
-                   single_slot_price=details.get("single_slot_price", 0),
-                   vendor_id=vendor.id
-                ) for game_name, details in available_games_data.items()
-            ]
-           db.session.add_all(available_games_instances)
-           db.session.flush()
-           
-                      # ✅ UPDATED Step 10.5: Create Console Records WITH Child Tables AND Link to AvailableGame
-           current_app.logger.debug("Creating console records for the vendor.")
-           console_brand_map = {
-               'pc': 'Custom Build',
-               'ps5': 'Sony',
-               'xbox': 'Microsoft',
-               'vr': 'Meta/Oculus'
-           }
-           
-           console_model_map = {
-               'pc': 'Gaming PC',
-               'ps5': 'PlayStation 5',
-               'xbox': 'Xbox Series X',
-               'vr': 'Quest 2/3'
-           }
-           
-           # ✅ Create a mapping of game_name to AvailableGame instance
-           available_games_map = {game.game_name.lower(): game for game in available_games_instances}
-           
-           all_consoles = []
-           for game_name, details in available_games_data.items():
-               total_slots = details.get("total_slot", 0)
-               game_type = game_name.lower()
-               current_app.logger.debug(f"Creating {total_slots} consoles for game type: {game_type}")
-               
-               # ✅ Get the corresponding AvailableGame instance
-               available_game = available_games_map.get(game_type)
-               if not available_game:
-                   current_app.logger.warning(f"No AvailableGame found for game_type: {game_type}")
-                   continue
-               
-               for slot_num in range(1, total_slots + 1):
-                   # Create Console
-                   console = Console(
-                       vendor_id=vendor.id,
-                       console_number=slot_num,
-                       model_number=console_model_map.get(game_type, 'Unknown'),
-                       serial_number=f"{vendor.id}-{game_type.upper()}-{slot_num:03d}-{datetime.now().strftime('%Y%m%d')}",
-                       brand=console_brand_map.get(game_type, 'Generic'),
-                       console_type=game_type,
-                       release_date=None,
-                       description=f"{game_type.upper()} Console #{slot_num} for {vendor.cafe_name}"
-                   )
-                   db.session.add(console)
-                   db.session.flush()  # Get console.id
-                   
-                   # ✅ LINK Console to AvailableGame (Many-to-Many)
-                   available_game.consoles.append(console)
-                   
-                   # Create child records
-                   hardware_spec = HardwareSpecification(
-                       console_id=console.id,
-                       processor_type="" if game_type == "pc" else None,
-                       graphics_card="" if game_type == "pc" else None,
-                       ram_size="" if game_type == "pc" else None,
-                       storage_capacity="" if game_type == "pc" else None,
-                       connectivity="" if game_type == "pc" else None,
-                       console_model_type=console_model_map.get(game_type, "")
-                   )
-                   db.session.add(hardware_spec)
-                   
-                   maintenance_status = MaintenanceStatus(
-                       console_id=console.id,
-                       available_status="available",
-                       condition="new",
-                       last_maintenance=datetime.now().date(),
-                       next_maintenance=(datetime.now() + timedelta(days=90)).date(),
-                       maintenance_notes="Initial setup during onboarding"
-                   )
-                   db.session.add(maintenance_status)
-                   
-                   price_and_cost = PriceAndCost(
-                       console_id=console.id,
-                       price=0,
-                       rental_price=details.get("single_slot_price", 0),
-                       warranty_period="1 year",
-                       insurance_status="notInsured"
-                   )
-                   db.session.add(price_and_cost)
-                   
-                   additional_details = AdditionalDetails(
-                       console_id=console.id,
-                       supported_games="",
-                       accessories=""
-                   )
-                   db.session.add(additional_details)
-                   
-                   all_consoles.append(console)
-                   
-           if all_consoles:
-               db.session.flush()  # Flush all changes including the association
-               current_app.logger.info(f"Created {len(all_consoles)} console records with associations for vendor {vendor.id}")
-           else:
-               current_app.logger.warning(f"No consoles created for vendor {vendor.id}")
-
-
-
-        # Step 11: Slot Creation
-           current_app.logger.debug("Creating slots for the vendor.")
-           try:
-              game_slots = {
-                 game_name.lower(): details.get("total_slot", 0)
-                 for game_name, details in available_games_data.items()
-               }
-              game_ids = {
-                  game.game_name.lower(): game.id
-                 for game in available_games_instances
-               }
-
-              today = datetime.today()
-              current_time = datetime.combine(today, opening_time)
-              closing_datetime = datetime.combine(today, closing_time)
 
-            # Handle 12:00 AM case (i.e., after midnight)
-              if closing_datetime <= current_time:
-                closing_datetime += timedelta(days=1)
+            # Slot windows from opening to closing time
+               today = datetime.today()
+               current_time = datetime.combine(today, opening_time)
+               closing_datetime = datetime.combine(today, closing_time)
 
-              slot_duration = data.get("slot_duration", 30)
-              slot_data = []
+               # Handle 12:00 AM case (i.e., after midnight)
+               if closing_datetime <= current_time:
+                   closing_datetime += timedelta(days=1)
 
-              while current_time < closing_datetime:
+               slot_duration = data.get("slot_duration", 30)
+               slot_windows = []
+               while current_time < closing_datetime:
                    end_time = current_time + timedelta(minutes=slot_duration)
                    if end_time > closing_datetime:
-                      break
-
-                   for game_name, total_slots in game_slots.items():
-                       game_id = game_ids.get(game_name)
-                       if not game_id:
-                          current_app.logger.warning(f"Game '{game_name}' not found.")
-                          continue
-
-                       slot = Slot(
-                          gaming_type_id=game_id,
-                          start_time=current_time.time(),
-                          end_time=end_time.time(),
-                          available_slot=total_slots,
-                          is_available=True
-                       )
-                       slot_data.append(slot)
-
+                       break
+                   slot_windows.append((current_time.time(), end_time.time()))
                    current_time = end_time
 
-                   db.session.add_all(slot_data)
-                   current_app.logger.info(f"{len(slot_data)} slots created for vendor.")
-
-           except Exception as e:
-              current_app.logger.error(f"Error creating slots: {e}")
-              raise
-
-           # ✅ NEW Step 11.5: Create VendorGame entries (Link games to consoles)
-           current_app.logger.debug("Creating vendor game associations for consoles.")
-           try:
-               # Map console_type to platform names in your Game table
-               platform_mapping = {
-                   'pc': 'PC',
+            # Stage 2: available games, slots, consoles with child rows and game links
+               available_games_data = data.get("available_games", {})
+               console_brand_map = {
+                   'pc': 'Custom Build',
+                   'ps5': 'Sony',
+                   'xbox': 'Microsoft',
+                   'vr': 'Meta/Oculus'
+               }
+               console_model_map = {
+                   'pc': 'Gaming PC',
                    'ps5': 'PlayStation 5',
-                   'xbox': 'Xbox One',
-                   'vr': 'PC'
+                   'xbox': 'Xbox Series X',
+                   'vr': 'Quest 2/3'
                }
-               
-               vendor_games_created = 0
-               for console in all_consoles:
-                   # Get platform name for this console type
-                   platform_name = platform_mapping.get(console.console_type, 'PC')
-                   
-                   # ✅ Query top 3 highest-rated games for this platform dynamically
-                   games = Game.query.filter_by(platform=platform_name)\
-                                     .order_by(Game.average_rating.desc())\
-                                     .limit(3)\
-                                     .all()
-                   
-                   if not games:
-                       current_app.logger.warning(f"No games found for platform: {platform_name}, skipping console {console.id}")
-                       continue
+               all_consoles = OnboardingWriter.write_inventory(
+                   vendor_id, data.get("cafe_name"), available_games_data, slot_windows,
+                   console_brand_map, console_model_map,
+               )
+               current_app.logger.info(
+                   f"Created {len(available_games_data)} games, "
+                   f"{len(slot_windows) * len(available_games_data)} slots and "
+                   f"{len(all_consoles)} consoles for vendor {vendor_id}"
+               )
+
+            # Stage 3: VendorGame entries (link top games to consoles)
+               current_app.logger.debug("Creating vendor game associations for consoles.")
+               try:
+                   # Map console_type to platform names in your Game table
+                   platform_mapping = {
+                       'pc': 'PC',
+                       'ps5': 'PlayStation 5',
+                       'xbox': 'Xbox One',
+                       'vr': 'PC'
+                   }
                    
-                   for game in games:
-                       try:
-                           vendor_game = VendorGame(
-                               vendor_id=vendor.id,
-                               game_id=game.id,
-                               console_id=console.id,
-                               is_available=True
-                               # ✅ NO price_per_hour - it's now a dynamic @property
-                               # Price is auto-fetched from AvailableGame.single_slot_price
-                               # or from active ConsolePricingOffer if exists
-                           )
-                           db.session.add(vendor_game)
-                           vendor_games_created += 1
-                           current_app.logger.debug(f"Added game '{game.name}' (ID:{game.id}) to console {console.id} ({console.console_type})")
-                       except Exception as inner_e:
-                           # Skip duplicates (unique constraint violation)
-                           current_app.logger.debug(f"Skipping game {game.id} for console {console.id}: {inner_e}")
-                           db.session.rollback()
+                   top_games = GameService.top_game_ids_by_platform(limit=3)
+                   vendor_game_rows = []
+                   for console in all_consoles:
+                       # Get platform name for this console type
+                       platform_name = platform_mapping.get(console.console_type, 'PC')
+                       game_ids = top_games.get(platform_name) or []
+                       if not game_ids:
+                           current_app.logger.warning(f"No games found for platform: {platform_name}, skipping console {console.id}")
                            continue
-               
-               if vendor_games_created > 0:
-                   db.session.flush()
-                   current_app.logger.info(f"✅ Created {vendor_games_created} vendor game associations for vendor {vendor.id}")
-               else:
-                   current_app.logger.warning(f"No vendor games created for vendor {vendor.id}")
-                   
-           except Exception as e:
-               current_app.logger.error(f"Error creating vendor games: {e}")
-               pass  # Don't raise - vendor can add games manually later
-
-           db.session.commit()
-
+                       vendor_game_rows.extend(
+                           {"vendor_id": vendor_id, "game_id": game_id, "console_id": console.id, "is_available": True}
+                           for game_id in game_ids
+                       )
 
-        # Final verification
-           if vendor_account:
-               final_account = VendorAccount.query.get(vendor_account.id)
-               final_vendor = Vendor.query.get(vendor.id)
-               current_app.logger.info(f"FINAL VERIFICATION:")
-               current_app.logger.info(f"- VendorAccount exists: {final_account is not None}")
-               current_app.logger.info(f"- Vendor account_id: {final_vendor.account_id}")
-               current_app.logger.info(f"- Relationship works: {final_vendor.account.email if final_vendor.account else 'NO RELATIONSHIP'}")
-            
-            
+                   # ✅ Price is not stored - VendorGame.price_per_hour is a dynamic @property.
+                   # Savepoint so a failure here never discards the onboarding transaction.
+                   vendor_games_created = 0
+                   if vendor_game_rows:
+                       with db.session.begin_nested():
+                           vendor_games_created = db.session.execute(
+                               pg_insert(VendorGame.__table__)
+                               .values(vendor_game_rows)
+                               .on_conflict_do_nothing(constraint="unique_vendor_game_console")
+                           ).rowcount or 0
+
+                   if vendor_games_created > 0:
+                       current_app.logger.info(f"✅ Created {vendor_games_created} vendor game associations for vendor {vendor_id}")
+                   else:
+                       current_app.logger.warning(f"No vendor games created for vendor {vendor_id}")
+                       
+               except Exception as e:
+                   current_app.logger.error(f"Error creating vendor games: {e}")
+                   pass  # Don't raise - vendor can add games manually later
+
+               db.session.commit()
+
+               try:
+                   GeoIndexService.index_vendor(vendor_id, address.get("latitude"), address.get("longitude"))
+               except Exception as geo_exc:
+                   db.session.rollback()
+                   current_app.logger.warning(f"Geo index update failed for vendor {vendor_id}: {geo_exc}")
+
+               vendor = db.session.get(Vendor, vendor_id)
+               vendor._temp_password = temp_password
+
+           current_app.logger.info(
+               f"Vendor {vendor_id} core rows written in {round_trips['round_trips']} DB round trips "
+               f"({round_trips['statements']} statements, {round_trips['commits']} commits)"
+           )
 
-        # Step 12: Vendor-specific table creations
-           VendorService.create_vendor_slot_table(vendor.id)
-           VendorService.create_vendor_console_availability_table(vendor.id)
-           VendorService.create_vendor_dashboard_table(vendor.id)
-           VendorService.create_vendor_promo_table(vendor.id)
+        # Vendor-specific table creations (deferred to the onboarding job when async)
+           if not defer_vendor_tables:
+               VendorService.create_vendor_tables(vendor.id)
 
            current_app.logger.info(f"Vendor onboarding completed successfully: {vendor.id}")
            return vendor
@@ -528,186 +373,59 @@ class VendorService:
           current_app.logger.error(f"Error onboarding vendor: {e}")
           raise
     
+    @staticmethod
+    def create_vendor_tables(vendor_id):
+        """Create and seed the vendor's slot, console-availability, dashboard and promo inventory."""
+        VendorService.create_vendor_slot_table(vendor_id)
+        VendorService.create_vendor_console_availability_table(vendor_id)
+        VendorService.create_vendor_dashboard_table(vendor_id)
+        VendorService.create_vendor_promo_table(vendor_id)
+
     @staticmethod
     def deboard_vendor(vendor_id):
+        """
+        Remove a vendor and everything hanging off it in one transaction
+        (see DeboardEngine). Returns {"vendor_id", "rows_removed", "dropped_tables"}.
+        """
         current_app.logger.info(f"Starting deboarding process for Vendor ID: {vendor_id}")
         try:
-            vendor = Vendor.query.get(vendor_id)
-            if not vendor:
-                raise ValueError(f"No vendor found with ID {vendor_id}")
-
-            # Step 0: Handle payment mappings, transactions and bookings
-            current_app.logger.debug("Handling payment mappings, transactions and bookings for this vendor's slots")
-
-            slot_ids_subquery = db.session.query(Slot.id).filter(
-                Slot.gaming_type_id.in_(
-                    db.session.query(AvailableGame.id).filter_by(vendor_id=vendor_id)
-                )
-            )
-
-            # Get booking IDs first
-            booking_ids = [b[0] for b in db.session.query(Booking.id).filter(
-                Booking.slot_id.in_(slot_ids_subquery)
-            ).all()]
-            
-            if booking_ids:
-                # First delete payment transaction mappings for these bookings
-                db.session.execute(text("""
-                    DELETE FROM payment_transaction_mappings
-                    WHERE transaction_id IN (
-                        SELECT id FROM transactions WHERE booking_id = ANY(:booking_ids)
-                    )
-                """), {'booking_ids': booking_ids})
-
-                # Then delete all transactions for this vendor
-                Transaction.query.filter(
-                    db.or_(
-                        Transaction.booking_id.in_(booking_ids),
-                        Transaction.vendor_id == vendor_id
-                    )
-                ).delete(synchronize_session=False)
-
-                # Finally delete the bookings
-                Booking.query.filter(Booking.id.in_(booking_ids)).delete(synchronize_session=False)
-
-            # Step 1: Delete related Slots (via AvailableGames)
-            current_app.logger.debug("Deleting related Slots")
-            Slot.query.filter(
-                Slot.gaming_type_id.in_(
-                    db.session.query(AvailableGame.id).filter_by(vendor_id=vendor_id)
-                )
-            ).delete(synchronize_session=False)
-
-            # Step 2: First delete available_game_console associations
-            current_app.logger.debug("Deleting available_game_console associations")
-            db.session.execute(text("""
-                DELETE FROM available_game_console
-                WHERE available_game_id IN (
-                    SELECT id FROM available_games WHERE vendor_id = :vendor_id
-                )
-            """), {'vendor_id': vendor_id})
-
-            # Step 3: Delete Available Games
-            current_app.logger.debug("Deleting Available Games")
-            AvailableGame.query.filter_by(vendor_id=vendor_id).delete(synchronize_session=False)
-
-            # Step 3: Delete Amenities
-            current_app.logger.debug("Deleting Amenities")
-            Amenity.query.filter_by(vendor_id=vendor_id).delete(synchronize_session=False)
-
-            # Step 4: Delete Opening Days
-            current_app.logger.debug("Deleting Opening Days")
-            OpeningDay.query.filter_by(vendor_id=vendor_id).delete(synchronize_session=False)
-
-            # Step 5: Nullify foreign key references before deleting Timing and BusinessRegistration
-            current_app.logger.debug("Nullifying vendor timing_id and business_registration_id")
-            vendor.timing_id = None
-            vendor.business_registration_id = None
-            db.session.flush()
-
-            # Step 6: Delete Timing
-            current_app.logger.debug("Deleting Timing")
-            if vendor.timing_id:
-                Timing.query.filter_by(id=vendor.timing_id).delete(synchronize_session=False)
-
-            # Step 7: Delete Business Registration
-            current_app.logger.debug("Deleting Business Registration")
-            if vendor.business_registration_id:
-                BusinessRegistration.query.filter_by(id=vendor.business_registration_id).delete(synchronize_session=False)
-
-            # Step 8: Delete Physical Address
-            current_app.logger.debug("Deleting Physical Address")
-            PhysicalAddress.query.filter_by(parent_id=vendor_id, parent_type="vendor").delete(synchronize_session=False)
-
-            # Step 9: Delete Contact Info
-            current_app.logger.debug("Deleting Contact Info")
-            ContactInfo.query.filter_by(parent_id=vendor_id, parent_type="vendor").delete(synchronize_session=False)
-
-            # Step 10: Delete Vendor Pin
-            current_app.logger.debug("Deleting Vendor Pin")
-            VendorPin.query.filter_by(vendor_id=vendor_id).delete(synchronize_session=False)
-
-            # Step 11: Delete Vendor Documents
-            current_app.logger.debug("Deleting Vendor Documents")
-            Document.query.filter_by(vendor_id=vendor_id).delete(synchronize_session=False)
-
-            # Step 12: Delete Extra Service Menu Images and Menus
-            current_app.logger.debug("Deleting Extra Service Menu Images")
-            
-            # First get menu IDs linked to this vendor's extra services
-            menu_ids = [m[0] for m in db.session.execute(text("""
-                SELECT m.id FROM extra_service_menus m
-                JOIN extra_service_categories c ON m.category_id = c.id
-                WHERE c.vendor_id = :vendor_id
-            """), {'vendor_id': vendor_id}).fetchall()]
-            
-            if menu_ids:
-                # Delete images for these menus
-                db.session.execute(text("""
-                    DELETE FROM extra_service_menu_images
-                    WHERE menu_id = ANY(:menu_ids)
-                """), {'menu_ids': menu_ids})
-                
-                # Then delete the menus
-                db.session.execute(text("""
-                    DELETE FROM extra_service_menus
-                    WHERE id = ANY(:menu_ids)
-                """), {'menu_ids': menu_ids})
-
-            # Step 13: Delete User Passes first
-            current_app.logger.debug("Deleting User Passes linked to vendor's cafe passes")
-            db.session.execute(text("""
-                DELETE FROM user_passes
-                WHERE cafe_pass_id IN (
-                    SELECT id FROM cafe_passes WHERE vendor_id = :vendor_id
-                )
-            """), {'vendor_id': vendor_id})
-
-            # Step 13: Delete Cafe Passes
-            current_app.logger.debug("Deleting Cafe Passes")
-            db.session.execute(text("""
-                DELETE FROM cafe_passes
-                WHERE vendor_id = :vendor_id
-            """), {'vendor_id': vendor_id})
-
-            # Step 14: Delete Vendor record itself
-            current_app.logger.debug("Deleting Vendor record")
-            db.session.delete(vendor)
-
-            # Step 14: Drop vendor-specific dynamic tables
-            VendorService.drop_vendor_slot_table(vendor_id)
-            VendorService.drop_vendor_console_availability_table(vendor_id)
-            VendorService.drop_vendor_dashboard_table(vendor_id)
-            VendorService.drop_vendor_promo_table(vendor_id)
-
-            db.session.commit()
-            current_app.logger.info(f"Successfully deboarded vendor ID: {vendor_id}")
-
+            report = DeboardEngine.run(vendor_id)
         except Exception as e:
-            db.session.rollback()
             current_app.logger.error(f"Failed to deboard vendor {vendor_id}: {e}")
             raise
 
+        CatalogueCache.bump("deboard", vendor_id)
+        current_app.logger.info(f"Successfully deboarded vendor ID: {vendor_id}")
+        return report
+
     @staticmethod
     def drop_vendor_slot_table(vendor_id):
+        if SlotInventoryStore.is_shared():
+            SlotInventoryStore.clear_vendor_kind(SLOT, vendor_id)
         table_name = f"vendor_{vendor_id}_slot"
         db.session.execute(text(f'DROP TABLE IF EXISTS "{table_name}"'))
         current_app.logger.info(f"Dropped slot table: {table_name}")
 
     @staticmethod
     def drop_vendor_console_availability_table(vendor_id):
+        if SlotInventoryStore.is_shared():
+            SlotInventoryStore.clear_vendor_kind(CONSOLE_AVAILABILITY, vendor_id)
         table_name = f"vendor_{vendor_id}_console_availability"
         db.session.execute(text(f'DROP TABLE IF EXISTS "{table_name}"'))
         current_app.logger.info(f"Dropped console availability table: {table_name}")
 
     @staticmethod
     def drop_vendor_dashboard_table(vendor_id):
+        if SlotInventoryStore.is_shared():
+            SlotInventoryStore.clear_vendor_kind(DASHBOARD, vendor_id)
         table_name = f"vendor_{vendor_id}_dashboard"
         db.session.execute(text(f'DROP TABLE IF EXISTS "{table_name}"'))
         current_app.logger.info(f"Dropped dashboard table: {table_name}")
 
     @staticmethod
     def drop_vendor_promo_table(vendor_id):
+        if SlotInventoryStore.is_shared():
+            SlotInventoryStore.clear_vendor_kind(PROMO_DETAIL, vendor_id)
         table_name = f"vendor_{vendor_id}_promo_detail"
         db.session.execute(text(f'DROP TABLE IF EXISTS "{table_name}"'))
         current_app.logger.info(f"Dropped promo table: {table_name}")
@@ -754,9 +472,13 @@ class VendorService:
 
         current_app.logger.debug(f"Processing credentials for vendor {vendor.id} with login email: {email}")
 
-        # Step 1: Reuse credentials only when this vendor is part of an existing account.
-        existing_password_manager = None
-        if vendor.account_id:
+        # Step 1: Reuse credentials this vendor already has (a re-run onboarding job step),
+        # or those of an existing account it belongs to.
+        existing_password_manager = PasswordManager.query.filter_by(
+            parent_id=vendor.id,
+            parent_type='vendor'
+        ).first()
+        if existing_password_manager is None and vendor.account_id:
             existing_password_manager = (
                 db.session.query(PasswordManager)
                 .join(
@@ -795,15 +517,17 @@ class VendorService:
             db.session.flush()
             current_app.logger.info(f"Created new credentials for vendor {vendor.id}")
 
-        # Step 2: Create VendorStatus regardless
-        vendor_status = VendorStatus(
-            vendor_id=vendor.id,
-            status="pending_verification"
-         )
-        db.session.add(vendor_status)
-        db.session.flush()
+        # Step 2: Create VendorStatus unless an earlier run already did
+        if not VendorStatus.query.filter_by(vendor_id=vendor.id).first():
+            vendor_status = VendorStatus(
+                vendor_id=vendor.id,
+                status="pending_verification"
+            )
+            db.session.add(vendor_status)
+            db.session.flush()
 
         db.session.commit()
+        CatalogueCache.bump("onboard", vendor.id)
         
         # ✅ UPDATED: Get the PIN and pass to email
         vendor_pin = VendorPin.query.filter_by(vendor_id=vendor.id).first()
@@ -820,28 +544,16 @@ class VendorService:
         VendorService.send_welcome_email(vendor, password_to_email, email, pin_code, parent_email=parent_email)
         current_app.logger.info(f"Completed credentials generation for vendor {vendor.id}")
 
-    @staticmethod
-    def get_drive_service():
-        """Initialize and return the Google Drive service."""
-        credentials = service_account.Credentials.from_service_account_file(
-            current_app.config['GOOGLE_APPLICATION_CREDENTIALS'],
-            scopes=['https://www.googleapis.com/auth/drive']
-        )
-        service = build('drive', 'v3', credentials=credentials)
-        current_app.logger.debug("Google Drive service initialized.")
-        return service
-
     @staticmethod
     def upload_to_drive(service, file, doc_type, vendor_id):
         """Upload a file to Google Drive and return the file link."""
-        file_content = file.read()
         filename = f"{vendor_id}_{secure_filename(file.filename)}"
         file_metadata = {
             'name': filename,
             'parents': [current_app.config['GOOGLE_DRIVE_FOLDER_ID']],
             'mimeType': 'application/pdf'
         }
-        media = MediaIoBaseUpload(io.BytesIO(file_content), mimetype='application/pdf')
+        media = drive_media(file, 'application/pdf')
         
         try:
             uploaded_file = service.files().create(body=file_metadata, media_body=media, fields='id, webViewLink').execute()
@@ -910,6 +622,7 @@ class VendorService:
                 else:
                     return {"status": "error", "message": "Vendor status record not found"}, 404
 
+            CatalogueCache.bump("document_verified", vendor_id)
             return {"status": "success", "message": "Document verified successfully"}, 200
 
         except Exception as e:
@@ -958,6 +671,7 @@ class VendorService:
                         db.session.add(vendor_status)
                     db.session.commit()
 
+            CatalogueCache.bump("documents_verified")
             return {'message': 'Documents verified and vendor status updated where applicable'}, 200
 
         except Exception as e:
@@ -1025,24 +739,6 @@ class VendorService:
             ).all()
 
             for result in results:
-                vendor_payment_methods = payment_methods_map.get(result.vendor_id, {
-                    "pay_in_cafe": False,
-                    "hash_global_pass": False,
-                    "cafe_specific_pass": False,
-                    "Pay at Cafe": False,
-                    "Hash": False,
-                })
-                accepted_payment_methods = {
-                    "pay_in_cafe": bool(vendor_payment_methods.get("pay_in_cafe")),
-                    "hash_global_pass": bool(vendor_payment_methods.get("hash_global_pass")),
-                    "cafe_specific_pass": bool(vendor_payment_methods.get("cafe_specific_pass")),
-                }
-                accepted_payment_method_list = [
-                    method_name
-                    for method_name, enabled in accepted_payment_methods.items()
-                    if enabled
-                ]
-
                 vendors_data.append({
                     "vendor_id": result.vendor_id,
                     "cafe_name": result.cafe_name,
@@ -1074,11 +770,77 @@ class VendorService:
             current_app.logger.error(f"Error in get_all_vendors_with_status: {e}")
             raise
         
+
     @staticmethod
-    def get_all_gaming_cafe(include_inactive: bool = False):
+    def parse_gaming_cafe_fields(raw):
         """
-        Retrieve all vendors with their statuses, timing info, amenities, images,
-        and payment methods for the salesperson dashboard. Returns ALL cafes.
+        Parse a `fields=` projection (comma separated keys or a preset name).
+        Returns None for "all fields"; raises ValueError on unknown keys.
+        """
+        if raw is None or not str(raw).strip():
+            return None
+        requested = set()
+        for token in str(raw).split(","):
+            key = token.strip()
+            if not key:
+                continue
+            if key in VendorService.GAMING_CAFE_FIELD_PRESETS:
+                requested |= VendorService.GAMING_CAFE_FIELD_PRESETS[key]
+            elif key in VendorService.GAMING_CAFE_LISTING_FIELDS:
+                requested.add(key)
+            else:
+                raise ValueError(f"Unknown field '{key}'")
+        if not requested:
+            return None
+        requested.add("vendor_id")
+        return frozenset(requested)
+
+    @staticmethod
+    def gaming_cafe_cache_variant(include_inactive: bool = False, cursor=None, limit=None, fields=None,
+                                  image_variant=None) -> str:
+        return ":".join([
+            "all" if include_inactive else "active",
+            f"c{cursor or 0}",
+            f"l{limit or 0}",
+            ",".join(sorted(fields)) if fields else "*",
+            f"i{image_variant or 'orig'}",
+        ])
+
+    @staticmethod
+    def get_all_gaming_cafe_json(include_inactive: bool = False, cursor=None, limit=None, fields=None,
+                                 image_variant=None):
+        """
+        Serialized getAllGamingCafe payload, served from the catalogue cache when the
+        catalogue version has not moved since the last build.
+        """
+        variant = VendorService.gaming_cafe_cache_variant(include_inactive, cursor, limit, fields, image_variant)
+        return CatalogueCache.get_or_build(
+            variant,
+            lambda: current_app.json.dumps(
+                VendorService.get_all_gaming_cafe(
+                    include_inactive=include_inactive,
+                    cursor=cursor,
+                    limit=limit,
+                    fields=fields,
+                    image_variant=image_variant,
+                )
+            ),
+        )
+
+    @staticmethod
+    def get_all_gaming_cafe(include_inactive: bool = False, cursor=None, limit=None, fields=None, vendor_ids=None,
+                            image_variant=None):
+        """
+        Retrieve vendors with their statuses, timing info, amenities, images,
+        and payment methods for the app/salesperson listing.
+
+        Without `limit` every cafe is returned. With `limit`, vendors are paged by
+        keyset on Vendor.id (`cursor` = last vendor_id of the previous page) and the
+        response carries `next_cursor`. `fields` (see parse_gaming_cafe_fields) trims
+        the payload and skips side-queries for fields that were not requested.
+        `vendor_ids` restricts the listing to the given vendors (used by nearby search).
+        `image_variant` ("thumbnail", "card" or "full") swaps each image `url` for that
+        upload-time variant, falling back to the original for images without one.
         """
         try:
             vendors_data = []
@@ -1086,6 +848,9 @@ class VendorService:
             today_key = datetime.now(ist).strftime("%a").lower()[:3]
             today_full = datetime.now(ist).strftime("%A").lower()
 
+            def _wants(*keys):
+                return fields is None or any(k in fields for k in keys)
+
             def _normalize_time(value):
                 if value is None:
                     return None
@@ -1128,8 +893,8 @@ class VendorService:
                 .subquery()
             )
 
-            # Step 1: Fetch core vendor data with a single JOIN query (no pagination)
-            query = db.session.query(
+            # Step 1: Fetch core vendor data with a single JOIN query (keyset paged when limit is set)
+            group_columns = [
                 Vendor.id.label('vendor_id'),
                 Vendor.cafe_name,
                 Vendor.owner_name,
@@ -1147,15 +912,23 @@ class VendorService:
                 PhysicalAddress.longitude,
                 Timing.opening_time,
                 Timing.closing_time,
-                func.count(Document.id).label('total_documents'),
-                func.sum(case((Document.status == 'verified', 1), else_=0)).label('verified_documents')
-            ).outerjoin(
+            ]
+            include_documents = _wants("total_documents", "verified_documents")
+            columns = list(group_columns)
+            if include_documents:
+                columns.extend([
+                    func.count(Document.id).label('total_documents'),
+                    func.sum(case((Document.status == 'verified', 1), else_=0)).label('verified_documents'),
+                ])
+
+            query = db.session.query(*columns).outerjoin(
                 latest_status, latest_status.c.vendor_id == Vendor.id
             ).join(
                 Timing, Timing.id == Vendor.timing_id
-            ).outerjoin(
-                Document, Document.vendor_id == Vendor.id
-            ).outerjoin(
+            )
+            if include_documents:
+                query = query.outerjoin(Document, Document.vendor_id == Vendor.id)
+            query = query.outerjoin(
                 ContactInfo,
                 and_(ContactInfo.parent_id == Vendor.id, ContactInfo.parent_type == 'vendor')
             ).outerjoin(
@@ -1169,101 +942,104 @@ class VendorService:
 
             if not include_inactive:
                 query = query.filter(func.lower(func.coalesce(latest_status.c.status, "pending_verification")) == "active")
-
-            results = query.group_by(
-                Vendor.id,
-                Vendor.cafe_name,
-                Vendor.owner_name,
-                latest_status.c.status,
-                Vendor.created_at,
-                Vendor.updated_at,
-                ContactInfo.email,
-                ContactInfo.phone,
-                PhysicalAddress.addressLine1,
-                PhysicalAddress.addressLine2,
-                PhysicalAddress.pincode,
-                PhysicalAddress.state,
-                PhysicalAddress.country,
-                PhysicalAddress.latitude,
-                PhysicalAddress.longitude,
-                Timing.opening_time,
-                Timing.closing_time
-            ).order_by(
-                Vendor.id
-            ).all()
+            if cursor:
+                query = query.filter(Vendor.id > int(cursor))
+            if vendor_ids is not None:
+                if not vendor_ids:
+                    return {"vendors": []}
+                query = query.filter(Vendor.id.in_([int(v) for v in vendor_ids]))
+
+            query = query.group_by(*group_columns).order_by(Vendor.id)
+            if limit:
+                query = query.limit(int(limit))
+            results = query.all()
 
             if not results:
-                return {"vendors": []}
+                return {"vendors": [], "next_cursor": None} if limit else {"vendors": []}
+
+            # Keyset cursor follows the scanned rows, so subscription filtering below
+            # may return a short page without skipping vendors.
+            next_cursor = results[-1].vendor_id if limit and len(results) >= int(limit) else None
 
             vendor_ids = [result.vendor_id for result in results]
             subscription_map = {}
             enforce_subscription_filter = False
-            try:
-                from services.super_admin_service import SuperAdminService
-                subscription_map = SuperAdminService._subscription_snapshot_map(vendor_ids)  # noqa: SLF001
-                enforce_subscription_filter = not include_inactive
-            except Exception as sub_exc:
-                current_app.logger.warning("Failed to load subscription snapshot for app listing: %s", sub_exc)
+            if _wants("subscription") or not include_inactive:
+                try:
+                    from services.super_admin_service import SuperAdminService
+                    subscription_map = SuperAdminService._subscription_snapshot_map(vendor_ids)  # noqa: SLF001
+                    enforce_subscription_filter = not include_inactive
+                except Exception as sub_exc:
+                    current_app.logger.warning("Failed to load subscription snapshot for app listing: %s", sub_exc)
 
             # Step 1.5: Fetch per-day operating hours (dashboard config)
-            config_rows = (
-                db.session.query(
-                    VendorDaySlotConfig.vendor_id,
-                    VendorDaySlotConfig.day,
-                    VendorDaySlotConfig.opening_time,
-                    VendorDaySlotConfig.closing_time
-                )
-                .filter(VendorDaySlotConfig.vendor_id.in_(vendor_ids))
-                .all()
-            )
             config_map = {}
-            for row in config_rows:
-                dkey = str(row.day or "").strip().lower()
-                if not dkey:
-                    continue
-                vendor_cfg = config_map.setdefault(row.vendor_id, {})
-                if dkey not in vendor_cfg:
-                    vendor_cfg[dkey] = {
-                        "open": row.opening_time,
-                        "close": row.closing_time,
-                    }
-                short_key = dkey[:3] if len(dkey) > 3 else dkey
-                if short_key and short_key not in vendor_cfg:
-                    vendor_cfg[short_key] = vendor_cfg[dkey]
+            if _wants("opening_time", "closing_time"):
+                config_rows = (
+                    db.session.query(
+                        VendorDaySlotConfig.vendor_id,
+                        VendorDaySlotConfig.day,
+                        VendorDaySlotConfig.opening_time,
+                        VendorDaySlotConfig.closing_time
+                    )
+                    .filter(VendorDaySlotConfig.vendor_id.in_(vendor_ids))
+                    .all()
+                )
+                for row in config_rows:
+                    dkey = str(row.day or "").strip().lower()
+                    if not dkey:
+                        continue
+                    vendor_cfg = config_map.setdefault(row.vendor_id, {})
+                    if dkey not in vendor_cfg:
+                        vendor_cfg[dkey] = {
+                            "open": row.opening_time,
+                            "close": row.closing_time,
+                        }
+                    short_key = dkey[:3] if len(dkey) > 3 else dkey
+                    if short_key and short_key not in vendor_cfg:
+                        vendor_cfg[short_key] = vendor_cfg[dkey]
 
             # Step 2: Fetch all amenities in ONE query
-            amenities = db.session.query(
-                Amenity.vendor_id,
-                Amenity.name,
-                Amenity.available
-            ).filter(Amenity.vendor_id.in_(vendor_ids)).all()
-
             amenities_map = {}
-            for amenity in amenities:
-                amenities_map.setdefault(amenity.vendor_id, []).append({
-                    "name": amenity.name,
-                    "available": amenity.available
-                })
+            if _wants("amenities"):
+                amenities = db.session.query(
+                    Amenity.vendor_id,
+                    Amenity.name,
+                    Amenity.available
+                ).filter(Amenity.vendor_id.in_(vendor_ids)).all()
+
+                for amenity in amenities:
+                    amenities_map.setdefault(amenity.vendor_id, []).append({
+                        "name": amenity.name,
+                        "available": amenity.available
+                    })
 
             # Step 3: Fetch all images in ONE query
-            images = db.session.query(
-                Image.vendor_id,
-                Image.image_id,
-                Image.path,
-                Image.public_id,
-                Image.url
-            ).filter(Image.vendor_id.in_(vendor_ids)).all()
-
             images_map = {}
-            for img in images:
-                images_map.setdefault(img.vendor_id, []).append({
-                    "image_id": img.image_id,
-                    "url": img.url,
-                    "public_id": img.public_id
-                })
-
-            # Step 4: Fetch payment methods for ALL vendors in ONE query (no N+1)
-            payment_methods_map = VendorService.get_payment_methods_for_vendors(vendor_ids)
+            if _wants("images"):
+                images = db.session.query(
+                    Image.vendor_id,
+                    Image.image_id,
+                    Image.path,
+                    Image.public_id,
+                    Image.url,
+                    Image.thumbnail_url,
+                    Image.card_url,
+                    Image.full_url
+                ).filter(Image.vendor_id.in_(vendor_ids)).all()
+
+                variant_column = f"{image_variant}_url" if image_variant else None
+                for img in images:
+                    images_map.setdefault(img.vendor_id, []).append({
+                        "image_id": img.image_id,
+                        "url": (getattr(img, variant_column) if variant_column else None) or img.url,
+                        "public_id": img.public_id
+                    })
+
+            # Step 4: Fetch payment methods for the page's vendors in ONE query (no N+1)
+            payment_methods_map = {}
+            if _wants("payment_methods", "accepted_payment_methods", "accepted_payment_method_list"):
+                payment_methods_map = VendorService.get_payment_methods_for_vendors(vendor_ids)
 
             # Step 5: Combine all datasets
             for result in results:
@@ -1304,7 +1080,7 @@ class VendorService:
                     if enabled
                 ]
 
-                vendors_data.append({
+                vendor_entry = {
                     "vendor_id": result.vendor_id,
                     "cafe_name": result.cafe_name,
                     "owner_name": result.owner_name,
@@ -1324,16 +1100,28 @@ class VendorService:
                     },
                     "opening_time": cfg_open_norm or _normalize_time(result.opening_time),
                     "closing_time": cfg_close_norm or _normalize_time(result.closing_time),
-                    "total_documents": result.total_documents,
-                    "verified_documents": result.verified_documents,
+                    "total_documents": getattr(result, "total_documents", None),
+                    "verified_documents": getattr(result, "verified_documents", None),
                     "amenities": amenities_map.get(result.vendor_id, []),
                     "images": images_map.get(result.vendor_id, []),
                     "subscription": sub_snapshot,
                     "payment_methods": vendor_payment_methods,
                     "accepted_payment_methods": accepted_payment_methods,
                     "accepted_payment_method_list": accepted_payment_method_list,
-                })
-
+                }
+                if fields is not None:
+                    projected = {k: v for k, v in vendor_entry.items() if k in fields}
+                    if "coordinates" in fields and "address" not in fields:
+                        # Keep the address.latitude/longitude shape clients already read.
+                        projected["address"] = {
+                            "longitude": result.longitude,
+                            "latitude": result.latitude,
+                        }
+                    vendor_entry = projected
+                vendors_data.append(vendor_entry)
+
+            if limit:
+                return {"vendors": vendors_data, "next_cursor": next_cursor}
             return {"vendors": vendors_data}
 
         except Exception as e:
@@ -1364,19 +1152,12 @@ class VendorService:
 
     @staticmethod
     def get_drive_service():
-        """Initialize and return the Google Drive service."""
-        credentials = service_account.Credentials.from_service_account_file(
-            current_app.config['GOOGLE_APPLICATION_CREDENTIALS'],
-            scopes=['https://www.googleapis.com/auth/drive']
-        )
-        service = build('drive', 'v3', credentials=credentials)
-        current_app.logger.debug("Google Drive service initialized.")
-        return service
+        """Return the calling thread's cached Google Drive service (see DriveClient)."""
+        return DriveClient.service()
 
     @staticmethod
     def upload_photo_to_drive(service, photo, vendor_id, cnt):
         """Upload a single photo to Google Drive and return the file link."""
-        photo_content = photo.read()
         filename = f"{vendor_id}_{secure_filename(photo.filename)}_{cnt}"
         file_metadata = {
             'name': filename,
@@ -1384,8 +1165,7 @@ class VendorService:
             'mimeType': photo.mimetype
         }
         
-        # Ensure MediaIoBaseUpload is correctly instantiated
-        media = MediaIoBaseUpload(io.BytesIO(photo_content), mimetype=photo.mimetype)
+        media = drive_media(photo, photo.mimetype)
 
         try:
             uploaded_file = service.files().create(
@@ -1411,37 +1191,106 @@ class VendorService:
             raise Exception(f"Failed to upload photo {photo.filename} to Google Drive.")
 
     @staticmethod
-    def upload_photos_to_drive(service, photos, vendor_id):
-        """Upload multiple photos to Google Drive and return their file links."""
-        photo_links = []
-        cnt=0
-        for photo in photos:
-            link = VendorService.upload_photo_to_drive(service, photo, vendor_id, cnt)
-            cnt=cnt+1
-            photo_links.append(link)
-        return photo_links
-    
+    def _upload_photo_stream(app, photo, vendor_id, cnt):
+        """
+        Worker for concurrent photo uploads: streams the request file to Drive in
+        resumable chunks instead of reading it into memory. Drive service objects
+        are not thread-safe, so each worker uses its thread's own client.
+        Returns {"id": ..., "link": ...}; the caller persists the Image rows.
+        """
+        with app.app_context():
+            service = VendorService.get_drive_service()
+            filename = f"{vendor_id}_{secure_filename(photo.filename)}_{cnt}"
+            file_metadata = {
+                'name': filename,
+                'parents': [current_app.config['GOOGLE_DRIVE_FOLDER_ID']],
+                'mimeType': photo.mimetype
+            }
+            media = drive_media(photo, photo.mimetype)
+            uploaded_file = service.files().create(
+                body=file_metadata,
+                media_body=media,
+                fields='id, webViewLink'
+            ).execute()
+            current_app.logger.info(f"Photo uploaded to Google Drive: {uploaded_file.get('webViewLink')}")
+            return {"id": uploaded_file.get('id'), "link": uploaded_file.get('webViewLink')}
+
+    @staticmethod
+    def upload_photos_to_drive(service, photos, vendor_id, concurrent=None):
+        """
+        Upload multiple photos to Google Drive and return their file links.
+
+        Concurrent mode (default, PHOTO_UPLOAD_CONCURRENT) uploads on a process-wide
+        pool of PHOTO_UPLOAD_MAX_WORKERS threads and saves every Image row in one
+        commit at the end; `service` is only used by the sequential mode. Photos that
+        uploaded are kept even when another one fails, as in the sequential mode.
+        """
+        if concurrent is None:
+            concurrent = PHOTO_UPLOAD_CONCURRENT
+
+        if not concurrent or len(photos) <= 1:
+            photo_links = []
+            cnt=0
+            for photo in photos:
+                link = VendorService.upload_photo_to_drive(service, photo, vendor_id, cnt)
+                cnt=cnt+1
+                photo_links.append(link)
+            CatalogueCache.bump("photos_uploaded", vendor_id)
+            return photo_links
+
+        app_obj = current_app._get_current_object()
+        futures = [
+            _PHOTO_UPLOAD_EXECUTOR.submit(VendorService._upload_photo_stream, app_obj, photo, vendor_id, cnt)
+            for cnt, photo in enumerate(photos)
+        ]
+        uploaded, failed = [], []
+        for photo, future in zip(photos, futures):
+            try:
+                uploaded.append(future.result())
+            except Exception as e:
+                current_app.logger.error(f"Google Drive upload error for {photo.filename}: {e}")
+                failed.append(photo.filename)
+
+        if uploaded:
+            db.session.add_all([
+                Image(vendor_id=vendor_id, image_id=item["id"], path=item["link"])
+                for item in uploaded
+            ])
+            db.session.commit()
+            CatalogueCache.bump("photos_uploaded", vendor_id)
+
+        if failed:
+            raise Exception(f"Failed to upload photos {', '.join(failed)} to Google Drive.")
+        return [item["link"] for item in uploaded]
+
     @staticmethod
     def create_vendor_slot_table(vendor_id):
-        """Creates a table for tracking daily slot availability for a vendor."""
-        table_name = f"VENDOR_{vendor_id}_SLOT"
+        """
+        Creates a table for tracking daily slot availability for a vendor.
+        With the shared slot-inventory backend the vendor's rows are reset instead.
+        """
+        table_name = SlotInventoryStore.table_name(SLOT, vendor_id)
 
-        # Drop the table if it already exists
-        db.session.execute(text(f"DROP TABLE IF EXISTS {table_name}"))
+        if SlotInventoryStore.is_shared():
+            SlotInventoryStore.ensure_shared_tables()
+            SlotInventoryStore.clear_vendor_kind(SLOT, vendor_id)
+        else:
+            # Drop the table if it already exists
+            db.session.execute(text(f"DROP TABLE IF EXISTS {table_name}"))
 
-        # Create the table
-        sql_create = text(f"""
-        CREATE TABLE {table_name} (
-            vendor_id INT NOT NULL,
-            date DATE NOT NULL,
-            slot_id INT NOT NULL,
-            is_available BOOLEAN NOT NULL,
-            available_slot INT NOT NULL,
-            PRIMARY KEY (vendor_id, date, slot_id)
-        )
-        """)
+            # Create the table
+            sql_create = text(f"""
+            CREATE TABLE {table_name} (
+                vendor_id INT NOT NULL,
+                date DATE NOT NULL,
+                slot_id INT NOT NULL,
+                is_available BOOLEAN NOT NULL,
+                available_slot INT NOT NULL,
+                PRIMARY KEY (vendor_id, date, slot_id)
+            )
+            """)
 
-        db.session.execute(sql_create)
+            db.session.execute(sql_create)
         db.session.commit()
 
         # Populate the table initially with a rolling window (default 60 days).
@@ -1471,29 +1320,128 @@ class VendorService:
         )
 
     @staticmethod
-    def extend_vendor_slot_window(vendor_id, start_date, end_date):
-        """
-        Extend VENDOR_<id>_SLOT date coverage without deleting existing rows.
-        Inserts only missing (date, slot_id) combinations for vendor games.
-        """
-        table_name = f"VENDOR_{vendor_id}_SLOT"
-        sql_insert = text(f"""
+    def _extend_slot_window_sql(table_name, vendor_param="vendor_id"):
+        """INSERT that adds missing (date, slot_id) rows for one vendor's games."""
+        return f"""
         INSERT INTO {table_name} (vendor_id, date, slot_id, is_available, available_slot)
         SELECT 
-            :vendor_id, gs.date::date, s.id, s.is_available, s.available_slot
+            :{vendor_param}, gs.date::date, s.id, s.is_available, s.available_slot
         FROM 
             (SELECT generate_series(:start_date, :end_date, '1 day'::INTERVAL) AS date) gs
         CROSS JOIN slots s
         WHERE s.is_available = TRUE
-          AND s.gaming_type_id IN (SELECT id FROM available_games WHERE vendor_id = :vendor_id)
+          AND s.gaming_type_id IN (SELECT id FROM available_games WHERE vendor_id = :{vendor_param})
           AND NOT EXISTS (
               SELECT 1
               FROM {table_name} v
-              WHERE v.vendor_id = :vendor_id
+              WHERE v.vendor_id = :{vendor_param}
                 AND v.date = gs.date::date
                 AND v.slot_id = s.id
-          );
-        """)
+          )
+        """
+
+    @staticmethod
+    def _slot_capacity_target_sql(table_name, vendor_param="vendor_id"):
+        """
+        Derived table of (date, slot_id, current values, new_available) for one vendor's
+        window. Active bookings are counted once per (slot_id, date) in a grouped join
+        instead of a correlated COUNT per row.
+        """
+        return f"""
+                SELECT cur.date,
+                       cur.slot_id,
+                       cur.available_slot AS current_available,
+                       cur.is_available AS current_is_available,
+                       GREATEST(cap.max_capacity - COALESCE(booked.active_count, 0), 0) AS new_available
+                FROM {table_name} cur
+                JOIN (
+                      SELECT s.id AS slot_id, ag.total_slot AS max_capacity
+                      FROM slots s
+                      JOIN available_games ag ON ag.id = s.gaming_type_id
+                      WHERE ag.vendor_id = :{vendor_param}
+                     ) AS cap ON cap.slot_id = cur.slot_id
+                LEFT JOIN (
+                      SELECT b.slot_id,
+                             CAST(t.booked_date AS date) AS booked_date,
+                             COUNT(DISTINCT b.id) AS active_count
+                      FROM bookings b
+                      JOIN transactions t ON t.booking_id = b.id
+                      JOIN slots s2 ON s2.id = b.slot_id
+                      JOIN available_games ag2 ON ag2.id = s2.gaming_type_id
+                      WHERE ag2.vendor_id = :{vendor_param}
+                        AND CAST(t.booked_date AS date) BETWEEN :start_date AND :end_date
+                        AND lower(COALESCE(b.status, '')) IN ('confirmed', 'current')
+                      GROUP BY b.slot_id, CAST(t.booked_date AS date)
+                     ) AS booked
+                       ON booked.slot_id = cur.slot_id
+                      AND booked.booked_date = cur.date
+                WHERE cur.vendor_id = :{vendor_param}
+                  AND cur.date BETWEEN :start_date AND :end_date
+        """
+
+    @staticmethod
+    def _reconcile_slot_capacity_sql(table_name, vendor_param="vendor_id", only_changed=False):
+        """
+        UPDATE that recomputes available_slot/is_available for one vendor's window
+        from the pre-aggregated target (see _slot_capacity_target_sql). Derived tables
+        (not a WITH clause) keep the statement usable inside the batched CTE chain.
+        `only_changed` skips rows whose values already match.
+        """
+        changed_filter = ""
+        if only_changed:
+            changed_filter = """
+           AND (vs.available_slot IS DISTINCT FROM target.new_available
+                OR vs.is_available IS DISTINCT FROM (target.new_available > 0))"""
+        return f"""
+        UPDATE {table_name} AS vs
+           SET available_slot = target.new_available,
+               is_available = target.new_available > 0
+          FROM ({VendorService._slot_capacity_target_sql(table_name, vendor_param)}) AS target
+         WHERE vs.vendor_id = :{vendor_param}
+           AND vs.date = target.date
+           AND vs.slot_id = target.slot_id{changed_filter}
+        """
+
+    @staticmethod
+    def verify_vendor_slot_capacity_window(vendor_id, start_date, end_date, sample_limit=20):
+        """
+        Read-only drift check: compares stored capacity with the booking-derived value.
+        Used by the nightly pass now that capacity is maintained incrementally.
+        """
+        table_name = SlotInventoryStore.table_name(SLOT, vendor_id)
+        rows = db.session.execute(
+            text(f"""
+                SELECT target.date, target.slot_id, target.current_available, target.new_available,
+                       COUNT(*) OVER () AS drifted_rows
+                FROM ({VendorService._slot_capacity_target_sql(table_name)}) AS target
+                WHERE target.current_available IS DISTINCT FROM target.new_available
+                   OR target.current_is_available IS DISTINCT FROM (target.new_available > 0)
+                ORDER BY target.date, target.slot_id
+                LIMIT :sample_limit
+            """),
+            {"vendor_id": vendor_id, "start_date": start_date, "end_date": end_date, "sample_limit": int(sample_limit)},
+        ).mappings().all()
+        return {
+            "drifted_rows": int(rows[0]["drifted_rows"]) if rows else 0,
+            "samples": [
+                {
+                    "date": r["date"].isoformat() if r["date"] else None,
+                    "slot_id": int(r["slot_id"]),
+                    "stored_available": int(r["current_available"]),
+                    "expected_available": int(r["new_available"]),
+                }
+                for r in rows
+            ],
+        }
+
+    @staticmethod
+    def extend_vendor_slot_window(vendor_id, start_date, end_date):
+        """
+        Extend VENDOR_<id>_SLOT date coverage without deleting existing rows.
+        Inserts only missing (date, slot_id) combinations for vendor games.
+        """
+        table_name = SlotInventoryStore.table_name(SLOT, vendor_id)
+        sql_insert = text(VendorService._extend_slot_window_sql(table_name))
         result = db.session.execute(
             sql_insert,
             {"start_date": start_date, "end_date": end_date, "vendor_id": vendor_id},
@@ -1501,82 +1449,96 @@ class VendorService:
         return int(result.rowcount or 0)
 
     @staticmethod
-    def reconcile_vendor_slot_capacity_window(vendor_id, start_date, end_date):
+    def reconcile_vendor_slot_capacity_window(vendor_id, start_date, end_date, only_changed=False):
         """
         Heal VENDOR_<id>_SLOT availability for a date window using:
           available_slot = max(total_console_slots - active_bookings, 0)
         This fixes stale capacities (e.g. lingering 4 when current console count is 11),
-        while preserving already-booked counts.
+        while preserving already-booked counts. With only_changed=True the returned
+        count is the number of rows that actually drifted.
         """
-        table_name = f"VENDOR_{vendor_id}_SLOT"
-        sql_reconcile = text(f"""
-        UPDATE {table_name} AS vs
-           SET available_slot = GREATEST(
-                   cap.max_capacity - COALESCE((
-                       SELECT COUNT(DISTINCT b.id)
-                       FROM bookings b
-                       JOIN transactions t ON t.booking_id = b.id
-                       JOIN slots s2 ON s2.id = b.slot_id
-                       JOIN available_games ag2 ON ag2.id = s2.gaming_type_id
-                       WHERE ag2.vendor_id = :vendor_id
-                         AND b.slot_id = vs.slot_id
-                         AND CAST(t.booked_date AS date) = vs.date
-                         AND lower(COALESCE(b.status, '')) IN ('confirmed', 'current')
-                   ), 0),
-                   0
-               ),
-               is_available = CASE
-                   WHEN GREATEST(
-                       cap.max_capacity - COALESCE((
-                           SELECT COUNT(DISTINCT b.id)
-                           FROM bookings b
-                           JOIN transactions t ON t.booking_id = b.id
-                           JOIN slots s2 ON s2.id = b.slot_id
-                           JOIN available_games ag2 ON ag2.id = s2.gaming_type_id
-                           WHERE ag2.vendor_id = :vendor_id
-                             AND b.slot_id = vs.slot_id
-                             AND CAST(t.booked_date AS date) = vs.date
-                             AND lower(COALESCE(b.status, '')) IN ('confirmed', 'current')
-                       ), 0),
-                       0
-                   ) > 0
-                   THEN TRUE ELSE FALSE
-               END
-          FROM (
-                SELECT s.id AS slot_id, ag.total_slot AS max_capacity
-                FROM slots s
-                JOIN available_games ag ON ag.id = s.gaming_type_id
-                WHERE ag.vendor_id = :vendor_id
-               ) AS cap
-         WHERE vs.vendor_id = :vendor_id
-           AND vs.date BETWEEN :start_date AND :end_date
-           AND vs.slot_id = cap.slot_id
-        """)
+        table_name = SlotInventoryStore.table_name(SLOT, vendor_id)
+        sql_reconcile = text(VendorService._reconcile_slot_capacity_sql(table_name, only_changed=only_changed))
         result = db.session.execute(
             sql_reconcile,
             {"vendor_id": vendor_id, "start_date": start_date, "end_date": end_date},
         )
         return int(result.rowcount or 0)
 
+    @staticmethod
+    def _run_per_vendor_statements_batched(sql_builder, vendor_ids, start_date, end_date):
+        """
+        Run one per-vendor data-modifying statement for many vendors in a single
+        round-trip by chaining them as CTEs. Returns {vendor_id: affected_rows}.
+        """
+        if not vendor_ids:
+            return {}
+        ctes = []
+        selects = []
+        params = {"start_date": start_date, "end_date": end_date}
+        for idx, v_id in enumerate(vendor_ids):
+            param = f"vendor_id_{idx}"
+            params[param] = int(v_id)
+            table_name = SlotInventoryStore.table_name(SLOT, v_id)
+            ctes.append(f"w{idx} AS ({sql_builder(table_name, param)} RETURNING 1)")
+            selects.append(f"(SELECT COUNT(*) FROM w{idx}) AS c{idx}")
+        row = db.session.execute(
+            text(f"WITH {', '.join(ctes)} SELECT {', '.join(selects)}"),
+            params,
+        ).first()
+        return {int(v_id): int(row[idx] or 0) for idx, v_id in enumerate(vendor_ids)}
+
+    @staticmethod
+    def extend_slot_windows_bulk(vendor_ids, start_date, end_date):
+        """Batched extend_vendor_slot_window: one round-trip for all given vendors."""
+        return VendorService._run_per_vendor_statements_batched(
+            VendorService._extend_slot_window_sql, vendor_ids, start_date, end_date
+        )
+
+    @staticmethod
+    def reconcile_slot_capacity_windows_bulk(vendor_ids, start_date, end_date, only_changed=False):
+        """Batched reconcile_vendor_slot_capacity_window: one round-trip for all given vendors."""
+        return VendorService._run_per_vendor_statements_batched(
+            lambda table_name, param: VendorService._reconcile_slot_capacity_sql(table_name, param, only_changed),
+            vendor_ids,
+            start_date,
+            end_date,
+        )
+
+    @staticmethod
+    def existing_vendor_slot_tables():
+        """Vendor ids that currently own a VENDOR_<id>_SLOT table (one catalog query)."""
+        rows = db.session.execute(text("""
+            SELECT tablename
+            FROM pg_tables
+            WHERE schemaname = current_schema()
+              AND tablename ~ '^vendor_[0-9]+_slot$'
+        """)).scalars().all()
+        return {int(str(name).split("_")[1]) for name in rows}
+
     @staticmethod
     def create_vendor_console_availability_table(vendor_id):
         """Creates a table for tracking console availability for a vendor."""
-        table_name = f"VENDOR_{vendor_id}_CONSOLE_AVAILABILITY"
-        
-        # Drop the table if it already exists
-        db.session.execute(text(f"DROP TABLE IF EXISTS {table_name}"))
+        table_name = SlotInventoryStore.table_name(CONSOLE_AVAILABILITY, vendor_id)
         
-        # ✅ Create the table
-        sql_create = text(f"""
-            CREATE TABLE {table_name} (
-                vendor_id INT NOT NULL,
-                console_id INT NOT NULL,
-                game_id INT NOT NULL,
-                is_available BOOLEAN NOT NULL,
-                PRIMARY KEY (vendor_id, console_id)
-            )
-        """)
-        db.session.execute(sql_create)
+        if SlotInventoryStore.is_shared():
+            SlotInventoryStore.ensure_shared_tables()
+            SlotInventoryStore.clear_vendor_kind(CONSOLE_AVAILABILITY, vendor_id)
+        else:
+            # Drop the table if it already exists
+            db.session.execute(text(f"DROP TABLE IF EXISTS {table_name}"))
+            
+            # ✅ Create the table
+            sql_create = text(f"""
+                CREATE TABLE {table_name} (
+                    vendor_id INT NOT NULL,
+                    console_id INT NOT NULL,
+                    game_id INT NOT NULL,
+                    is_available BOOLEAN NOT NULL,
+                    PRIMARY KEY (vendor_id, console_id)
+                )
+            """)
+            db.session.execute(sql_create)
         
         # ✅ POPULATE: Insert all consoles linked to this vendor into the table
         sql_insert = text(f"""
@@ -1600,6 +1562,12 @@ class VendorService:
     @staticmethod
     def create_vendor_dashboard_table(vendor_id):
         """Creates a table for tracking vendor dashboard details."""
+        if SlotInventoryStore.is_shared():
+            SlotInventoryStore.ensure_shared_tables()
+            SlotInventoryStore.clear_vendor_kind(DASHBOARD, vendor_id)
+            db.session.commit()
+            return
+
         table_name = f"VENDOR_{vendor_id}_DASHBOARD"
 
         # Drop the table if it already exists
@@ -1634,6 +1602,12 @@ class VendorService:
     @staticmethod
     def create_vendor_promo_table(vendor_id: int):
         """Creates a vendor-specific promo detail table."""
+        if SlotInventoryStore.is_shared():
+            SlotInventoryStore.ensure_shared_tables()
+            SlotInventoryStore.clear_vendor_kind(PROMO_DETAIL, vendor_id)
+            db.session.commit()
+            return
+
         table_name = f"VENDOR_{vendor_id}_PROMO_DETAIL"
 
         # Drop the table if it already exists (optional)
@@ -1739,26 +1713,12 @@ class VendorService:
                 content_html=html_body,
                 preview_text=f"Your cafe {vendor.cafe_name} onboarding is complete.",
             )
-            app_obj = current_app._get_current_object()
-            Thread(
-                target=VendorService._send_email_async,
-                args=(app_obj, msg, email, vendor.id),
-                daemon=True,
-            ).start()
+            MailQueue.enqueue(msg, category="welcome", meta={"vendor_id": vendor.id})
             current_app.logger.info(f"Welcome email queued for {email} (vendor {vendor.id})")
         except Exception as e:
             current_app.logger.error(f"Failed to send welcome email to {email} for vendor {vendor.id}: {str(e)}")
             pass  # Don't raise — email failure shouldn't stop onboarding
 
-    @staticmethod
-    def _send_email_async(app, msg, email, vendor_id):
-        with app.app_context():
-            try:
-                mail.send(msg)
-                app.logger.info(f"Welcome email sent successfully to {email} for vendor {vendor_id}")
-            except Exception as exc:
-                app.logger.error(f"Failed to send welcome email to {email} for vendor {vendor_id}: {str(exc)}")
-
     @staticmethod
     def build_welcome_email_text(vendor, password, email, pin_code, parent_email=None):
         dashboard_url = os.getenv("HASH_DASHBOARD_URL", "https://dashboard.hashforgamers.com")
@@ -1800,36 +1760,24 @@ class VendorService:
         """Build welcome email content fragment (wrapped by shared HFG template)."""
         dashboard_url = os.getenv("HASH_DASHBOARD_URL", "https://dashboard.hashforgamers.com")
         password_html = (
-            f"<strong>{password}</strong>"
+            WELCOME_PASSWORD_TEMPLATE.render(password=password)
             if password
             else "Use your existing password. If forgotten, reset from login."
         )
         parent_row = (
-            f"<tr><td style='padding:8px 0;color:#94a3b8;'>Parent Account Email</td>"
-            f"<td style='padding:8px 0;color:#e2e8f0;'><strong>{parent_email}</strong></td></tr>"
+            WELCOME_PARENT_ROW_TEMPLATE.render(parent_email=parent_email)
             if parent_email and parent_email != email else ""
         )
-
-        return f"""
-<p style="margin:0 0 12px 0;color:#e5e7eb;">Hello <strong>{vendor.owner_name}</strong>,</p>
-<p style="margin:0 0 16px 0;line-height:1.7;color:#cbd5e1;">
-  Your cafe <strong>{vendor.cafe_name}</strong> has been onboarded successfully.
-</p>
-<table role="presentation" width="100%" cellpadding="0" cellspacing="0" style="border:1px solid #1e2a44;border-radius:10px;padding:12px;background:#08142c;">
-  <tr><td style="padding:8px 0;color:#94a3b8;">Login Email</td><td style="padding:8px 0;color:#e2e8f0;"><strong>{email}</strong></td></tr>
-  <tr><td style="padding:8px 0;color:#94a3b8;">Password</td><td style="padding:8px 0;color:#e2e8f0;">{password_html}</td></tr>
-  <tr><td style="padding:8px 0;color:#94a3b8;">Vendor PIN</td><td style="padding:8px 0;color:#e2e8f0;"><strong>{pin_code}</strong></td></tr>
-  <tr><td style="padding:8px 0;color:#94a3b8;">Vendor ID</td><td style="padding:8px 0;color:#e2e8f0;"><strong>{vendor.id}</strong></td></tr>
-  {parent_row}
-</table>
-<p style="margin:16px 0 6px 0;line-height:1.6;color:#cbd5e1;">
-  Dashboard: <a href="{dashboard_url}" style="color:#60a5fa;text-decoration:none;">{dashboard_url}</a>
-</p>
-<p style="margin:6px 0 0 0;line-height:1.6;color:#cbd5e1;">Status: <strong>Pending Verification</strong></p>
-<p style="margin:18px 0 0 0;font-size:12px;color:#94a3b8;line-height:1.6;">
-  Keep credentials confidential. If you did not request this onboarding, contact Hash support immediately.
-</p>
-"""
+        return WELCOME_EMAIL_TEMPLATE.render(
+            owner_name=vendor.owner_name,
+            cafe_name=vendor.cafe_name,
+            email=email,
+            password_html=password_html,
+            pin_code=pin_code,
+            vendor_id=vendor.id,
+            parent_row=parent_row,
+            dashboard_url=dashboard_url,
+        )
 
       
     @staticmethod
@@ -1871,12 +1819,12 @@ class VendorService:
             preview_text=f"Important account notice for {cafe_name}",
         )
 
-        mail.send(msg)
-        current_app.logger.info(f"Deboard notification sent to {email} for vendor {vendor_id}")
+        MailQueue.enqueue(msg, category="deboard_notice", meta={"vendor_id": vendor_id})
+        current_app.logger.info(f"Deboard notification queued for {email} for vendor {vendor_id}")
 
         return {
             'success': True,
-            'message': f'Notification sent to {email}',
+            'message': f'Notification queued for {email}',
             'vendor_id': vendor_id,
             'cafe_name': cafe_name
         }
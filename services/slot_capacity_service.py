@@ -0,0 +1,224 @@
+# services/slot_capacity_service.py
+
+from datetime import date as date_type, datetime
+from typing import Dict, Optional
+
+from flask import current_app
+from sqlalchemy import inspect, text
+
+from db.extensions import db
+from services.slot_inventory import SLOT, SlotInventoryStore
+
+# Booking lifecycle events and the capacity delta each one applies.
+BOOKING_EVENT_DELTAS = {
+    "confirm": -1,
+    "confirmed": -1,
+    "cancel": 1,
+    "cancelled": 1,
+    "complete": 1,
+    "completed": 1,
+}
+HELD = "held"
+RELEASED = "released"
+
+
+class SlotCapacityService:
+    """
+    Incremental capacity maintenance for slot inventory rows.
+
+    Booking confirm/cancel/complete events move `available_slot` by one for the
+    booking's (slot_id, date) row. `slot_capacity_holds` records, per booking,
+    whether it currently holds a seat, so replayed or out-of-order events never
+    apply the same delta twice, and a release only returns a seat that a hold took.
+    The hold transition and the capacity update run in one transaction; the nightly
+    reconcile verifies the result and heals releases of bookings with no hold row.
+    """
+
+    _table_ready = False
+
+    @staticmethod
+    def _ensure_table():
+        if SlotCapacityService._table_ready:
+            return
+        try:
+            if not inspect(db.engine).has_table("slot_capacity_holds"):
+                db.session.execute(
+                    text(
+                        """
+                        CREATE TABLE IF NOT EXISTS slot_capacity_holds (
+                          booking_id INTEGER PRIMARY KEY,
+                          vendor_id INTEGER NOT NULL,
+                          slot_id INTEGER NOT NULL,
+                          date DATE NOT NULL,
+                          state VARCHAR(16) NOT NULL,
+                          updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                        )
+                        """
+                    )
+                )
+                db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        SlotCapacityService._table_ready = True
+
+    @staticmethod
+    def _parse_date(value) -> Optional[date_type]:
+        if value is None or value == "":
+            return None
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date_type):
+            return value
+        return datetime.strptime(str(value).strip()[:10], "%Y-%m-%d").date()
+
+    @staticmethod
+    def _resolve_booking(booking_id: int) -> Optional[Dict]:
+        """Slot, booked date and vendor for a booking (earliest transaction wins)."""
+        return db.session.execute(
+            text(
+                """
+                SELECT b.slot_id, ag.vendor_id, CAST(t.booked_date AS date) AS booked_date
+                FROM bookings b
+                JOIN slots s ON s.id = b.slot_id
+                JOIN available_games ag ON ag.id = s.gaming_type_id
+                LEFT JOIN transactions t ON t.booking_id = b.id
+                WHERE b.id = :booking_id
+                ORDER BY t.id ASC NULLS LAST
+                LIMIT 1
+                """
+            ),
+            {"booking_id": int(booking_id)},
+        ).mappings().first()
+
+    @staticmethod
+    def apply_booking_event(
+        event: str,
+        booking_id: int,
+        vendor_id: Optional[int] = None,
+        slot_id: Optional[int] = None,
+        date=None,
+    ) -> Dict:
+        """
+        Apply one booking event to its slot row. Missing vendor/slot/date are looked up
+        from the booking. Returns {"applied": bool, "reason"/"available_slot": ...}.
+        Does not commit; callers own the transaction.
+        """
+        normalized = str(event or "").strip().lower()
+        if normalized not in BOOKING_EVENT_DELTAS:
+            raise ValueError(f"Unsupported booking event: {event}")
+        delta = BOOKING_EVENT_DELTAS[normalized]
+        booking_id = int(booking_id)
+
+        SlotCapacityService._ensure_table()
+
+        booked_date = SlotCapacityService._parse_date(date)
+        if vendor_id is None or slot_id is None or booked_date is None:
+            resolved = SlotCapacityService._resolve_booking(booking_id)
+            if not resolved:
+                return {"booking_id": booking_id, "applied": False, "reason": "booking_not_found"}
+            vendor_id = vendor_id if vendor_id is not None else resolved["vendor_id"]
+            slot_id = slot_id if slot_id is not None else resolved["slot_id"]
+            booked_date = booked_date or resolved["booked_date"]
+        if booked_date is None:
+            return {"booking_id": booking_id, "applied": False, "reason": "booked_date_unknown"}
+
+        params = {
+            "booking_id": booking_id,
+            "vendor_id": int(vendor_id),
+            "slot_id": int(slot_id),
+            "date": booked_date,
+            "state": HELD if delta < 0 else RELEASED,
+        }
+
+        # Only a real state change moves capacity. A confirm takes the hold (again, after
+        # a release); a release only happens when a held row moves to released.
+        if delta < 0:
+            transitioned = db.session.execute(
+                text(
+                    """
+                    INSERT INTO slot_capacity_holds (booking_id, vendor_id, slot_id, date, state, updated_at)
+                    VALUES (:booking_id, :vendor_id, :slot_id, :date, :state, now())
+                    ON CONFLICT (booking_id) DO UPDATE
+                       SET state = EXCLUDED.state,
+                           updated_at = now()
+                     WHERE slot_capacity_holds.state <> EXCLUDED.state
+                    RETURNING vendor_id, slot_id, date
+                    """
+                ),
+                params,
+            ).mappings().first()
+            if not transitioned:
+                return {"booking_id": booking_id, "applied": False, "reason": "already_applied"}
+        else:
+            transitioned = db.session.execute(
+                text(
+                    """
+                    UPDATE slot_capacity_holds
+                       SET state = :state, updated_at = now()
+                     WHERE booking_id = :booking_id AND state = 'held'
+                    RETURNING vendor_id, slot_id, date
+                    """
+                ),
+                params,
+            ).mappings().first()
+            if not transitioned:
+                # No held seat to give back. A booking without a hold row predates this
+                # path or was never confirmed; whether it took a seat is unknown here, so
+                # record the release and leave the count to the nightly reconcile.
+                recorded = db.session.execute(
+                    text(
+                        """
+                        INSERT INTO slot_capacity_holds (booking_id, vendor_id, slot_id, date, state, updated_at)
+                        VALUES (:booking_id, :vendor_id, :slot_id, :date, :state, now())
+                        ON CONFLICT (booking_id) DO NOTHING
+                        RETURNING booking_id
+                        """
+                    ),
+                    params,
+                ).first()
+                reason = "no_hold" if recorded else "already_applied"
+                return {"booking_id": booking_id, "applied": False, "reason": reason}
+
+        # A release applies to the row the seat was held on, even if the event says otherwise.
+        params.update(
+            vendor_id=int(transitioned["vendor_id"]),
+            slot_id=int(transitioned["slot_id"]),
+            date=transitioned["date"],
+            delta=delta,
+        )
+        table_name = SlotInventoryStore.table_name(SLOT, params["vendor_id"])
+        row = db.session.execute(
+            text(
+                f"""
+                UPDATE {table_name} AS vs
+                   SET available_slot = LEAST(GREATEST(vs.available_slot + :delta, 0), cap.total_slot),
+                       is_available = LEAST(GREATEST(vs.available_slot + :delta, 0), cap.total_slot) > 0
+                  FROM (
+                        SELECT ag.total_slot
+                        FROM slots s
+                        JOIN available_games ag ON ag.id = s.gaming_type_id
+                        WHERE s.id = :slot_id
+                       ) AS cap
+                 WHERE vs.vendor_id = :vendor_id
+                   AND vs.slot_id = :slot_id
+                   AND vs.date = :date
+                RETURNING vs.available_slot, vs.is_available
+                """
+            ),
+            params,
+        ).mappings().first()
+
+        if not row:
+            # Outside the materialized window; the window extension computes it fresh.
+            return {"booking_id": booking_id, "applied": True, "reason": "slot_row_missing"}
+
+        return {
+            "booking_id": booking_id,
+            "applied": True,
+            "vendor_id": params["vendor_id"],
+            "slot_id": params["slot_id"],
+            "date": params["date"].isoformat(),
+            "available_slot": int(row["available_slot"]),
+            "is_available": bool(row["is_available"]),
+        }
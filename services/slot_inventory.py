@@ -0,0 +1,334 @@
+# services/slot_inventory.py
+
+import os
+import re
+import time
+from typing import Dict, List, Optional
+
+from flask import current_app
+from sqlalchemy import bindparam, text
+
+from db.extensions import db
+
+# "per_vendor" keeps the legacy VENDOR_<id>_* tables; "shared" uses the partitioned tables below.
+SLOT_INVENTORY_BACKEND = str(os.getenv("SLOT_INVENTORY_BACKEND", "per_vendor") or "per_vendor").strip().lower()
+SLOT_INVENTORY_PARTITIONS = max(1, int(os.getenv("SLOT_INVENTORY_PARTITIONS", "16")))
+
+SLOT = "slot"
+CONSOLE_AVAILABILITY = "console_availability"
+DASHBOARD = "dashboard"
+PROMO_DETAIL = "promo_detail"
+
+SHARED_TABLES = {
+    SLOT: "vendor_slot_inventory",
+    CONSOLE_AVAILABILITY: "vendor_console_availability",
+    DASHBOARD: "vendor_dashboard_bookings",
+    PROMO_DETAIL: "vendor_promo_details",
+}
+LEGACY_TABLE_PATTERNS = {
+    SLOT: "VENDOR_{vendor_id}_SLOT",
+    CONSOLE_AVAILABILITY: "VENDOR_{vendor_id}_CONSOLE_AVAILABILITY",
+    DASHBOARD: "VENDOR_{vendor_id}_DASHBOARD",
+    PROMO_DETAIL: "VENDOR_{vendor_id}_PROMO_DETAIL",
+}
+# Columns copied from legacy tables (shared tables add vendor_id where the legacy one lacks it).
+LEGACY_COLUMNS = {
+    SLOT: ["vendor_id", "date", "slot_id", "is_available", "available_slot"],
+    CONSOLE_AVAILABILITY: ["vendor_id", "console_id", "game_id", "is_available"],
+    DASHBOARD: [
+        "username", "user_id", "start_time", "end_time", "date", "book_id", "extra_played_time",
+        "game_id", "game_name", "console_id", "extra_pay_status", "extra_pay_trans_id", "status", "book_status",
+    ],
+    PROMO_DETAIL: ["booking_id", "transaction_id", "promo_code", "discount_applied", "actual_price", "created_at"],
+}
+# Legacy tables that carry their own vendor_id column.
+LEGACY_HAS_VENDOR_ID = {SLOT, CONSOLE_AVAILABILITY}
+
+
+class SlotInventoryStore:
+    """
+    Storage backend switch for vendor slot inventory.
+
+    Legacy layout: four tables per vendor (VENDOR_<id>_SLOT, _CONSOLE_AVAILABILITY,
+    _DASHBOARD, _PROMO_DETAIL). Shared layout: one table per kind keyed by vendor_id;
+    slot inventory and dashboard bookings are hash-partitioned on vendor_id so
+    per-vendor access stays partition-local while cross-vendor jobs run as a
+    single statement.
+    """
+
+    _shared_ready = False
+
+    @staticmethod
+    def is_shared() -> bool:
+        return SLOT_INVENTORY_BACKEND == "shared"
+
+    @staticmethod
+    def table_name(kind: str, vendor_id: int) -> str:
+        if SlotInventoryStore.is_shared():
+            return SHARED_TABLES[kind]
+        return LEGACY_TABLE_PATTERNS[kind].format(vendor_id=int(vendor_id))
+
+    @staticmethod
+    def vendor_clause(kind: str, alias: str = "") -> str:
+        """
+        `AND vendor_id = :vendor_id` for tables shared across vendors; legacy tables
+        without a vendor_id column are already vendor-scoped by name.
+        """
+        if SlotInventoryStore.is_shared() or kind in LEGACY_HAS_VENDOR_ID:
+            prefix = f"{alias}." if alias else ""
+            return f"AND {prefix}vendor_id = :vendor_id"
+        return ""
+
+    @staticmethod
+    def ensure_shared_tables():
+        if SlotInventoryStore._shared_ready:
+            return
+        # Avoid DDL (and its commit) inside a caller's transaction once the tables exist.
+        existing = db.session.execute(
+            text("SELECT " + ", ".join(f"to_regclass('{name}')" for name in SHARED_TABLES.values()))
+        ).first()
+        if existing and all(existing):
+            SlotInventoryStore._shared_ready = True
+            return
+        statements = [
+            f"""
+            CREATE TABLE IF NOT EXISTS {SHARED_TABLES[SLOT]} (
+              vendor_id INT NOT NULL,
+              date DATE NOT NULL,
+              slot_id INT NOT NULL,
+              is_available BOOLEAN NOT NULL,
+              available_slot INT NOT NULL,
+              PRIMARY KEY (vendor_id, date, slot_id)
+            ) PARTITION BY HASH (vendor_id)
+            """,
+            f"""
+            CREATE TABLE IF NOT EXISTS {SHARED_TABLES[CONSOLE_AVAILABILITY]} (
+              vendor_id INT NOT NULL,
+              console_id INT NOT NULL,
+              game_id INT NOT NULL,
+              is_available BOOLEAN NOT NULL,
+              PRIMARY KEY (vendor_id, console_id)
+            )
+            """,
+            f"""
+            CREATE TABLE IF NOT EXISTS {SHARED_TABLES[DASHBOARD]} (
+              vendor_id INT NOT NULL,
+              id BIGSERIAL,
+              username VARCHAR(255) NOT NULL,
+              user_id INT NOT NULL,
+              start_time TIME NOT NULL,
+              end_time TIME NOT NULL,
+              date DATE NOT NULL,
+              book_id INT NOT NULL,
+              extra_played_time INTERVAL DEFAULT '00:00:00',
+              game_id INT NOT NULL,
+              game_name VARCHAR(255) NOT NULL,
+              console_id INT NOT NULL,
+              extra_pay_status BOOLEAN DEFAULT FALSE,
+              extra_pay_trans_id VARCHAR(255) NULL,
+              status BOOLEAN DEFAULT TRUE,
+              book_status VARCHAR(255) NULL,
+              PRIMARY KEY (vendor_id, id)
+            ) PARTITION BY HASH (vendor_id)
+            """,
+            f"""
+            CREATE TABLE IF NOT EXISTS {SHARED_TABLES[PROMO_DETAIL]} (
+              id BIGSERIAL PRIMARY KEY,
+              vendor_id INT NOT NULL,
+              booking_id INT NOT NULL,
+              transaction_id INT NOT NULL,
+              promo_code VARCHAR(50),
+              discount_applied FLOAT,
+              actual_price FLOAT NOT NULL,
+              created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+        ]
+        for kind in (SLOT, DASHBOARD):
+            parent = SHARED_TABLES[kind]
+            for remainder in range(SLOT_INVENTORY_PARTITIONS):
+                statements.append(
+                    f"""
+                    CREATE TABLE IF NOT EXISTS {parent}_p{remainder}
+                    PARTITION OF {parent}
+                    FOR VALUES WITH (MODULUS {SLOT_INVENTORY_PARTITIONS}, REMAINDER {remainder})
+                    """
+                )
+        statements.extend([
+            f"CREATE INDEX IF NOT EXISTS idx_{SHARED_TABLES[SLOT]}_date_slot ON {SHARED_TABLES[SLOT]} (date, slot_id)",
+            f"CREATE INDEX IF NOT EXISTS idx_{SHARED_TABLES[DASHBOARD]}_book ON {SHARED_TABLES[DASHBOARD]} (vendor_id, book_id)",
+            f"CREATE INDEX IF NOT EXISTS idx_{SHARED_TABLES[PROMO_DETAIL]}_vendor ON {SHARED_TABLES[PROMO_DETAIL]} (vendor_id, booking_id)",
+        ])
+        try:
+            for statement in statements:
+                db.session.execute(text(statement))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        SlotInventoryStore._shared_ready = True
+
+    @staticmethod
+    def clear_vendor_kind(kind: str, vendor_id: int):
+        """Delete a vendor's rows from one shared table (skipped if it was never created)."""
+        table = SHARED_TABLES[kind]
+        if not SlotInventoryStore._shared_ready:
+            if not db.session.execute(text("SELECT to_regclass(:name)"), {"name": table}).scalar():
+                return
+        db.session.execute(
+            text(f"DELETE FROM {table} WHERE vendor_id = :vendor_id"),
+            {"vendor_id": int(vendor_id)},
+        )
+
+    # ------------------------------------------------------------------
+    # Cross-vendor, set-based operations (shared layout only)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def extend_window_for_vendors(vendor_ids: List[int], start_date, end_date) -> int:
+        """Insert missing (vendor, date, slot) rows for many vendors in one statement."""
+        if not vendor_ids:
+            return 0
+        sql = text(f"""
+            INSERT INTO {SHARED_TABLES[SLOT]} (vendor_id, date, slot_id, is_available, available_slot)
+            SELECT ag.vendor_id, gs.date::date, s.id, s.is_available, s.available_slot
+            FROM generate_series(:start_date, :end_date, '1 day'::INTERVAL) AS gs(date)
+            CROSS JOIN slots s
+            JOIN available_games ag ON ag.id = s.gaming_type_id
+            WHERE s.is_available = TRUE
+              AND ag.vendor_id IN :vendor_ids
+            ON CONFLICT (vendor_id, date, slot_id) DO NOTHING
+        """).bindparams(bindparam("vendor_ids", expanding=True))
+        result = db.session.execute(
+            sql,
+            {"vendor_ids": [int(v) for v in vendor_ids], "start_date": start_date, "end_date": end_date},
+        )
+        return int(result.rowcount or 0)
+
+    @staticmethod
+    def reconcile_window_for_vendors(vendor_ids: List[int], start_date, end_date, only_changed: bool = False) -> int:
+        """Recompute available_slot/is_available for many vendors in one statement."""
+        if not vendor_ids:
+            return 0
+        changed_filter = ""
+        if only_changed:
+            changed_filter = """
+               AND (vs.available_slot IS DISTINCT FROM target.new_available
+                    OR vs.is_available IS DISTINCT FROM (target.new_available > 0))"""
+        sql = text(f"""
+            WITH cap AS (
+                SELECT s.id AS slot_id, ag.vendor_id, ag.total_slot AS max_capacity
+                FROM slots s
+                JOIN available_games ag ON ag.id = s.gaming_type_id
+                WHERE ag.vendor_id IN :vendor_ids
+            ),
+            booked AS (
+                SELECT b.slot_id, CAST(t.booked_date AS date) AS booked_date, COUNT(DISTINCT b.id) AS active_count
+                FROM bookings b
+                JOIN transactions t ON t.booking_id = b.id
+                JOIN cap ON cap.slot_id = b.slot_id
+                WHERE CAST(t.booked_date AS date) BETWEEN :start_date AND :end_date
+                  AND lower(COALESCE(b.status, '')) IN ('confirmed', 'current')
+                GROUP BY b.slot_id, CAST(t.booked_date AS date)
+            ),
+            target AS (
+                SELECT vs.vendor_id, vs.date, vs.slot_id,
+                       GREATEST(cap.max_capacity - COALESCE(booked.active_count, 0), 0) AS new_available
+                FROM {SHARED_TABLES[SLOT]} vs
+                JOIN cap ON cap.vendor_id = vs.vendor_id AND cap.slot_id = vs.slot_id
+                LEFT JOIN booked ON booked.slot_id = vs.slot_id AND booked.booked_date = vs.date
+                WHERE vs.vendor_id IN :vendor_ids
+                  AND vs.date BETWEEN :start_date AND :end_date
+            )
+            UPDATE {SHARED_TABLES[SLOT]} AS vs
+               SET available_slot = target.new_available,
+                   is_available = target.new_available > 0
+              FROM target
+             WHERE vs.vendor_id = target.vendor_id
+               AND vs.date = target.date
+               AND vs.slot_id = target.slot_id{changed_filter}
+        """).bindparams(bindparam("vendor_ids", expanding=True))
+        result = db.session.execute(
+            sql,
+            {"vendor_ids": [int(v) for v in vendor_ids], "start_date": start_date, "end_date": end_date},
+        )
+        return int(result.rowcount or 0)
+
+    # ------------------------------------------------------------------
+    # Migration from per-vendor tables
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def legacy_vendor_ids() -> List[int]:
+        """Vendor ids that still own at least one legacy VENDOR_<id>_* table."""
+        rows = db.session.execute(text("""
+            SELECT tablename
+            FROM pg_tables
+            WHERE schemaname = current_schema()
+              AND tablename ~ '^vendor_[0-9]+_(slot|console_availability|dashboard|promo_detail)$'
+        """)).scalars().all()
+        ids = set()
+        for name in rows:
+            match = re.match(r"^vendor_(\d+)_", str(name))
+            if match:
+                ids.add(int(match.group(1)))
+        return sorted(ids)
+
+    @staticmethod
+    def _legacy_table_exists(kind: str, vendor_id: int) -> bool:
+        name = LEGACY_TABLE_PATTERNS[kind].format(vendor_id=int(vendor_id)).lower()
+        return bool(db.session.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar())
+
+    @staticmethod
+    def migrate_vendor(vendor_id: int) -> Dict[str, int]:
+        """
+        Copy one vendor's legacy tables into the shared tables. Idempotent: the
+        vendor's shared rows are replaced, legacy tables are left untouched.
+        Caller commits.
+        """
+        SlotInventoryStore.ensure_shared_tables()
+        copied = {}
+        for kind, shared_table in SHARED_TABLES.items():
+            if not SlotInventoryStore._legacy_table_exists(kind, vendor_id):
+                copied[kind] = 0
+                continue
+            legacy_table = LEGACY_TABLE_PATTERNS[kind].format(vendor_id=int(vendor_id))
+            columns = LEGACY_COLUMNS[kind]
+            target_columns = columns if kind in LEGACY_HAS_VENDOR_ID else ["vendor_id"] + columns
+            source_columns = columns if kind in LEGACY_HAS_VENDOR_ID else [":vendor_id"] + columns
+            db.session.execute(
+                text(f"DELETE FROM {shared_table} WHERE vendor_id = :vendor_id"),
+                {"vendor_id": int(vendor_id)},
+            )
+            result = db.session.execute(
+                text(f"""
+                    INSERT INTO {shared_table} ({", ".join(target_columns)})
+                    SELECT {", ".join(source_columns)}
+                    FROM {legacy_table}
+                """),
+                {"vendor_id": int(vendor_id)},
+            )
+            copied[kind] = int(result.rowcount or 0)
+        return copied
+
+    @staticmethod
+    def migrate_all(vendor_ids: Optional[List[int]] = None) -> Dict[str, object]:
+        """Migrate vendors one transaction at a time so a failure only affects that vendor."""
+        targets = vendor_ids or SlotInventoryStore.legacy_vendor_ids()
+        results = []
+        started = time.perf_counter()
+        for v_id in targets:
+            try:
+                copied = SlotInventoryStore.migrate_vendor(v_id)
+                db.session.commit()
+                results.append({"vendor_id": int(v_id), "success": True, "copied": copied})
+            except Exception as exc:
+                db.session.rollback()
+                current_app.logger.error("Slot inventory migration failed for vendor %s: %s", v_id, exc, exc_info=True)
+                results.append({"vendor_id": int(v_id), "success": False, "error": str(exc)})
+        return {
+            "processed_vendors": len(targets),
+            "failed_vendors": sum(1 for r in results if not r["success"]),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+            "results": results,
+        }
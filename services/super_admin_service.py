@@ -14,8 +14,12 @@ from flask_mail import Message
 from sqlalchemy import and_, bindparam, case, func, inspect, or_, text
 from werkzeug.security import generate_password_hash
 
-from db.extensions import db, mail
+from db.extensions import db
 from services.email_template import build_hfg_email_html
+from services.mail_queue import MailQueue
+from services.newsletter_campaign import NewsletterCampaign, merge_token, render_for
+from services.onboarding_jobs import OnboardingJobService
+from services.catalogue_cache import CatalogueCache
 from models.contactInfo import ContactInfo
 from models.document import Document
 from models.passwordManager import PasswordManager
@@ -1091,6 +1095,7 @@ class SuperAdminService:
             status_row = VendorStatus(vendor_id=vendor_id, status=new_status, updated_at=datetime.utcnow())
             db.session.add(status_row)
             db.session.commit()
+            CatalogueCache.bump("status_change", vendor_id)
 
             return True, f"Vendor status updated to '{new_status}' by {changed_by}"
         except Exception as exc:
@@ -1120,6 +1125,7 @@ class SuperAdminService:
         next_status = "active" if pending_count == 0 else "pending_verification"
         db.session.add(VendorStatus(vendor_id=vendor_id, status=next_status, updated_at=datetime.utcnow()))
         db.session.commit()
+        CatalogueCache.bump("documents_verified", vendor_id)
 
         try:
             vendor = Vendor.query.get(vendor_id)
@@ -1171,7 +1177,7 @@ class SuperAdminService:
                         """,
                         preview_text=f"Document status updated to {target_status.title()} for {vendor.cafe_name or 'your cafe'}.",
                     )
-                    mail.send(msg)
+                    MailQueue.enqueue(msg, category="document_review", meta={"vendor_id": vendor_id})
         except Exception as mail_exc:
             current_app.logger.warning(
                 "verify_documents email notify failed vendor_id=%s status=%s err=%s",
@@ -1418,7 +1424,7 @@ class SuperAdminService:
                         ),
                         preview_text="Your dashboard credentials were reset by Hash super admin.",
                     )
-                    mail.send(msg)
+                    MailQueue.enqueue(msg, category="password_reset", meta={"vendor_id": vendor_id})
                     notified_to = recipient
             except Exception as exc:
                 current_app.logger.warning("Password reset email failed for vendor %s: %s", vendor_id, exc)
@@ -1532,7 +1538,7 @@ class SuperAdminService:
             preview_text=f"Early onboard offer for {vendor.cafe_name}",
         )
 
-        mail.send(msg)
+        MailQueue.enqueue(msg, category="early_onboard_offer", meta={"vendor_id": vendor.id})
 
         SuperAdminService._ensure_promotion_token_table()
         if SuperAdminService._has_table("vendor_promotion_tokens"):
@@ -1557,7 +1563,7 @@ class SuperAdminService:
             )
             db.session.commit()
 
-        return True, "Early Onboard promotion mail sent", {
+        return True, "Early Onboard promotion mail queued", {
             "vendor_id": int(vendor_id),
             "sent_to": recipient,
             "mail_subject": subject,
@@ -1844,12 +1850,95 @@ class SuperAdminService:
         return raw.strip()
 
     @staticmethod
-    def _resolve_newsletter_targets(mode: str = "all", vendor_ids: Optional[List[int]] = None):
+    def _newsletter_audience_sql(
+        scope_selected: bool,
+        statuses: Optional[List[str]],
+        subscription_states: Optional[List[str]],
+    ) -> str:
+        """
+        Audience rows for a newsletter: one row per vendor in scope with its recipient
+        (account email, else its first vendor contact email; lower-cased, NULL when
+        missing) and `rn`, which is 1 for the lowest vendor id sharing that recipient.
+        """
+        filters = []
+        if statuses:
+            filters.append("lower(COALESCE(ls.status, 'none')) = ANY(CAST(:statuses AS text[]))")
+        subscription_join = ""
+        if subscription_states:
+            if SuperAdminService._has_table("subscriptions"):
+                subscription_join = """
+                LEFT JOIN LATERAL (
+                    SELECT CASE
+                             WHEN lower(s.status) IN ('active', 'trialing', 'past_due')
+                                  AND (s.current_period_end IS NULL OR s.current_period_end >= now())
+                             THEN 'active'
+                             ELSE 'inactive'
+                           END AS state
+                    FROM subscriptions s
+                    WHERE s.vendor_id = v.id
+                    ORDER BY s.created_at DESC, s.id DESC
+                    LIMIT 1
+                ) sub ON true
+                """
+                filters.append("COALESCE(sub.state, 'none') = ANY(CAST(:subscription_states AS text[]))")
+            else:
+                filters.append("'none' = ANY(CAST(:subscription_states AS text[]))")
+
+        return f"""
+            WITH candidates AS (
+                SELECT v.id AS vendor_id,
+                       v.cafe_name,
+                       v.owner_name,
+                       COALESCE(
+                           NULLIF(lower(btrim(a.email)), ''),
+                           NULLIF(lower(btrim(ci.email)), '')
+                       ) AS recipient
+                FROM vendors v
+                LEFT JOIN vendor_accounts a ON a.id = v.account_id
+                LEFT JOIN LATERAL (
+                    SELECT c.email
+                    FROM contact_info c
+                    WHERE c.parent_id = v.id AND c.parent_type = 'vendor'
+                    ORDER BY c.id
+                    LIMIT 1
+                ) ci ON true
+                LEFT JOIN LATERAL (
+                    SELECT vs.status
+                    FROM vendor_statuses vs
+                    WHERE vs.vendor_id = v.id
+                    ORDER BY vs.updated_at DESC, vs.id DESC
+                    LIMIT 1
+                ) ls ON true
+                {subscription_join}
+                WHERE {"v.id = ANY(CAST(:vendor_ids AS int[]))" if scope_selected else "true"}
+                  {"".join(" AND " + clause for clause in filters)}
+            ),
+            ranked AS (
+                SELECT candidates.*,
+                       row_number() OVER (PARTITION BY recipient ORDER BY vendor_id) AS rn
+                FROM candidates
+            )
+        """
+
+    @staticmethod
+    def _resolve_newsletter_targets(
+        mode: str = "all",
+        vendor_ids: Optional[List[int]] = None,
+        statuses: Optional[List[str]] = None,
+        subscription_states: Optional[List[str]] = None,
+        summary_only: bool = False,
+    ):
+        """
+        Resolve newsletter recipients in one query. `statuses` filters on each vendor's
+        latest vendor_statuses row ("none" matches vendors without one);
+        `subscription_states` on its latest subscription ("active", "inactive", "none").
+        With `summary_only` the database returns counts and one sample target instead
+        of every recipient row.
+        """
         normalized_mode = (mode or "all").strip().lower()
         if normalized_mode not in {"all", "selected"}:
             return False, "mode must be 'all' or 'selected'", None
 
-        query = Vendor.query.order_by(Vendor.id.asc())
         normalized_vendor_ids: List[int] = []
         if normalized_mode == "selected":
             if not vendor_ids:
@@ -1860,37 +1949,90 @@ class SuperAdminService:
                 return False, "vendor_ids must contain valid integers", None
             if not normalized_vendor_ids:
                 return False, "vendor_ids are required for selected mode", None
-            query = query.filter(Vendor.id.in_(normalized_vendor_ids))
 
-        vendors = query.all()
-        if not vendors:
-            return False, "No vendors found for the selected audience.", None
+        normalized_statuses = sorted({str(v).strip().lower() for v in (statuses or []) if str(v).strip()})
+        normalized_states = sorted({str(v).strip().lower() for v in (subscription_states or []) if str(v).strip()})
+        invalid_states = [v for v in normalized_states if v not in {"active", "inactive", "none"}]
+        if invalid_states:
+            return False, "subscription_states must be 'active', 'inactive' or 'none'", None
+
+        audience_sql = SuperAdminService._newsletter_audience_sql(
+            scope_selected=normalized_mode == "selected",
+            statuses=normalized_statuses,
+            subscription_states=normalized_states,
+        )
+        params = {
+            "vendor_ids": normalized_vendor_ids,
+            "statuses": normalized_statuses,
+            "subscription_states": normalized_states,
+        }
+
+        def _target(row) -> Dict[str, Any]:
+            return {
+                "vendor_id": int(row["vendor_id"]),
+                "cafe_name": str(row["cafe_name"] or f"Cafe #{row['vendor_id']}"),
+                "owner_name": str(row["owner_name"] or "Partner"),
+                "recipient": row["recipient"],
+            }
 
         targets: List[Dict[str, Any]] = []
-        missing_email_vendor_ids: List[int] = []
-        seen_emails: set[str] = set()
-        duplicate_recipients = 0
-
-        for vendor in vendors:
-            resolved = SuperAdminService._resolve_vendor_emails(vendor)
-            recipient = (resolved.get("recipient") or "").strip().lower()
-            if not recipient:
-                missing_email_vendor_ids.append(int(vendor.id))
-                continue
-            if recipient in seen_emails:
-                duplicate_recipients += 1
-                continue
-            seen_emails.add(recipient)
-            targets.append(
-                {
-                    "vendor_id": int(vendor.id),
-                    "cafe_name": str(vendor.cafe_name or f"Cafe #{vendor.id}"),
-                    "owner_name": str(vendor.owner_name or "Partner"),
-                    "recipient": recipient,
-                }
-            )
+        sample_target = None
+        if summary_only:
+            summary = db.session.execute(
+                text(
+                    audience_sql
+                    + """
+                    SELECT counts.*, sample.vendor_id, sample.cafe_name, sample.owner_name, sample.recipient
+                    FROM (
+                        SELECT count(*) AS scanned,
+                               count(*) FILTER (WHERE recipient IS NOT NULL AND rn = 1) AS recipients,
+                               count(*) FILTER (WHERE recipient IS NOT NULL AND rn > 1) AS duplicates,
+                               COALESCE(
+                                   array_agg(vendor_id ORDER BY vendor_id) FILTER (WHERE recipient IS NULL),
+                                   '{}'
+                               ) AS missing_email_vendor_ids
+                        FROM ranked
+                    ) counts
+                    LEFT JOIN LATERAL (
+                        SELECT vendor_id, cafe_name, owner_name, recipient
+                        FROM ranked
+                        WHERE recipient IS NOT NULL AND rn = 1
+                        ORDER BY vendor_id
+                        LIMIT 1
+                    ) sample ON true
+                    """
+                ),
+                params,
+            ).mappings().one()
+            scanned = int(summary["scanned"] or 0)
+            recipient_count = int(summary["recipients"] or 0)
+            duplicate_recipients = int(summary["duplicates"] or 0)
+            missing_email_vendor_ids = [int(v) for v in summary["missing_email_vendor_ids"] or []]
+            if summary["vendor_id"] is not None:
+                sample_target = _target(summary)
+        else:
+            rows = db.session.execute(
+                text(
+                    audience_sql
+                    + """
+                    SELECT vendor_id, cafe_name, owner_name, recipient, rn
+                    FROM ranked
+                    ORDER BY vendor_id
+                    """
+                ),
+                params,
+            ).mappings().all()
+            scanned = len(rows)
+            missing_email_vendor_ids = [int(row["vendor_id"]) for row in rows if row["recipient"] is None]
+            duplicate_recipients = sum(1 for row in rows if row["recipient"] is not None and row["rn"] > 1)
+            targets = [_target(row) for row in rows if row["recipient"] is not None and row["rn"] == 1]
+            recipient_count = len(targets)
+            sample_target = targets[0] if targets else None
+
+        if not scanned:
+            return False, "No vendors found for the selected audience.", None
 
-        if not targets:
+        if not recipient_count:
             return False, "No vendor recipients found with valid emails.", {
                 "missing_email_vendor_ids": missing_email_vendor_ids,
                 "duplicate_recipients": duplicate_recipients,
@@ -1898,16 +2040,26 @@ class SuperAdminService:
 
         return True, "Audience resolved", {
             "mode": normalized_mode,
-            "vendor_count_scanned": len(vendors),
-            "recipient_count": len(targets),
+            "vendor_count_scanned": scanned,
+            "recipient_count": recipient_count,
             "targets": targets,
+            "sample_target": sample_target,
             "missing_email_vendor_ids": missing_email_vendor_ids,
             "duplicate_recipients": duplicate_recipients,
             "selected_vendor_ids": normalized_vendor_ids if normalized_mode == "selected" else [],
+            "statuses": normalized_statuses,
+            "subscription_states": normalized_states,
         }
 
     @staticmethod
-    def preview_newsletter(topic: str, content: str, mode: str = "all", vendor_ids: Optional[List[int]] = None):
+    def preview_newsletter(
+        topic: str,
+        content: str,
+        mode: str = "all",
+        vendor_ids: Optional[List[int]] = None,
+        statuses: Optional[List[str]] = None,
+        subscription_states: Optional[List[str]] = None,
+    ):
         cleaned_topic, cleaned_content, validation_error = SuperAdminService._validate_newsletter_payload(topic, content)
         if validation_error:
             return False, validation_error, None
@@ -1915,40 +2067,32 @@ class SuperAdminService:
         ok_targets, target_message, target_payload = SuperAdminService._resolve_newsletter_targets(
             mode=mode,
             vendor_ids=vendor_ids,
+            statuses=statuses,
+            subscription_states=subscription_states,
+            summary_only=True,
         )
         if not ok_targets:
             return False, target_message, target_payload
 
-        sample_target = (target_payload.get("targets") or [{}])[0]
-        owner_name = str(sample_target.get("owner_name") or "Partner")
-        cafe_name = str(sample_target.get("cafe_name") or "Your Cafe")
-        recipient = str(sample_target.get("recipient") or "")
+        sample_target = target_payload.get("sample_target") or {}
         dashboard_url = (os.getenv("HASH_DASHBOARD_URL") or "https://dashboard.hashforgamers.com").rstrip("/")
         support_email = (os.getenv("MAIL_REPLY_TO") or os.getenv("MAIL_DEFAULT_SENDER") or "support@hashforgamers.co.in").strip()
         subject = f"Hash For Gamers · {cleaned_topic}"
 
-        newsletter_content = SuperAdminService._build_newsletter_email_html(
+        html_template, text_template = SuperAdminService._build_newsletter_templates(
             topic=cleaned_topic,
             content=cleaned_content,
-            owner_name=owner_name,
-            cafe_name=cafe_name,
-            recipient_email=recipient,
-            support_email=support_email,
-            dashboard_url=dashboard_url,
-        )
-        html_preview = build_hfg_email_html(
             subject=subject,
-            content_html=newsletter_content,
-            preview_text=cleaned_topic,
-        )
-        text_preview = SuperAdminService._build_newsletter_email_text(
-            topic=cleaned_topic,
-            content=cleaned_content,
-            owner_name=owner_name,
-            cafe_name=cafe_name,
             support_email=support_email,
             dashboard_url=dashboard_url,
         )
+        merge_values = {
+            "owner_name": str(sample_target.get("owner_name") or "Partner"),
+            "cafe_name": str(sample_target.get("cafe_name") or "Your Cafe"),
+            "recipient": str(sample_target.get("recipient") or ""),
+        }
+        html_preview = render_for(html_template, merge_values, escape=True)
+        text_preview = render_for(text_template, merge_values, escape=False)
 
         return True, "Preview generated", {
             "subject": subject,
@@ -1967,6 +2111,8 @@ class SuperAdminService:
         mode: str = "all",
         vendor_ids: Optional[List[int]] = None,
         sent_by: str = "super_admin_dashboard",
+        statuses: Optional[List[str]] = None,
+        subscription_states: Optional[List[str]] = None,
     ):
         cleaned_topic, cleaned_content, validation_error = SuperAdminService._validate_newsletter_payload(topic, content)
         if validation_error:
@@ -1975,6 +2121,8 @@ class SuperAdminService:
         ok_targets, target_message, target_payload = SuperAdminService._resolve_newsletter_targets(
             mode=mode,
             vendor_ids=vendor_ids,
+            statuses=statuses,
+            subscription_states=subscription_states,
         )
         if not ok_targets:
             return False, target_message, target_payload
@@ -1984,120 +2132,111 @@ class SuperAdminService:
         support_email = (os.getenv("MAIL_REPLY_TO") or sender_email).strip()
         dashboard_url = (os.getenv("HASH_DASHBOARD_URL") or "https://dashboard.hashforgamers.com").rstrip("/")
         subject = f"Hash For Gamers · {cleaned_topic}"
-        campaign_id = f"nl_{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}_{secrets.token_hex(4)}"
-
-        sent_count = 0
-        failed_count = 0
-        failed_recipients: List[Dict[str, str]] = []
-        log_rows: List[Dict[str, Any]] = []
-
-        for target in targets:
-            recipient = str(target.get("recipient") or "").strip().lower()
-            if not recipient:
-                continue
-            vendor_id = int(target.get("vendor_id") or 0)
-            owner_name = str(target.get("owner_name") or "Partner")
-            cafe_name = str(target.get("cafe_name") or f"Cafe #{vendor_id}")
-
-            msg = Message(
-                subject=subject,
-                sender=sender_email,
-                recipients=[recipient],
-                reply_to=support_email,
-            )
-            msg.body = SuperAdminService._build_newsletter_email_text(
+        campaign_id = NewsletterCampaign.new_campaign_id(datetime.now(timezone.utc))
+
+        html_template, text_template = SuperAdminService._build_newsletter_templates(
+            topic=cleaned_topic,
+            content=cleaned_content,
+            subject=subject,
+            support_email=support_email,
+            dashboard_url=dashboard_url,
+        )
+
+        SuperAdminService._ensure_newsletter_log_table()
+        try:
+            recipient_count = NewsletterCampaign.create(
+                campaign_id=campaign_id,
                 topic=cleaned_topic,
                 content=cleaned_content,
-                owner_name=owner_name,
-                cafe_name=cafe_name,
-                support_email=support_email,
-                dashboard_url=dashboard_url,
-            )
-            msg.html = build_hfg_email_html(
                 subject=subject,
-                content_html=SuperAdminService._build_newsletter_email_html(
-                topic=cleaned_topic,
-                content=cleaned_content,
-                owner_name=owner_name,
-                cafe_name=cafe_name,
-                recipient_email=recipient,
-                support_email=support_email,
-                dashboard_url=dashboard_url,
-            ),
-                preview_text=cleaned_topic,
+                sender=sender_email,
+                reply_to=support_email,
+                html_template=html_template,
+                text_template=text_template,
+                targets=targets,
+                audience={
+                    "mode": target_payload.get("mode"),
+                    "selected_vendor_ids": target_payload.get("selected_vendor_ids") or [],
+                    "statuses": target_payload.get("statuses") or [],
+                    "subscription_states": target_payload.get("subscription_states") or [],
+                },
+                sent_by=sent_by,
             )
-
-            row_payload: Dict[str, Any] = {
-                "campaign_id": campaign_id,
-                "vendor_id": vendor_id,
-                "sent_to_email": recipient,
-                "topic": cleaned_topic,
-                "content": cleaned_content,
-                "status": "sent",
-                "error_message": None,
-                "sent_by": sent_by,
-            }
-            try:
-                mail.send(msg)
-                sent_count += 1
-            except Exception as exc:
-                failed_count += 1
-                error_text = str(exc)
-                failed_recipients.append({"email": recipient, "error": error_text[:220]})
-                row_payload["status"] = "failed"
-                row_payload["error_message"] = error_text[:1500]
-                current_app.logger.error(
-                    "Newsletter send failed campaign=%s vendor_id=%s email=%s error=%s",
-                    campaign_id,
-                    vendor_id,
-                    recipient,
-                    error_text,
-                )
-            log_rows.append(row_payload)
-
-        SuperAdminService._ensure_newsletter_log_table()
-        if SuperAdminService._has_table("vendor_newsletter_logs") and log_rows:
-            try:
-                db.session.execute(
-                    text(
-                        """
-                        INSERT INTO vendor_newsletter_logs
-                        (campaign_id, vendor_id, sent_to_email, topic, content, status, error_message, sent_by, sent_at)
-                        VALUES
-                        (:campaign_id, :vendor_id, :sent_to_email, :topic, :content, :status, :error_message, :sent_by, now())
-                        """
-                    ),
-                    log_rows,
-                )
-                db.session.commit()
-            except Exception:
-                db.session.rollback()
-
-        if sent_count == 0:
-            return False, "No newsletters were sent. Please verify email setup.", {
+            started = NewsletterCampaign.start(campaign_id)
+        except Exception as exc:
+            current_app.logger.error("Newsletter campaign create failed campaign=%s error=%s", campaign_id, exc)
+            return False, "Newsletter campaign could not be started. Please try again.", {
                 "campaign_id": campaign_id,
                 "attempted": len(targets),
-                "sent": sent_count,
-                "failed": failed_count,
-                "failed_recipients": failed_recipients,
+                "error": str(exc)[:220],
             }
 
         response_payload = {
             "campaign_id": campaign_id,
-            "attempted": len(targets),
-            "sent": sent_count,
-            "failed": failed_count,
+            "status": "running" if started else "queued",
+            "attempted": recipient_count,
+            "sent": 0,
+            "failed": 0,
             "subject": subject,
             "audience_mode": target_payload.get("mode"),
             "recipient_count": int(target_payload.get("recipient_count") or len(targets)),
             "missing_email_vendor_ids": target_payload.get("missing_email_vendor_ids") or [],
             "duplicate_recipients": int(target_payload.get("duplicate_recipients") or 0),
-            "failed_recipients": failed_recipients,
+            "failed_recipients": [],
         }
+        return True, f"Newsletter campaign started for {recipient_count} recipients.", response_payload
+
+    @staticmethod
+    def get_newsletter_campaign(campaign_id: str):
+        progress = NewsletterCampaign.progress(campaign_id)
+        if not progress:
+            return False, "Campaign not found", None
+        return True, "Campaign progress", progress
 
-        if failed_count > 0:
-            return True, f"Newsletter sent to {sent_count} recipients. {failed_count} failed.", response_payload
-        return True, f"Newsletter sent successfully to {sent_count} recipients.", response_payload
+    @staticmethod
+    def resume_newsletter_campaign(campaign_id: str):
+        progress = NewsletterCampaign.progress(campaign_id)
+        if not progress:
+            return False, "Campaign not found", None
+        if not NewsletterCampaign.start(campaign_id):
+            return False, f"Campaign is {progress['status']} and cannot be resumed now.", progress
+        return True, "Campaign resumed", NewsletterCampaign.progress(campaign_id)
+
+    @staticmethod
+    def retry_onboarding_job(job_id: str):
+        """Re-run the unfinished steps of a failed or dead onboarding job."""
+        job = OnboardingJobService.get_job(job_id)
+        if not job:
+            return False, "Onboarding job not found", None
+        if not OnboardingJobService.start(job_id, retry=True):
+            return False, f"Onboarding job is {job['status']} and cannot be retried now.", job
+        return True, "Onboarding job restarted", OnboardingJobService.get_job(job_id)
+
+    @staticmethod
+    def _build_newsletter_templates(topic: str, content: str, subject: str, support_email: str, dashboard_url: str):
+        """HTML and text bodies rendered once, with merge tokens for the per-recipient fields."""
+        html_template = build_hfg_email_html(
+            subject=subject,
+            content_html=SuperAdminService._build_newsletter_email_html(
+                topic=topic,
+                content=content,
+                owner_name=merge_token("owner_name"),
+                cafe_name=merge_token("cafe_name"),
+                recipient_email=merge_token("recipient"),
+                support_email=support_email,
+                dashboard_url=dashboard_url,
+            ),
+            preview_text=topic,
+        )
+        text_template = SuperAdminService._build_newsletter_email_text(
+            topic=topic,
+            content=content,
+            owner_name=merge_token("owner_name"),
+            cafe_name=merge_token("cafe_name"),
+            support_email=support_email,
+            dashboard_url=dashboard_url,
+        )
+        return html_template, text_template
 
     @staticmethod
     def _build_newsletter_email_text(
@@ -2217,7 +2356,7 @@ class SuperAdminService:
             recipient,
             len(msg.html or ""),
         )
-        mail.send(msg)
+        MailQueue.enqueue(msg, category="deactivation_notice", meta={"vendor_id": vendor_id})
 
         SuperAdminService._ensure_deactivation_notice_table()
         if SuperAdminService._has_table("vendor_deactivation_notifications"):
@@ -0,0 +1,38 @@
+# services/upload_streams.py
+
+import os
+
+import cloudinary.uploader
+from googleapiclient.http import MediaIoBaseUpload
+
+# Resumable Drive chunk size; must be a multiple of 256 KiB.
+DRIVE_UPLOAD_CHUNK_SIZE = int(os.getenv("DRIVE_UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+# Files above this go through Cloudinary's chunked upload_large; Cloudinary's minimum is 5 MB.
+CLOUDINARY_CHUNK_SIZE = max(5 * 1024 * 1024, int(os.getenv("CLOUDINARY_CHUNK_SIZE", str(6 * 1024 * 1024))))
+
+
+def stream_size(file) -> int:
+    """Size of a seekable upload without reading it; leaves the stream at the start."""
+    stream = getattr(file, "stream", file)
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    return size
+
+
+def drive_media(file, mimetype):
+    """Resumable Drive media body that reads `file` chunk by chunk instead of all at once."""
+    stream = getattr(file, "stream", file)
+    stream.seek(0)
+    return MediaIoBaseUpload(stream, mimetype=mimetype, chunksize=DRIVE_UPLOAD_CHUNK_SIZE, resumable=True)
+
+
+def cloudinary_upload(file, **options):
+    """
+    cloudinary.uploader.upload reads the whole file into the request body; above
+    CLOUDINARY_CHUNK_SIZE this switches to upload_large, which sends fixed-size
+    chunks, so memory per upload stays bounded by the chunk size.
+    """
+    if stream_size(file) > CLOUDINARY_CHUNK_SIZE:
+        return cloudinary.uploader.upload_large(file, chunk_size=CLOUDINARY_CHUNK_SIZE, **options)
+    return cloudinary.uploader.upload(file, **options)
@@ -3,13 +3,13 @@
 import string
 import random
 from flask_mail import Message
-from db.extensions import mail
 from flask import current_app
 from datetime import datetime
 import re
 from werkzeug.utils import secure_filename
 from models.vendorPin import VendorPin
 from services.email_template import build_hfg_email_html
+from services.mail_queue import MailQueue
 
 ALLOWED_EXTENSIONS = {'pdf', 'jpg', 'jpeg', 'png', 'gif', 'doc', 'docx'}
 
@@ -38,12 +38,11 @@ def send_email(subject, recipients, body, html=None):
         content_html=html or f"<p>{body}</p>",
         preview_text=body,
     )
-    current_app.logger.info(f"msg: {msg}")
     try:
-        mail.send(msg)
-        current_app.logger.info("Mail Sent Successfully")
+        MailQueue.enqueue(msg)
+        current_app.logger.info(f"Mail queued for {recipients}")
     except Exception as e:
-        current_app.logger.error(f"Failed to send email: {e}")
+        current_app.logger.error(f"Failed to queue email: {e}")
 
 def format_filename(vendor_name, document_name):
     """Format the filename as YYYYMMDD_<Vendor_name>_<document_name_without_space_and_in_lower_case>."""
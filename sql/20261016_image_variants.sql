@@ -0,0 +1,6 @@
+-- Size variants generated at upload time by services/image_pipeline.py.
+-- Older images keep NULLs and fall back to the original url.
+ALTER TABLE images
+ADD COLUMN IF NOT EXISTS thumbnail_url VARCHAR(512),
+ADD COLUMN IF NOT EXISTS card_url VARCHAR(512),
+ADD COLUMN IF NOT EXISTS full_url VARCHAR(512);